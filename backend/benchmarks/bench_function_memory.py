@@ -0,0 +1,65 @@
+"""
+Benchmark: memory held per function, FunctionInfo vs CompactFunctionInfo.
+
+Builds the same synthetic function index (a large multi-repository estate of
+service classes) from FunctionInfo and from CompactFunctionInfo objects and
+measures retained memory with tracemalloc. File paths are built per function,
+as they are when functions are loaded from separate parses or from a store;
+commits are not attached. Run from the backend folder:
+
+    python -m benchmarks.bench_function_memory --functions 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from models import CompactFunctionInfo, FunctionInfo
+
+PARAMS = [[], ["self"], ["self", "request"], ["self", "request", "context"], ["event"], ["a", "b"]]
+DOCSTRINGS = [None, None, "Handle the request.", None, "Return the cached value, loading it on a miss."]
+
+
+def build_index(info_class, total: int, functions_per_file: int = 25):
+    """total functions spread over files of functions_per_file functions"""
+    index = []
+    for number in range(total):
+        file_number = number // functions_per_file
+        index.append(info_class(
+            name=f"handle_{number % functions_per_file}",
+            params=list(PARAMS[number % len(PARAMS)]),
+            docstring=DOCSTRINGS[number % len(DOCSTRINGS)],
+            lineno=10 + (number % functions_per_file) * 12,
+            end_lineno=20 + (number % functions_per_file) * 12,
+            file_path="/".join(("repos", f"repo{file_number // 1000}", "src", "main", f"Service{file_number}.java"))
+        ))
+    return index
+
+
+def measure(label: str, info_class, total: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = build_index(info_class, total)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20} retained {retained / 2**20:8.1f} MiB  {retained / total:6.0f} B/function  "
+          f"peak {peak / 2**20:8.1f} MiB  {elapsed:6.2f}s")
+    del index
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", type=int, default=1_000_000, help="functions in the synthetic index")
+    args = parser.parse_args()
+
+    plain = measure("FunctionInfo", FunctionInfo, args.functions)
+    compact = measure("CompactFunctionInfo", CompactFunctionInfo, args.functions)
+    print(f"{'':<20} x{plain / compact:.1f} less retained memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: file history and stale checks, live GitPython walks vs the SQLite history store.
+
+Creates a synthetic repository with `git fast-import` (each commit changes a
+few of many files), syncs it into a HistoryStore, then times, for a sample of
+files, the latest five commits and whether the file changed after an old
+commit, both with the GitPython walks GitSession used before and with store
+queries. Run from the backend folder:
+
+    python -m benchmarks.bench_git_history --commits 100000 --files 5000
+"""
+import argparse
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+from git import Repo
+
+from git_utils import GitSession
+from services.history_store import HistoryStore
+
+
+def build_repo(path: str, commits: int, files: int, files_per_commit: int = 3) -> None:
+    """A linear history of commits, each rewriting files_per_commit random files"""
+    subprocess.run(["git", "init", "-q", path], check=True)
+    rng = random.Random(7)
+    stream = []
+    for number in range(1, commits + 1):
+        message = f"Change {number}\n".encode()
+        stream.append(b"commit refs/heads/master\n")
+        stream.append(b"committer Dev <dev@example.com> %d +0000\n" % (1_600_000_000 + number * 60))
+        stream.append(b"data %d\n%s" % (len(message), message))
+        for file_number in rng.sample(range(files), files_per_commit):
+            content = f"value = {number}\n".encode()
+            stream.append(b"M 100644 inline src/module%d.py\ndata %d\n%s\n" % (file_number, len(content), content))
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=path, input=b"".join(stream), check=True)
+    subprocess.run(["git", "checkout", "-q", "master"], cwd=path, check=True)
+
+
+def timed(label: str, lookups, count: int) -> float:
+    start = time.perf_counter()
+    for lookup in lookups:
+        lookup()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed * 1000 / count:9.2f} ms/file")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=100_000, help="commits in the synthetic repository")
+    parser.add_argument("--files", type=int, default=5_000, help="files in the synthetic repository")
+    parser.add_argument("--sample", type=int, default=50, help="files looked up")
+    args = parser.parse_args()
+
+    repo_dir = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        build_repo(repo_dir, args.commits, args.files)
+        print(f"built {args.commits} commits in {time.perf_counter() - start:.1f}s")
+
+        store = HistoryStore(cache_dir)
+        start = time.perf_counter()
+        repo_id = store.sync(repo_dir)
+        print(f"{'history store full sync':<36} {time.perf_counter() - start:9.1f} s")
+
+        repo = Repo(repo_dir)
+        old_commit = repo.git.rev_list("--max-count=1", "--skip", str(args.commits // 2), "HEAD")
+        paths = [f"src/module{number}.py" for number in random.Random(1).sample(range(args.files), args.sample)]
+
+        def walk(path):
+            return [(c.hexsha, c.author.name, c.message.strip()) for c in repo.iter_commits(paths=path, max_count=5)]
+
+        live = timed("GitPython latest commits", [lambda p=p: walk(p) for p in paths], len(paths))
+        stored = timed("history store latest commits", [lambda p=p: store.file_commits(repo_id, p) for p in paths], len(paths))
+        assert all(walk(p) == store.file_commits(repo_id, p) for p in paths[:5])
+        print(f"{'':<36} x{live / stored:.0f} faster")
+
+        live = timed("GitPython changed since", [lambda p=p: GitSession._file_changed_since(repo, p, old_commit)
+                                                 for p in paths], len(paths))
+        stored = timed("history store changed since", [lambda p=p: store.changed_since(repo_id, p, old_commit)
+                                                      for p in paths], len(paths))
+        print(f"{'':<36} x{live / stored:.0f} faster")
+    finally:
+        shutil.rmtree(repo_dir, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: Java parsing throughput, JavaScanner vs javalang.
+
+Parses every .java file under a root with both parsers and reports files/s,
+MB/s and how often the two agree on method names and start lines. Without
+--root a synthetic enterprise-style code base (annotations, generics,
+Javadoc, nested and anonymous classes) is generated. Run from the backend
+folder:
+
+    python -m benchmarks.bench_java_parser --files 500
+    python -m benchmarks.bench_java_parser --root /path/to/java/repo
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from parsers.java_parser import JavaParser
+
+
+def build_sources(root: str, total_files: int, methods_per_file: int = 30) -> None:
+    """Write total_files service classes with methods_per_file annotated methods each"""
+    os.makedirs(root, exist_ok=True)
+    for index in range(total_files):
+        methods = "".join(
+            f"    /**\n"
+            f"     * Handles request {m}.\n"
+            f"     * @param request the incoming request\n"
+            f"     */\n"
+            f"    @Override\n"
+            f"    @Transactional(readOnly = true)\n"
+            f"    public Map<String, List<Long>> handle{m}(final Request request, int... ids)\n"
+            f"            throws ServiceException {{\n"
+            f"        String json = \"{{\\\"id\\\": {m}}}\";\n"
+            f"        if (request.isValid()) {{\n"
+            f"            return repository.find(request.getId(), new Callback<Long>() {{\n"
+            f"                public void done(Long value) {{ log.info(\"done {{}}\", value); }}\n"
+            f"            }});\n"
+            f"        }}\n"
+            f"        return Collections.emptyMap();\n"
+            f"    }}\n\n"
+            for m in range(methods_per_file)
+        )
+        with open(os.path.join(root, f"Service{index}.java"), "w") as f:
+            f.write(
+                f"package com.example.service;\n\n"
+                f"import java.util.*;\n"
+                f"import static java.util.Objects.requireNonNull;\n\n"
+                f"/** Service number {index}. */\n"
+                f"@Service\n"
+                f"public class Service{index} extends AbstractService<Request> implements Handler {{\n"
+                f"    private static final Logger log = LoggerFactory.getLogger(Service{index}.class);\n\n"
+                f"{methods}"
+                f"    static class Inner {{\n"
+                f"        int size() {{ return 0; }}\n"
+                f"    }}\n"
+                f"}}\n"
+            )
+
+
+def parse_all(paths, parse) -> tuple:
+    """(seconds, {path: [(name, line)]}, failures) for one parser over all paths"""
+    results = {}
+    failures = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                code = f.read()
+            results[path] = [(f.name, f.lineno) for f in parse(code, path).functions]
+        except Exception:
+            failures += 1
+    return time.perf_counter() - start, results, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=500, help="synthetic Java files to generate")
+    parser.add_argument("--root", help="existing Java code base (synthetic files are generated if missing)")
+    args = parser.parse_args()
+
+    root = args.root or os.path.join(tempfile.gettempdir(), f"crumb-java-bench-{args.files}")
+    if not os.path.isdir(root) or not os.listdir(root):
+        print(f"Generating {args.files} Java files in {root} ...")
+        build_sources(root, args.files)
+
+    paths = [os.path.join(d, name) for d, _, names in os.walk(root) for name in names if name.endswith(".java")]
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    print(f"{len(paths)} Java files, {total_bytes / 1e6:.1f} MB")
+
+    timings = {}
+    outputs = {}
+    for label, parse in [("scanner", JavaParser._parse_with_scanner), ("javalang", JavaParser._parse_with_javalang)]:
+        elapsed, outputs[label], failures = parse_all(paths, parse)
+        timings[label] = elapsed
+        print(f"  {label:<9} {elapsed:8.2f}s  {len(paths) / elapsed:8.1f} files/s  "
+              f"{total_bytes / elapsed / 1e6:6.2f} MB/s  ({failures} files failed)")
+    print(f"  speedup x{timings['javalang'] / timings['scanner']:.1f}")
+
+    both = [path for path in outputs["javalang"] if path in outputs["scanner"]]
+    same = sum(1 for path in both if outputs["javalang"][path] == outputs["scanner"][path])
+    print(f"  identical method lists for {same}/{len(both)} files parsed by both")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: JavaScript parsing time on multi-MB files.
+
+Compares the single-pass JSScanner against the previous line-by-line regex
+parser (reproduced below as the baseline). The baseline's brace counting
+restarted at every match and ran to the end of the file whenever the opening
+brace was not on the declaration line, so it grows quadratically on such code.
+Run from the backend folder:
+
+    python -m benchmarks.bench_js_parser --sizes 1 2 4
+    python -m benchmarks.bench_js_parser --file path/to/bundle.js
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from parsers.js_scanner import JSScanner
+
+_LEGACY_PATTERNS = [
+    r'function\s+(\w+)\s*\(([^)]*)\)',
+    r'(?:const|let|var)\s+(\w+)\s*=\s*\(([^)]*)\)\s*=>\s*\{',
+    r'(\w+)\s*\(([^)]*)\)\s*\{'
+]
+
+
+def legacy_parse(content: str) -> int:
+    """The previous JSParser loop; returns the number of functions found"""
+    lines = content.split('\n')
+    found = 0
+    for i, line in enumerate(lines):
+        for pattern in _LEGACY_PATTERNS:
+            if re.search(pattern, line):
+                brace_count = 0
+                for j in range(i, len(lines)):
+                    brace_count += lines[j].count('{') - lines[j].count('}')
+                    if brace_count == 0 and '{' in lines[i]:
+                        break
+                found += 1
+                break
+    return found
+
+
+def build_source(target_bytes: int, style: str = "kr") -> str:
+    """
+    A bundle-like module of classes, arrow functions, strings and regexes
+    until target_bytes. style "allman" puts opening braces on their own line,
+    which sends the legacy brace counting to the end of the file every time.
+    """
+    brace = "\n{" if style == "allman" else " {"
+    chunks = []
+    size = 0
+    index = 0
+    while size < target_bytes:
+        chunk = (
+            f"/**\n * Component {index}\n */\n"
+            f"export class Component{index} extends Base{brace}\n"
+            f"  render(props, {{ theme }}){brace}\n"
+            f"    const label = `item-${{props.id}}-{index}`;\n"
+            f"    if (/^[a-z{{]+$/.test(label)) {{ return '{{' + label; }}\n"
+            f"    return label;\n"
+            f"  }}\n"
+            f"}}\n"
+            f"function handler{index}(event){brace}\n"
+            f"  // closing brace in a comment }}\n"
+            f"  return event.items.map(item => item.value * {index});\n"
+            f"}}\n"
+        )
+        chunks.append(chunk)
+        size += len(chunk)
+        index += 1
+    return "".join(chunks)
+
+
+def time_call(label: str, func, content: str, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<10} {best:8.3f}s  {len(content) / best / 1e6:7.2f} MB/s  ({result} functions)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 4], help="generated file sizes in MB")
+    parser.add_argument("--styles", nargs="+", default=["kr", "allman"], choices=["kr", "allman"],
+                        help="brace styles of the generated files")
+    parser.add_argument("--file", help="benchmark an existing JavaScript file instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=float, default=1,
+                        help="skip the quadratic baseline for files larger than this many MB")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            sources = [(args.file, f.read())]
+    else:
+        sources = [(f"generated {mb:g} MB, {style}", build_source(int(mb * 1024 * 1024), style))
+                   for style in args.styles for mb in args.sizes]
+
+    scan = lambda content: len(JSScanner(content, os.path.join(tempfile.gettempdir(), "bench.js")).scan().functions)
+    for label, content in sources:
+        print(f"{label}: {len(content) / 1e6:.2f} MB, {content.count(chr(10))} lines")
+        scanned = time_call("scanner", scan, content, args.repeat)
+        if len(content) <= args.skip_legacy_above * 1024 * 1024:
+            legacy = time_call("legacy", legacy_parse, content, 1)
+            print(f"  {'':<10} speedup x{legacy / scanned:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: documenting a file's functions with sequential vs concurrent LLM calls.
+
+Starts a local mock of the OpenAI chat completions endpoint that answers
+after a fixed latency, points DocGenerator at it, and documents the same
+synthetic functions with blocking generate_function_doc calls one after
+another and with generate_function_docs under the OPENAI_MAX_CONCURRENCY
+limit. Checks that the concurrent results come back in function order and
+reports the peak number of requests the mock saw at once. Run from the
+backend folder:
+
+    python -m benchmarks.bench_llm_concurrency --functions 200 --latency 0.5 --concurrency 16
+"""
+import argparse
+import asyncio
+import re
+import threading
+import time
+
+import openai
+from aiohttp import web
+
+from doc_generator import DocGenerator
+from models import FunctionInfo
+
+
+class MockChatServer:
+    """OpenAI-compatible /v1/chat/completions answering after `latency` seconds, in its own thread"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = None
+
+    async def _complete(self, request):
+        body = await request.json()
+        self.requests += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        name = re.search(r"Function Name: (\S+)", body["messages"][0]["content"]).group(1)
+        return web.json_response({
+            "id": f"chatcmpl-{self.requests}", "object": "chat.completion", "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"Docs for {name}"},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        })
+
+    def start(self) -> str:
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._complete)
+        runner = web.AppRunner(app)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def reset(self):
+        self.peak = 0
+        self.requests = 0
+
+
+def build_functions(total: int):
+    return [FunctionInfo(f"handle_{number}", ["self", "request"], None, 10 * number + 1, 10 * number + 8,
+                         "src/service/handlers.py") for number in range(total)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", type=int, default=200, help="functions documented")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds the mock takes per completion")
+    parser.add_argument("--concurrency", type=int, default=16, help="OPENAI_MAX_CONCURRENCY of the async path")
+    parser.add_argument("--sequential-sample", type=int, default=20,
+                        help="functions timed on the sequential path, extrapolated to --functions")
+    args = parser.parse_args()
+
+    server = MockChatServer(args.latency)
+    openai.api_base = server.start()
+    generator = DocGenerator(api_key="mock-key")
+    generator.max_concurrency = args.concurrency
+    functions = build_functions(args.functions)
+
+    sample = functions[:args.sequential_sample]
+    start = time.perf_counter()
+    for func in sample:
+        generator.generate_function_doc(func)
+    sequential = (time.perf_counter() - start) * len(functions) / len(sample)
+    print(f"{'sequential':<12} {sequential:8.2f}s for {len(functions)} functions (extrapolated from {len(sample)})")
+
+    async def document():
+        async with generator.llm_session():
+            return await generator.generate_function_docs(functions)
+
+    server.reset()
+    start = time.perf_counter()
+    docs = asyncio.run(document())
+    concurrent = time.perf_counter() - start
+    assert all(doc.startswith(f"Docs for {func.name}\n") for func, doc in zip(functions, docs)), "results out of order"
+    print(f"{'concurrent':<12} {concurrent:8.2f}s for {len(functions)} functions, "
+          f"peak {server.peak} requests in flight (limit {args.concurrency})")
+    print(f"{'':<12} x{sequential / concurrent:.1f} faster")
+
+
+if __name__ == "__main__":
+    main()
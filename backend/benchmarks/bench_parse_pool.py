@@ -0,0 +1,73 @@
+"""
+Benchmark: parsing throughput of the ParsePool across worker counts.
+
+Generates (or reuses) a directory of synthetic Java classes and parses all of
+them through ParsePool with the parse cache disabled, once per worker count.
+Run from the backend folder:
+
+    python -m benchmarks.bench_parse_pool --files 2000
+    python -m benchmarks.bench_parse_pool --root /path/to/java/repo --workers 1 2 4 8 --chunk-size 32
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from services.parse_pool import ParsePool
+from services.repo_scanner import RepoScanner
+
+
+def build_sources(root: str, total_files: int, methods_per_file: int = 40) -> None:
+    """Write total_files Java classes with methods_per_file methods each"""
+    os.makedirs(root, exist_ok=True)
+    for index in range(total_files):
+        methods = "\n".join(
+            f"    public int compute{m}(int value, String label) {{\n"
+            f"        if (value > {m}) {{ return value * {m}; }}\n"
+            f"        return label.length() + {m};\n"
+            f"    }}\n"
+            for m in range(methods_per_file)
+        )
+        with open(os.path.join(root, f"Generated{index}.java"), "w") as f:
+            f.write(f"package bench;\n\nimport java.util.List;\n\npublic class Generated{index} {{\n{methods}}}\n")
+
+
+def run(code_files, workers: int, chunk_size: int) -> float:
+    pool = ParsePool(max_workers=workers, chunk_size=chunk_size)
+    try:
+        # Start the workers outside the timed region
+        if workers > 1:
+            pool._get_executor().submit(int).result()
+        start = time.perf_counter()
+        parsed = sum(1 for _, model, _ in pool.iter_parsed(code_files) if model is not None)
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    print(f"workers={workers:<3} chunk={chunk_size:<4} {elapsed:8.3f}s  {parsed / elapsed:9.1f} files/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000, help="synthetic Java files to generate")
+    parser.add_argument("--root", help="existing repository to parse (synthetic files are generated if missing)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-size", type=int, default=16)
+    args = parser.parse_args()
+
+    root = args.root or os.path.join(tempfile.gettempdir(), f"crumb-parse-bench-{args.files}")
+    if not os.path.isdir(root) or not os.listdir(root):
+        print(f"Generating {args.files} Java files in {root} ...")
+        build_sources(root, args.files)
+
+    code_files = RepoScanner(use_git_index=False).get_code_files_for_analysis(root)
+    print(f"{len(code_files)} code files, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        elapsed = run(code_files, workers, args.chunk_size)
+        baseline = baseline or elapsed
+        print(f"{'':<20} speedup x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: serial os.walk scan vs the parallel scandir walker.
+
+Builds (or reuses) a synthetic repository and times the walk used by
+RepoScanner before the parallel walker, then ParallelWalker at several worker
+counts. Run from the backend folder:
+
+    python -m benchmarks.bench_repo_walker --files 500000
+    python -m benchmarks.bench_repo_walker --root /mnt/nfs/bench-tree --workers 1 4 16 32
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from services.repo_scanner import IGNORED_DIRS, RepoScanner
+from services.repo_walker import ParallelWalker
+
+EXTENSIONS = ['.java', '.py', '.js', '.ts', '.md', '.json', '.xml', '.txt']
+
+
+def build_tree(root: str, total_files: int, files_per_dir: int = 50, dirs_per_level: int = 10) -> None:
+    """Create total_files empty files spread over a balanced directory tree"""
+    directories = (total_files + files_per_dir - 1) // files_per_dir
+    created = 0
+    for index in range(directories):
+        # Encode the directory index in base dirs_per_level to get a nested path
+        parts = []
+        value = index
+        for _ in range(4):
+            parts.append(f"pkg{value % dirs_per_level}")
+            value //= dirs_per_level
+        directory = os.path.join(root, f"module{value}", *reversed(parts))
+        os.makedirs(directory, exist_ok=True)
+        for file_index in range(min(files_per_dir, total_files - created)):
+            open(os.path.join(directory, f"File{file_index}{EXTENSIONS[file_index % len(EXTENSIONS)]}"), 'w').close()
+        created += files_per_dir
+
+
+def legacy_walk(repo_path: str) -> int:
+    """The scan loop RepoScanner used before the parallel walker"""
+    supported_extensions = RepoScanner().supported_extensions
+    seen = 0
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in IGNORED_DIRS]
+        os.path.relpath(root, repo_path)
+        for file in files:
+            relative_file_path = os.path.relpath(os.path.join(root, file), repo_path)
+            if Path(file).suffix.lower() in supported_extensions and relative_file_path:
+                seen += 1
+    return seen
+
+
+def parallel_walk(repo_path: str, workers: int) -> int:
+    scanner = RepoScanner(walker=ParallelWalker(workers))
+    supported_extensions = scanner.supported_extensions
+    seen = 0
+    for relative_dir, filenames in scanner._walk(repo_path):
+        for file in filenames:
+            if os.path.splitext(file)[1].lower() in supported_extensions:
+                seen += 1
+    return seen
+
+
+def timed(label: str, func, *args) -> float:
+    start = time.perf_counter()
+    count = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  ({count} code files)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=500_000, help="files in the synthetic tree")
+    parser.add_argument("--root", help="existing tree to walk (created if missing)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = args.root or os.path.join(tempfile.gettempdir(), f"crumb-walk-bench-{args.files}")
+    if not os.path.isdir(root) or not os.listdir(root):
+        print(f"Building synthetic tree with {args.files} files in {root} ...")
+        build_tree(root, args.files)
+
+    for run in range(args.repeat):
+        print(f"--- run {run + 1}")
+        baseline = timed("os.walk (legacy)", legacy_walk, root)
+        for workers in args.workers:
+            elapsed = timed(f"ParallelWalker({workers})", parallel_walk, root, workers)
+            print(f"{'':<28} speedup x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: memory held by scan results, dict-based output vs columnar snapshot.
+
+Feeds a synthetic walk (no filesystem access) through the dict-per-file
+structures RepoScanner used to keep in memory and through the columnar
+RepoSnapshot, measuring retained memory with tracemalloc. Run from the
+backend folder:
+
+    python -m benchmarks.bench_snapshot_memory --files 1000000
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+from services.repo_scanner import RepoScanner
+
+EXTENSIONS = ['.java', '.py', '.js', '.ts', '.md', '.json', '.xml', '.txt']
+LAYERS = ['controller', 'service', 'model', 'repository', 'util', 'config']
+
+
+def synthetic_walk(total_files: int, files_per_dir: int = 50):
+    """(relative dir, filenames) pairs shaped like a large Java/JS monorepo"""
+    directories = (total_files + files_per_dir - 1) // files_per_dir
+    created = 0
+    for index in range(directories):
+        relative_dir = os.path.join("src", "main", f"module{index // 1000}",
+                                    LAYERS[index % len(LAYERS)], f"pkg{index}")
+        count = min(files_per_dir, total_files - created)
+        yield relative_dir, tuple(f"Item{i}{EXTENSIONS[i % len(EXTENSIONS)]}" for i in range(count))
+        created += count
+
+
+def dict_output(scanner: RepoScanner, walk):
+    """The per-file dicts and lists the scanner materialized before the columnar snapshot"""
+    structure = {name: [] for name in ("code_files", "documentation_files", "config_files", "test_files", "main_files")}
+    structure["directories"] = []
+    files_for_analysis = []
+    layers = {}
+    for relative_dir, filenames in walk:
+        structure["directories"].append(relative_dir)
+        layer = scanner._identify_architectural_layer(relative_dir)
+        for file in filenames:
+            relative_path = os.path.join(relative_dir, file)
+            lang = scanner.supported_extensions.get(os.path.splitext(file)[1].lower())
+            if not lang:
+                continue
+            category = scanner._file_category(file)
+            if category == "code_files":
+                structure["code_files"].append({"path": relative_path, "name": file,
+                                                "type": scanner._get_file_purpose(file.lower(), relative_path)})
+            elif category is not None:
+                structure[category].append(relative_path)
+            files_for_analysis.append({
+                "file_path": relative_path,
+                "full_path": os.path.join("/repo", relative_path),
+                "language": lang,
+                "file_type": scanner._get_file_purpose(file.lower(), relative_path)
+            })
+            if layer != "unknown":
+                layers.setdefault(layer, []).append({"file": file, "path": relative_dir})
+    return structure, files_for_analysis, layers
+
+
+def columnar_output(scanner: RepoScanner, walk):
+    return scanner._snapshot_from_walk("/repo", walk, {})
+
+
+def measure(label: str, func, *args):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} retained {retained / 2**20:9.1f} MiB  peak {peak / 2**20:9.1f} MiB  {elapsed:7.2f}s")
+    return result, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1_000_000, help="files in the synthetic walk")
+    args = parser.parse_args()
+
+    scanner = RepoScanner(use_git_index=False)
+    _, dict_bytes = measure("dict-based output", dict_output, scanner, synthetic_walk(args.files))
+    snapshot, columnar_bytes = measure("columnar snapshot", columnar_output, scanner, synthetic_walk(args.files))
+    print(f"{'':<22} x{dict_bytes / columnar_bytes:.1f} less retained memory")
+
+    # Materializing a view is paid only by the caller that asks for it
+    measure("structure() view", snapshot.structure)
+
+
+if __name__ == "__main__":
+    main()
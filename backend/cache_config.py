@@ -0,0 +1,14 @@
+"""
+Location of the on-disk caches shared by the scanner, parsers and git helpers
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+def get_cache_dir() -> str:
+    """Return the cache directory, creating it on first use"""
+    cache_dir = os.getenv("CRUMB_CACHE_DIR") or os.path.join(os.getcwd(), ".crumb-cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
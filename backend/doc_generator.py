@@ -1,9 +1,14 @@
 """
 LLM API integration for generating markdown documentation
 """
+import asyncio
+import contextlib
 import os
-from typing import Optional
+import weakref
+from collections import OrderedDict
+from typing import List, Optional, Union
 from models import FunctionInfo, CommitInfo
+import aiohttp
 import openai
 from dotenv import load_dotenv
 
@@ -17,8 +22,69 @@ class DocGenerator:
         # Set up OpenAI API key
         if self.api_key:
             openai.api_key = self.api_key
+        # AI bodies of functions in identical files, keyed by content hash
+        self._shared_content: "OrderedDict[tuple, str]" = OrderedDict()
+        self._shared_content_limit = int(os.getenv("DOC_SHARED_CONTENT_LIMIT", "4096"))
+        # Chat completions in flight at once on the async path, per event loop
+        self.max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
     
-    def generate_function_doc(self, func: FunctionInfo, target_format: str = "markdown") -> str:
+    def generate_function_doc(self, func: FunctionInfo, target_format: str = "markdown", content_key: Optional[str] = None) -> str:
+        """
+        Documentation for one function. Functions of byte-identical files can pass
+        the file's content hash as content_key so the LLM is asked only once,
+        from a prompt without the path or the history; the links and recent
+        commits of each path are added to the shared text.
+        """
+        commit_links, file_links = self._links(func, target_format)
+        
+        # Try to use OpenAI API if available, otherwise fall back to template
+        if self.api_key:
+            try:
+                return self._generate_openai_docs(func, file_links, commit_links, target_format, content_key)
+            except Exception as e:
+                return self._generate_template_docs(func, file_links, commit_links, target_format, f"OpenAI API failed: {str(e)}")
+        else:
+            return self._generate_template_docs(func, file_links, commit_links, target_format, "No valid OpenAI API key found")
+    
+    async def generate_function_doc_async(self, func: FunctionInfo, target_format: str = "markdown",
+                                          content_key: Optional[str] = None) -> str:
+        """generate_function_doc with the chat completion awaited, at most max_concurrency at a time"""
+        commit_links, file_links = self._links(func, target_format)
+        
+        if self.api_key:
+            try:
+                return await self._generate_openai_docs_async(func, file_links, commit_links, target_format, content_key)
+            except Exception as e:
+                return self._generate_template_docs(func, file_links, commit_links, target_format, f"OpenAI API failed: {str(e)}")
+        else:
+            return self._generate_template_docs(func, file_links, commit_links, target_format, "No valid OpenAI API key found")
+    
+    async def generate_function_docs(self, funcs: List[FunctionInfo], target_format: str = "markdown",
+                                     content_key: Optional[str] = None) -> List[Union[str, Exception]]:
+        """
+        Documentation of several functions, requested concurrently and returned
+        in the order of funcs; a function that could not be documented gets
+        its exception in place of the documentation.
+        """
+        return await asyncio.gather(*(self.generate_function_doc_async(func, target_format, content_key) for func in funcs),
+                                    return_exceptions=True)
+    
+    @contextlib.asynccontextmanager
+    async def llm_session(self):
+        """Async LLM calls made inside this block, including in tasks it starts, share one HTTP connection pool"""
+        if not self.api_key or openai.aiosession.get() is not None:
+            yield
+            return
+        async with aiohttp.ClientSession() as session:
+            token = openai.aiosession.set(session)
+            try:
+                yield
+            finally:
+                openai.aiosession.reset(token)
+    
+    def _links(self, func: FunctionInfo, target_format: str):
+        """(commit links, format-specific file links) of a function"""
         # Safe commit links generation
         commit_links = ""
         if func.commits:
@@ -30,16 +96,14 @@ class DocGenerator:
             commit_links = "No recent commits found"
         
         # Generate format-specific links
-        file_links = self._generate_file_links(func, target_format)
-        
-        # Try to use OpenAI API if available, otherwise fall back to template
-        if self.api_key:
-            try:
-                return self._generate_openai_docs(func, file_links, commit_links, target_format)
-            except Exception as e:
-                return self._generate_template_docs(func, file_links, commit_links, target_format, f"OpenAI API failed: {str(e)}")
-        else:
-            return self._generate_template_docs(func, file_links, commit_links, target_format, "No valid OpenAI API key found")
+        return commit_links, self._generate_file_links(func, target_format)
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
     
     def _generate_file_links(self, func: FunctionInfo, target_format: str = "markdown") -> dict:
         """Generate format-specific clickable links for the function"""
@@ -74,15 +138,57 @@ class DocGenerator:
                 'github_line': f"#L{func.lineno}" + (f"-L{func.end_lineno}" if func.end_lineno != func.lineno else "")
             }
     
-    def _generate_openai_docs(self, func: FunctionInfo, file_links: dict, commit_links: str, target_format: str = "markdown") -> str:
+    def _generate_openai_docs(self, func: FunctionInfo, file_links: dict, commit_links: str, target_format: str = "markdown",
+                              content_key: Optional[str] = None) -> str:
         """Generate documentation using OpenAI API (v0.28 syntax)"""
+        shared_key = self._shared_key(func, content_key)
+        if shared_key in self._shared_content:
+            self._shared_content.move_to_end(shared_key)
+            return self._shared_content[shared_key] + self._path_sections(func, file_links, commit_links, target_format, shared_key)
+        
+        try:
+            # OpenAI 0.28 syntax
+            openai.api_key = self.api_key
+            response = openai.ChatCompletion.create(**self._chat_request(func, file_links, commit_links, shared_key))
+            return self._openai_docs(func, file_links, commit_links, target_format, shared_key, response)
+        except Exception as e:
+            raise Exception(f"OpenAI API call failed: {str(e)}")
+    
+    async def _generate_openai_docs_async(self, func: FunctionInfo, file_links: dict, commit_links: str,
+                                          target_format: str = "markdown", content_key: Optional[str] = None) -> str:
+        """_generate_openai_docs awaiting the chat completion under the concurrency limit"""
+        shared_key = self._shared_key(func, content_key)
+        if shared_key in self._shared_content:
+            self._shared_content.move_to_end(shared_key)
+            return self._shared_content[shared_key] + self._path_sections(func, file_links, commit_links, target_format, shared_key)
+        
+        try:
+            openai.api_key = self.api_key
+            async with self._semaphore():
+                response = await openai.ChatCompletion.acreate(**self._chat_request(func, file_links, commit_links, shared_key))
+            return self._openai_docs(func, file_links, commit_links, target_format, shared_key, response)
+        except Exception as e:
+            raise Exception(f"OpenAI API call failed: {str(e)}")
+    
+    @staticmethod
+    def _shared_key(func: FunctionInfo, content_key: Optional[str]):
+        """Cache key of a function of a shared file: its content and the path-independent prompt inputs"""
+        return (content_key, func.name, func.lineno, func.end_lineno) if content_key else None
+    
+    @staticmethod
+    def _chat_request(func: FunctionInfo, file_links: dict, commit_links: str, shared_key=None) -> dict:
+        # The text of a shared function is reused for every copy, so its prompt leaves out the path and history
+        if shared_key is None:
+            location = f"""File: {file_links['relative_path']} (lines {func.lineno}-{func.end_lineno})
+Recent Commits: {commit_links}"""
+        else:
+            location = f"Lines: {func.lineno}-{func.end_lineno}"
         prompt = f"""Generate professional starter documentation for this function in markdown format.
 
 Function Name: {func.name}
 Parameters: {', '.join(func.params) if func.params else 'None'}
 Docstring: {func.docstring or 'None'}
-File: {file_links['relative_path']} (lines {func.lineno}-{func.end_lineno})
-Recent Commits: {commit_links}
+{location}
 
 Please provide:
 1. A clear description of what the function does
@@ -91,28 +197,36 @@ Please provide:
 4. Any important notes
 
 Format in clean markdown with proper headings."""
+        
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.3,
+            "max_tokens": 500
+        }
+    
+    def _openai_docs(self, func: FunctionInfo, file_links: dict, commit_links: str, target_format: str, shared_key,
+                     response) -> str:
+        # Add the format-specific links section to the AI-generated content
+        ai_content = response.choices[0].message.content
+        if shared_key is not None:
+            self._shared_content[shared_key] = ai_content
+            if len(self._shared_content) > self._shared_content_limit:
+                self._shared_content.popitem(last=False)
+        
+        return ai_content + self._path_sections(func, file_links, commit_links, target_format, shared_key)
+    
+    def _path_sections(self, func: FunctionInfo, file_links: dict, commit_links: str, target_format: str, shared_key) -> str:
+        """Sections specific to the function's path, appended to the AI-generated content"""
+        links_section = self._generate_links_section(func, file_links, target_format)
+        if shared_key is None:
+            return links_section
+        # The shared text was written without this copy's history
+        return links_section + f"""
+## Recent Commits
 
-        try:
-            # OpenAI 0.28 syntax
-            import openai
-            openai.api_key = self.api_key
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            # Add the format-specific links section to the AI-generated content
-            ai_content = response.choices[0].message.content
-            
-            links_section = self._generate_links_section(func, file_links, target_format)
-            
-            return ai_content + links_section
-            
-        except Exception as e:
-            raise Exception(f"OpenAI API call failed: {str(e)}")
+{commit_links}
+"""
     
     def _generate_links_section(self, func: FunctionInfo, file_links: dict, target_format: str) -> str:
         """Generate format-specific links section"""
@@ -1,52 +1,274 @@
 """
 Git utilities for commit analysis and stale documentation detection
 """
+import asyncio
+import os
 from git import Repo
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple, Union
 from models import CommitInfo, FunctionInfo
+from services.blame_index import BlameIndex
+from services.changed_lines import ChangedLines
+from services.git_log import file_log_args, parse_log
 
-class GitAnalyzer:
-    @staticmethod
-    def get_commits_for_function(repo_path: str, func: FunctionInfo) -> List[CommitInfo]:
+# Longest a run waits for the history store to catch up with HEAD before it blames files instead
+HISTORY_SYNC_TIMEOUT = float(os.getenv("GIT_HISTORY_SYNC_TIMEOUT", "10"))
+
+class GitSession:
+    """
+    Git lookups shared by a batch of functions, typically one request.
+    Repository roots and Repo handles are resolved once, and the commits and
+    staleness of a file are computed once for all of its functions.
+
+    Functions get the commits that last changed their own lines, from one git
+    blame per file, and are checked for staleness with one git diff per file.
+    Files git cannot blame fall back to their latest commits, which carry no
+    line_range as they are not attributed to lines.
+
+    Runs over a whole repository call load_history() first: once the
+    persistent history store (services.history_store.HistoryStore) is synced
+    with HEAD, every function gets the file-level commits of its file from the
+    store, and no file is blamed. A sync that does not finish in time leaves
+    the run on blame, and carries on in the background for later runs; no
+    lookup ever syncs the store itself.
+
+    prefetch() runs the git work of a set of files ahead of time through a
+    services.git_executor.GitExecutor, concurrently; the lookups above then
+    read its results.
+    """
+    def __init__(self, history_store=None):
+        self.history_store = history_store
+        self._history: Dict[str, int] = {}  # git root -> id in the history store, synced by load_history
+        self._blames: Dict[Tuple[str, str], Optional[BlameIndex]] = {}  # (root, path) -> line attribution
+        self._roots: Dict[str, Optional[str]] = {}   # repo_path -> git root
+        self._repos: Dict[str, Repo] = {}            # git root -> handle
+        self._file_commits: Dict[Tuple[str, str], List[Tuple[str, str, str]]] = {}  # (root, path) -> (hash, author, message)
+        self._changed_lines: Dict[Tuple[str, str, str], Union[ChangedLines, bool]] = {}  # (root, path, doc commit) -> lines changed since
+
+    def git_root(self, repo_path: str) -> Optional[str]:
+        if repo_path not in self._roots:
+            self._roots[repo_path] = GitAnalyzer._find_git_repo(repo_path)
+            if not self._roots[repo_path]:
+                print(f"No git repository found for {repo_path}")
+        return self._roots[repo_path]
+
+    def repo(self, git_root: str) -> Repo:
+        if git_root not in self._repos:
+            self._repos[git_root] = Repo(git_root)
+        return self._repos[git_root]
+
+    def head(self, repo_path: str) -> Optional[str]:
+        """Commit checked out in the repository of repo_path; None outside git or before the first commit"""
+        git_root = self.git_root(repo_path)
+        if not git_root:
+            return None
         try:
-            # Try to find the git repository
-            git_repo_path = GitAnalyzer._find_git_repo(repo_path)
+            return self.repo(git_root).head.commit.hexsha
+        except Exception:
+            return None
+
+    def file_commits(self, git_root: str, relative_file_path: str) -> List[Tuple[str, str, str]]:
+        """(hash, author, message) of the last 5 commits touching a file, looked up once per file"""
+        key = (git_root, relative_file_path)
+        if key not in self._file_commits:
+            if git_root in self._history:
+                self._file_commits[key] = self.history_store.file_commits(self._history[git_root], relative_file_path, limit=5)
+                return self._file_commits[key]
+            commits = []
+            for commit in self.repo(git_root).iter_commits(paths=relative_file_path, max_count=5):
+                try:
+                    commits.append((commit.hexsha, commit.author.name, commit.message.strip()))
+                except Exception as e:
+                    print(f"Error processing commit {commit.hexsha}: {e}")
+            self._file_commits[key] = commits
+        return self._file_commits[key]
+
+    def blame(self, git_root: str, relative_file_path: str) -> Optional[BlameIndex]:
+        """Line attribution of a file from one git blame, None when git cannot blame it"""
+        key = (git_root, relative_file_path)
+        if key not in self._blames:
+            try:
+                self._blames[key] = BlameIndex.from_git(git_root, relative_file_path)
+            except Exception as e:
+                print(f"Error blaming {relative_file_path}: {e}")
+                self._blames[key] = None
+        return self._blames[key]
+
+    async def load_history(self, repo_path: str, timeout: float = HISTORY_SYNC_TIMEOUT) -> bool:
+        """Sync the history store with HEAD, waiting at most timeout seconds; whether lookups now read it"""
+        git_root = self.git_root(repo_path)
+        if not git_root or self.history_store is None:
+            return False
+        if git_root not in self._history:
+            try:
+                # On timeout the sync carries on in its thread, and later runs find the store ready
+                history_id = await asyncio.wait_for(asyncio.to_thread(self.history_store.sync, git_root), timeout)
+            except asyncio.TimeoutError:
+                print(f"Git history store of {git_root} still syncing after {timeout}s; blaming files instead")
+                return False
+            except Exception as e:
+                print(f"Git history store unavailable for {git_root}: {e}")
+                return False
+            if history_id is None:
+                return False  # No commits yet
+            self._history[git_root] = history_id
+        return True
+
+    def _changed_since(self, git_root: str, relative_file_path: str, last_doc_commit_hash: str) -> bool:
+        """Whether any commit after the documentation commit touched the file"""
+        if git_root in self._history:
+            changed = self.history_store.changed_since(self._history[git_root], relative_file_path, last_doc_commit_hash)
+            if changed is not None:
+                return changed
+        return self._file_changed_since(self.repo(git_root), relative_file_path, last_doc_commit_hash)
+
+    async def prefetch(self, repo_path: str, file_paths: List[str], executor,
+                       last_doc_commit_hash: Optional[str] = None) -> None:
+        """Compute the history (and staleness since last_doc_commit_hash) of these files in the git pool"""
+        git_root = self.git_root(repo_path)
+        if not git_root:
+            return
+        jobs = []
+        for file_path in file_paths:
+            relative_file_path = GitAnalyzer._get_relative_path(git_root, file_path)
+            if not relative_file_path:
+                continue
+            # With the history store loaded, commits are read from it rather than blamed
+            if git_root not in self._history and (git_root, relative_file_path) not in self._blames:
+                jobs.append(self._prefetch_blame(executor, git_root, relative_file_path))
+            if last_doc_commit_hash and (git_root, relative_file_path, last_doc_commit_hash) not in self._changed_lines:
+                jobs.append(self._prefetch_changed_lines(executor, git_root, relative_file_path, last_doc_commit_hash))
+        await asyncio.gather(*jobs)
+
+    async def changed_paths(self, repo_path: str, commit: str, executor) -> Optional[Set[str]]:
+        """Paths relative to repo_path that differ from commit in the working tree, or are untracked; None if git cannot tell"""
+        try:
+            diff, untracked = await asyncio.gather(
+                executor.run(repo_path, "diff", "--name-only", "-z", "--relative", "--no-renames", commit, "--"),
+                executor.run(repo_path, "ls-files", "-z", "--others", "--exclude-standard"))
+        except RuntimeError as e:
+            print(f"Changed files unavailable for {repo_path}: {e}")
+            return None
+        return {path.decode("utf-8", "surrogateescape") for path in (diff + untracked).split(b"\0") if path}
+
+    async def _prefetch_blame(self, executor, git_root: str, relative_file_path: str) -> None:
+        key = (git_root, relative_file_path)
+        try:
+            self._blames[key] = await BlameIndex.from_git_async(executor, git_root, relative_file_path)
+            return
+        except RuntimeError as e:
+            print(f"Error blaming {relative_file_path}: {e}")
+            self._blames[key] = None
+        if key not in self._file_commits:
+            await self._prefetch_file_commits(executor, git_root, relative_file_path)
+
+    async def _prefetch_file_commits(self, executor, git_root: str, relative_file_path: str) -> None:
+        """File-level history of a file git could not blame, from one git log through the pool"""
+        key = (git_root, relative_file_path)
+        try:
+            output = await executor.run(git_root, *file_log_args(relative_file_path, 5))
+        except RuntimeError as e:
+            print(f"Error getting commits for {relative_file_path}: {e}")
+            return
+        self._file_commits[key] = [commit for commit, _ in parse_log(output)]
+
+    async def _prefetch_changed_lines(self, executor, git_root: str, relative_file_path: str,
+                                      last_doc_commit_hash: str) -> None:
+        key = (git_root, relative_file_path, last_doc_commit_hash)
+        try:
+            self._changed_lines[key] = await ChangedLines.from_git_async(executor, git_root, relative_file_path,
+                                                                         last_doc_commit_hash)
+            return
+        except RuntimeError as e:
+            print(f"Line-level stale check unavailable for {relative_file_path}: {e}")
+        self._changed_lines[key] = await asyncio.to_thread(self._changed_since, git_root, relative_file_path,
+                                                           last_doc_commit_hash)
+
+    def get_commits_for_function(self, repo_path: str, func: FunctionInfo) -> List[CommitInfo]:
+        try:
+            git_repo_path = self.git_root(repo_path)
             if not git_repo_path:
-                print(f"No git repository found for {repo_path}")
                 return []
             
-            repo = Repo(git_repo_path)
-            
             # Get relative path from git root
             relative_file_path = GitAnalyzer._get_relative_path(git_repo_path, func.file_path)
             if not relative_file_path:
                 print(f"Could not determine relative path for {func.file_path}")
                 return []
             
-            # Get commits that touched this file
+            # Commits that last changed the function's lines, unless the run reads the history store
+            blame = self.blame(git_repo_path, relative_file_path) if git_repo_path not in self._history else None
+            if blame is not None:
+                return [
+                    CommitInfo(hash=hexsha, author=author, message=summary, line_range=line_range)
+                    for hexsha, author, summary, line_range in blame.commits_for_lines(func.lineno, func.end_lineno, limit=5)
+                ]
+            
+            # Commits that touched this file, shared by every function in it and not tied to its lines
             try:
-                commits = list(repo.iter_commits(paths=relative_file_path, max_count=10))  # Limit to recent commits
+                commits = self.file_commits(git_repo_path, relative_file_path)
             except Exception as e:
                 print(f"Error getting commits for {relative_file_path}: {e}")
                 return []
             
-            relevant_commits = []
-            for commit in commits[:5]:  # Only check last 5 commits for performance
-                try:
-                    relevant_commits.append(CommitInfo(
-                        hash=commit.hexsha,
-                        author=commit.author.name,
-                        message=commit.message.strip(),
-                        line_range=(func.lineno, func.end_lineno)
-                    ))
-                except Exception as e:
-                    print(f"Error processing commit {commit.hexsha}: {e}")
-                    continue
-            
-            return relevant_commits
+            return [
+                CommitInfo(hash=hexsha, author=author, message=message)
+                for hexsha, author, message in commits
+            ]
         except Exception as e:
             print(f"Git analysis failed for {repo_path}: {e}")
             return []
+
+    def detect_stale_doc(self, func: FunctionInfo, last_doc_commit_hash: str, repo_path: str = ".") -> bool:
+        """Whether a line of the function changed since the documentation commit; one git diff per file"""
+        try:
+            git_repo_path = self.git_root(repo_path)
+            if not git_repo_path:
+                return False  # Can't determine staleness without git
+            
+            relative_file_path = GitAnalyzer._get_relative_path(git_repo_path, func.file_path)
+            if not relative_file_path:
+                return False
+            
+            key = (git_repo_path, relative_file_path, last_doc_commit_hash)
+            if key not in self._changed_lines:
+                try:
+                    self._changed_lines[key] = ChangedLines.from_git(git_repo_path, relative_file_path, last_doc_commit_hash)
+                except Exception as e:
+                    # e.g. a documentation commit this clone does not have; judge the whole file
+                    print(f"Line-level stale check unavailable for {relative_file_path}: {e}")
+                    self._changed_lines[key] = self._changed_since(git_repo_path, relative_file_path, last_doc_commit_hash)
+            changed = self._changed_lines[key]
+            if isinstance(changed, bool):
+                return changed
+            return changed.overlaps(func.lineno, func.end_lineno)
+        except Exception as e:
+            print(f"Stale detection failed: {e}")
+            return False
+
+    @staticmethod
+    def _file_changed_since(repo: Repo, relative_file_path: str, last_doc_commit_hash: str) -> bool:
+        # Check if there are commits after the last doc commit
+        commits = list(repo.iter_commits(paths=relative_file_path, max_count=10))
+        
+        for commit in commits:
+            if commit.hexsha == last_doc_commit_hash:
+                break
+            # If we find commits before reaching the doc commit, docs are stale
+            try:
+                if commit.parents:
+                    diff = commit.diff(commit.parents[0], paths=relative_file_path)
+                    if diff:  # File was modified
+                        return True
+            except Exception:
+                continue
+        
+        return False
+
+class GitAnalyzer:
+    @staticmethod
+    def get_commits_for_function(repo_path: str, func: FunctionInfo, session: Optional[GitSession] = None) -> List[CommitInfo]:
+        """Pass a GitSession to share the git lookups between functions of the same files"""
+        return (session or GitSession()).get_commits_for_function(repo_path, func)
     
     @staticmethod
     def _find_git_repo(start_path: str) -> str:
@@ -80,35 +302,7 @@ class GitAnalyzer:
             return None
 
     @staticmethod
-    def detect_stale_doc(func: FunctionInfo, last_doc_commit_hash: str, repo_path: str = ".") -> bool:
+    def detect_stale_doc(func: FunctionInfo, last_doc_commit_hash: str, repo_path: str = ".",
+                         session: Optional[GitSession] = None) -> bool:
         """Check if documentation is stale by comparing with recent commits"""
-        try:
-            git_repo_path = GitAnalyzer._find_git_repo(repo_path)
-            if not git_repo_path:
-                return False  # Can't determine staleness without git
-            
-            repo = Repo(git_repo_path)
-            relative_file_path = GitAnalyzer._get_relative_path(git_repo_path, func.file_path)
-            
-            if not relative_file_path:
-                return False
-            
-            # Check if there are commits after the last doc commit
-            commits = list(repo.iter_commits(paths=relative_file_path, max_count=10))
-            
-            for commit in commits:
-                if commit.hexsha == last_doc_commit_hash:
-                    break
-                # If we find commits before reaching the doc commit, docs are stale
-                try:
-                    if commit.parents:
-                        diff = commit.diff(commit.parents[0], paths=relative_file_path)
-                        if diff:  # File was modified
-                            return True
-                except Exception:
-                    continue
-            
-            return False
-        except Exception as e:
-            print(f"Stale detection failed: {e}")
-            return False
+        return (session or GitSession()).detect_stale_doc(func, last_doc_commit_hash, repo_path)
@@ -1,17 +1,32 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Tuple
+from collections import deque
+from itertools import islice
+import asyncio
+import base64
+import binascii
+import copy
+import fnmatch
+import json
 import os
 from datetime import datetime
 
 # Import parsers and services
-from parsers.python_parser import PythonParser
-from parsers.js_parser import JSParser
-from parsers.java_parser import JavaParser
-from git_utils import GitAnalyzer
+from parsers import PARSERS
+from git_utils import GitAnalyzer, GitSession
 from doc_generator import DocGenerator
-from models import FunctionDoc, FunctionInfo
+from models import FileModel, FunctionAnalysisBatchRequest, FunctionDoc, FunctionInfo
 from services.repo_scanner import RepoScanner
+from services.scan_cache import ScanCache
+from services.parse_cache import ParseCache
+from services.incremental_parser import IncrementalParser
+from services.history_store import HistoryStore
+from services.git_executor import GitExecutor
+from services.doc_manifest import DocManifest, function_identities, section, split_sections
+from services.parse_pool import ParsePool
+from services.repo_watcher import RepoWatcher
 from services.document_converter import DocumentConverter
 
 # Initialize FastAPI app
@@ -23,7 +38,18 @@ app = FastAPI(
 
 # Initialize services
 doc_generator = DocGenerator()
-repo_scanner = RepoScanner()
+scan_cache = ScanCache() if os.getenv("SCAN_CACHE_ENABLED", "true").lower() == "true" else None
+repo_scanner = RepoScanner(scan_cache=scan_cache)
+repo_watcher = RepoWatcher(repo_scanner)
+repo_scanner.live_index = repo_watcher
+parse_cache = ParseCache(hasher=repo_scanner.content_hasher) if os.getenv("PARSE_CACHE_ENABLED", "true").lower() == "true" else None
+repo_scanner.parse_cache = parse_cache
+incremental_parser = IncrementalParser(parse_cache=parse_cache) if os.getenv("INCREMENTAL_PARSE_ENABLED", "true").lower() == "true" else None
+parse_pool = ParsePool(parse_cache=parse_cache)
+# Persistent commit history, the file -> commits index of runs over a whole repository
+history_store = HistoryStore() if os.getenv("GIT_HISTORY_STORE_ENABLED", "true").lower() == "true" else None
+# git subprocesses of the documentation endpoints, overlapped up to GIT_MAX_CONCURRENCY at a time
+git_executor = GitExecutor()
 
 # Configure CORS
 app.add_middleware(
@@ -34,19 +60,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Supported parsers mapping
-PARSERS = {
-    "py": PythonParser,
-    "python": PythonParser,
-    "js": JSParser,
-    "jsx": JSParser,
-    "ts": JSParser,
-    "tsx": JSParser,
-    "javascript": JSParser,
-    "typescript": JSParser,
-    "java": JavaParser
-}
-
 # ===== CORE API ENDPOINTS =====
 
 @app.get("/")
@@ -62,10 +75,18 @@ async def root():
         },
         "endpoints": {
             "repository_analysis": "/scan-repository",
+            "repository_analysis_paged": "/scan-repository/page",
+            "live_index": {
+                "register": "/watch/register",
+                "unregister": "/watch/unregister",
+                "status": "/watch/status"
+            },
             "individual_docs": "/generate-individual-docs", 
             "complete_docs": "/generate-complete-repo-docs",
             "single_file_docs": "/generate-docs",
             "function_analysis": "/analyze-functions",
+            "function_analysis_batch": "/analyze-functions/batch",
+            "parse_cache_stats": "/parse-cache/stats",
             "document_conversion": {
                 "word_conversion": "/convert-docs-to-word", 
                 "single_file": "/convert-single-file"
@@ -83,28 +104,175 @@ def get_supported_languages():
         "primary_languages": ["python", "java", "javascript", "typescript"]
     }
 
+def _parse_model(parser_class, full_path: str):
+    """Parse a file, reparsing only its edited regions or answering from the parse cache when possible"""
+    if incremental_parser is not None:
+        return incremental_parser.parse_model(parser_class, full_path)
+    if parse_cache is not None:
+        return parse_cache.parse_model(parser_class, full_path)
+    return parser_class.parse_model(full_path)
+
+def _iter_functions(parser_class, full_path: str):
+    """
+    Functions of a file as the parser finds them, so work on the first ones can
+    start before the whole file is parsed. Files parsed before come from the
+    incremental parser or the parse cache; fresh parses are added to the cache.
+    """
+    if incremental_parser is not None and incremental_parser.tracks(full_path):
+        yield from incremental_parser.parse_model(parser_class, full_path).functions
+        return
+    if parse_cache is not None:
+        model = parse_cache.lookup(parser_class, full_path)
+        if model is not None:
+            yield from model.functions
+            return
+    model = yield from parser_class.iter_functions(full_path)
+    if parse_cache is not None:
+        parse_cache.store(parser_class, full_path, model)
+
+@app.get("/parse-cache/stats")
+def parse_cache_stats():
+    """Hit/miss counters and size of the persistent parse cache, plus incremental reparse counters"""
+    stats = {"enabled": parse_cache is not None}
+    if parse_cache is not None:
+        stats.update(parse_cache.stats())
+    if incremental_parser is not None:
+        stats["incremental"] = incremental_parser.stats()
+    return stats
+
 # ===== REPOSITORY ANALYSIS =====
 
 @app.get("/scan-repository")
-def scan_repository(repo_path: str):
+def scan_repository(repo_path: str, stream: bool = False):
     """Scan repository structure and analyze codebase architecture"""
     try:
         if not os.path.exists(repo_path):
             raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
         
+        if stream:
+            # Emit file records as NDJSON while the walk proceeds
+            return StreamingResponse(_stream_scan(repo_path), media_type="application/x-ndjson")
+        
         structure = repo_scanner.scan_repository(repo_path)
-        return {
+        response = {
             "success": True,
             "repository_path": repo_path,
             "analysis": structure
         }
+        live_status = repo_watcher.status(repo_path)
+        if live_status is not None:
+            response["live_index"] = live_status
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Repository scan failed: {str(e)}")
+
+@app.get("/scan-repository/page")
+def scan_repository_page(repo_path: str, cursor: Optional[str] = None, limit: int = 1000):
+    """Scan repository files one page at a time, resuming from an opaque cursor"""
+    if not os.path.exists(repo_path):
+        raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
+    if limit < 1 or limit > 10000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 10000")
+    
+    try:
+        start_after = _decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    
+    try:
+        records = list(islice(repo_scanner.iter_file_records(repo_path, start_after), limit + 1))
+        page = records[:limit]
+        return {
+            "success": True,
+            "repository_path": repo_path,
+            "files": [_file_record_json(record) for record in page],
+            "next_cursor": _encode_cursor(page[-1].path) if len(records) > limit else None
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Repository scan failed: {str(e)}")
 
+def _stream_scan(repo_path: str):
+    """NDJSON lines: a header, one line per file, then a summary with the totals"""
+    yield json.dumps({"record": "header", "repository_path": repo_path}) + "\n"
+    
+    total_files = 0
+    languages = {}
+    try:
+        for record in repo_scanner.iter_file_records(repo_path):
+            total_files += 1
+            if record.language:
+                languages[record.language] = languages.get(record.language, 0) + 1
+            yield json.dumps({"record": "file", **_file_record_json(record)}) + "\n"
+    except Exception as e:
+        yield json.dumps({"record": "error", "detail": f"Repository scan failed: {str(e)}"}) + "\n"
+        return
+    
+    yield json.dumps({
+        "record": "summary",
+        "total_files": total_files,
+        "languages": languages,
+        "package_structure": repo_scanner._analyze_package_structure(repo_path)
+    }) + "\n"
+
+def _file_record_json(record) -> dict:
+    return {
+        "path": record.path,
+        "name": record.name,
+        "directory": record.directory,
+        "language": record.language,
+        "type": record.purpose
+    }
+
+def _encode_cursor(path: str) -> str:
+    return base64.urlsafe_b64encode(path.encode("utf-8", "surrogateescape")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        path = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8", "surrogateescape")
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError(str(e))
+    if not path:
+        raise ValueError("empty cursor")
+    return path
+
+# ===== LIVE REPOSITORY INDEX =====
+
+@app.post("/watch/register")
+def register_repository_watch(repo_path: str):
+    """Keep a live in-memory index of a repository so scans answer without walking"""
+    if not os.path.isdir(repo_path):
+        raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
+    try:
+        return {"success": True, "status": repo_watcher.register(repo_path)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Watch registration failed: {str(e)}")
+
+@app.post("/watch/unregister")
+def unregister_repository_watch(repo_path: str):
+    """Stop watching a repository and drop its live index"""
+    if not repo_watcher.unregister(repo_path):
+        raise HTTPException(status_code=404, detail=f"Repository is not being watched: {repo_path}")
+    return {"success": True, "repository_path": repo_path}
+
+@app.get("/watch/status")
+def repository_watch_status(repo_path: Optional[str] = None):
+    """Staleness and backend information for one or all watched repositories"""
+    if repo_path is None:
+        return {"success": True, "watched": repo_watcher.status()}
+    status = repo_watcher.status(repo_path)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Repository is not being watched: {repo_path}")
+    return {"success": True, "status": status}
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    repo_watcher.stop_all()
+    parse_pool.shutdown()
+
 @app.post("/generate-complete-repo-docs-for-word")
-def generate_complete_repo_docs_for_word(repo_path: str, output_file: str = "Complete_Repository_Documentation_Word.md"):
+async def generate_complete_repo_docs_for_word(repo_path: str, output_file: str = "Complete_Repository_Documentation_Word.md"):
     """Generate comprehensive documentation specifically formatted for Word conversion"""
-    return generate_complete_repo_docs(repo_path, output_file, target_format="word")
+    return await generate_complete_repo_docs(repo_path, output_file, target_format="word")
 
 @app.get("/analyze-functions")
 def analyze_functions(file_path: str, repo_path: str, language: str):
@@ -122,64 +290,116 @@ def analyze_functions(file_path: str, repo_path: str, language: str):
             raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
 
         # Parse functions
-        parser = parser_class()
-        functions = parser.parse_file(full_path)
+        functions = _parse_model(parser_class, full_path).functions
         
         return {
             "success": True,
             "file_path": file_path,
             "language": language,
             "function_count": len(functions),
-            "functions": [
-                {
-                    "name": func.name,
-                    "parameters": func.params,
-                    "line_range": f"{func.lineno}-{func.end_lineno}",
-                    "has_docstring": bool(func.docstring),
-                    "docstring": func.docstring
-                }
-                for func in functions
-            ]
+            "functions": [_function_json(func) for func in functions]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Function analysis failed: {str(e)}")
 
-# ===== DOCUMENTATION GENERATION =====
+@app.post("/analyze-functions/batch")
+def analyze_functions_batch(request: FunctionAnalysisBatchRequest):
+    """
+    Analyze functions in many files at once, given as a list of paths or a glob
+    over the repository's code files. Files are parsed in the shared parse pool
+    and streamed back as NDJSON, one line per file as soon as it is parsed; a
+    file that cannot be parsed gets an error line instead of failing the batch.
+    """
+    if not os.path.exists(request.repo_path):
+        raise HTTPException(status_code=404, detail=f"Repository not found: {request.repo_path}")
+    if not request.files and not request.pattern:
+        raise HTTPException(status_code=400, detail="Provide files or pattern")
+    language = request.language.lower() if request.language else None
+    if language is not None and language not in PARSERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported language: {request.language}")
 
-@app.post("/generate-docs")
-def generate_docs(file_path: str, repo_path: str, language: str, last_doc_commit_hash: Optional[str] = None, target_format: str = "markdown"):
-    """Generate AI-powered documentation for functions in a specific file"""
+    code_files = []
+    seen = set()  # Full paths, so a file listed and matched by the pattern is parsed once
+    for file_path in request.files or []:
+        full_path = os.path.join(request.repo_path, file_path) if not os.path.isabs(file_path) else file_path
+        if os.path.abspath(full_path) in seen:
+            continue
+        seen.add(os.path.abspath(full_path))
+        file_language = language or repo_scanner.supported_extensions.get(os.path.splitext(file_path)[1].lower(), "unknown")
+        code_files.append({"file_path": file_path, "full_path": full_path, "language": file_language})
+    if request.pattern:
+        try:
+            # Matched against repo-relative paths; like fnmatch, `*` also crosses directories
+            for file_info in repo_scanner.get_code_files_for_analysis(request.repo_path):
+                if fnmatch.fnmatch(file_info["file_path"], request.pattern) \
+                        and (language is None or file_info["language"] == language) \
+                        and os.path.abspath(file_info["full_path"]) not in seen:
+                    code_files.append(file_info)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Repository scan failed: {str(e)}")
+
+    return StreamingResponse(_stream_function_analysis(request.repo_path, code_files), media_type="application/x-ndjson")
+
+def _stream_function_analysis(repo_path: str, code_files: List[dict]):
+    """NDJSON lines: a header, one line per file in completion order, then a summary"""
+    yield json.dumps({"record": "header", "repository_path": repo_path, "total_files": len(code_files)}) + "\n"
+
+    parsed = failed = function_count = 0
     try:
-        # Normalize and validate language
-        lang_key = language.lower()
-        parser_class = PARSERS.get(lang_key)
-        if not parser_class:
-            raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
+        for file_info, model, error in parse_pool.iter_parsed(code_files):
+            record = {"record": "file", "file_path": file_info["file_path"], "language": file_info["language"]}
+            if model is None:
+                failed += 1
+                record.update({"success": False, "error": error})
+            else:
+                parsed += 1
+                function_count += len(model.functions)
+                record.update({
+                    "success": True,
+                    "function_count": len(model.functions),
+                    "functions": [_function_json(func) for func in model.functions]
+                })
+            yield json.dumps(record) + "\n"
+    except Exception as e:
+        yield json.dumps({"record": "error", "detail": f"Function analysis failed: {str(e)}"}) + "\n"
+        return
 
-        # Validate file path
-        full_path = os.path.join(repo_path, file_path) if not os.path.isabs(file_path) else file_path
-        if not os.path.exists(full_path):
-            raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+    yield json.dumps({
+        "record": "summary",
+        "files_parsed": parsed,
+        "files_failed": failed,
+        "function_count": function_count
+    }) + "\n"
 
-        # Parse functions
-        parser = parser_class()
-        functions = parser.parse_file(full_path)
-        docs = []
+def _function_json(func: FunctionInfo) -> dict:
+    return {
+        "name": func.name,
+        "parameters": func.params,
+        "line_range": f"{func.lineno}-{func.end_lineno}",
+        "has_docstring": bool(func.docstring),
+        "docstring": func.docstring
+    }
 
-        for func in functions:
-            try:
-                # Add git commit analysis (with fallback)
-                try:
-                    func.commits = GitAnalyzer.get_commits_for_function(repo_path, func)
-                except Exception:
-                    func.commits = []  # Continue without git history
-                
-                # Generate AI documentation (with fallback)
-                try:
-                    summary = doc_generator.generate_function_doc(func, target_format)
-                except Exception:
-                    # Fallback template
-                    summary = f"""# {func.name}
+# ===== DOCUMENTATION GENERATION =====
+
+async def _function_doc(repo_path: str, func: FunctionInfo, target_format: str, last_doc_commit_hash: Optional[str],
+                        git_session: GitSession, git_work: asyncio.Task) -> Optional[FunctionDoc]:
+    """Documentation of one function, with its commits and staleness; None when it cannot be documented"""
+    try:
+        await git_work
+        
+        # Add git commit analysis (with fallback)
+        try:
+            func.commits = GitAnalyzer.get_commits_for_function(repo_path, func, session=git_session)
+        except Exception:
+            func.commits = []  # Continue without git history
+        
+        # Generate AI documentation (with fallback)
+        try:
+            summary = await doc_generator.generate_function_doc_async(func, target_format)
+        except Exception:
+            # Fallback template
+            summary = f"""# {func.name}
 
 ## Description
 Function '{func.name}' with {len(func.params)} parameter(s)
@@ -194,21 +414,55 @@ Function '{func.name}' with {len(func.params)} parameter(s)
 ## Docstring
 {func.docstring or "No docstring available"}
 """
-                
-                # Check for stale documentation
+        
+        # Check for stale documentation
+        stale = False
+        if last_doc_commit_hash:
+            try:
+                stale = GitAnalyzer.detect_stale_doc(func, last_doc_commit_hash, repo_path, session=git_session)
+            except Exception:
                 stale = False
-                if last_doc_commit_hash:
-                    try:
-                        stale = GitAnalyzer.detect_stale_doc(func, last_doc_commit_hash, repo_path)
-                    except Exception:
-                        stale = False
-                
-                docs.append(FunctionDoc(func, summary, stale))
-                
-            except Exception as e:
-                print(f"Error processing function {func.name}: {e}")
-                continue
         
+        return FunctionDoc(func, summary, stale)
+        
+    except Exception as e:
+        print(f"Error processing function {func.name}: {e}")
+        return None
+
+@app.post("/generate-docs")
+async def generate_docs(file_path: str, repo_path: str, language: str, last_doc_commit_hash: Optional[str] = None, target_format: str = "markdown"):
+    """Generate AI-powered documentation for functions in a specific file"""
+    try:
+        # Normalize and validate language
+        lang_key = language.lower()
+        parser_class = PARSERS.get(lang_key)
+        if not parser_class:
+            raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
+
+        # Validate file path
+        full_path = os.path.join(repo_path, file_path) if not os.path.isabs(file_path) else file_path
+        if not os.path.exists(full_path):
+            raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+
+        # Blame and diff of the file run in the git pool while it is parsed
+        git_session = GitSession(history_store=history_store)
+        async with doc_generator.llm_session():
+            git_work = asyncio.create_task(git_session.prefetch(repo_path, [full_path], git_executor, last_doc_commit_hash))
+            documenting = []
+            try:
+                # Each function is documented as soon as it is parsed; the LLM calls run concurrently
+                functions = _iter_functions(parser_class, full_path)
+                while (func := await asyncio.to_thread(next, functions, None)) is not None:
+                    documenting.append(asyncio.create_task(
+                        _function_doc(repo_path, func, target_format, last_doc_commit_hash, git_session, git_work)))
+                docs = [doc for doc in await asyncio.gather(*documenting) if doc is not None]
+            finally:
+                git_work.cancel()
+                for task in documenting:
+                    task.cancel()
+        
+        # Functions arrive as their ends are found (inner before outer); report them in source order
+        docs.sort(key=lambda doc: doc.function_info.lineno)
         return {
             "success": True,
             "file_path": file_path,
@@ -228,18 +482,33 @@ Function '{func.name}' with {len(func.params)} parameter(s)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Documentation generation failed: {str(e)}")
 
+def _scan_for_docs(repo_path: str):
+    """Structure, architecture, structure tree and code files of a repository, from one snapshot"""
+    with repo_scanner.snapshot_scope():
+        return (repo_scanner.scan_repository(repo_path), repo_scanner.analyze_code_architecture(repo_path),
+                repo_scanner.generate_code_structure_tree(repo_path), repo_scanner.get_code_files_for_analysis(repo_path))
+
+async def _key_function_docs(repo_path: str, functions: List[FunctionInfo], target_format: str, git_session: GitSession,
+                             git_work: asyncio.Task) -> List[Optional[str]]:
+    """AI docs of functions, in order, once the git work of their file is done; None for those that failed"""
+    await git_work
+    for func in functions:
+        func.commits = git_session.get_commits_for_function(repo_path, func)
+    summaries = await doc_generator.generate_function_docs(functions, target_format)
+    return [None if isinstance(summary, Exception) else summary for summary in summaries]
+
 @app.post("/generate-complete-repo-docs")
-def generate_complete_repo_docs(repo_path: str, output_file: str = "Complete_Repository_Documentation.md", target_format: str = "markdown"):
+async def generate_complete_repo_docs(repo_path: str, output_file: str = "Complete_Repository_Documentation.md", target_format: str = "markdown"):
     """Generate comprehensive documentation for entire repository"""
     try:
         if not os.path.exists(repo_path):
             raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
         
-        # Scan repository structure
-        structure = repo_scanner.scan_repository(repo_path)
-        architecture = repo_scanner.analyze_code_architecture(repo_path)
-        structure_tree = repo_scanner.generate_code_structure_tree(repo_path)
-        code_files = repo_scanner.get_code_files_for_analysis(repo_path)
+        # The history store catches up with HEAD once, while the repository is scanned
+        git_session = GitSession(history_store=history_store)
+        history = asyncio.create_task(git_session.load_history(repo_path))
+        # Scan repository structure (one walk shared by every analysis)
+        structure, architecture, structure_tree, code_files = await asyncio.to_thread(_scan_for_docs, repo_path)
         
         # Generate comprehensive documentation
         doc_content = f"""# Complete Repository Documentation
@@ -272,50 +541,58 @@ def generate_complete_repo_docs(repo_path: str, output_file: str = "Complete_Rep
         
         # Generate docs for key files
         documented_files = 0
-        for file_info in code_files[:8]:  # Limit for performance
+        await history
+        # Parse the key files in the worker pool (limit for performance)
+        key_files = [f for f in code_files[:8] if f["language"] in PARSERS and os.path.exists(f["full_path"])]
+        # Git work of every key file runs in the git pool while earlier files are documented
+        async with doc_generator.llm_session():
+            git_work = [asyncio.create_task(git_session.prefetch(repo_path, [f["full_path"]], git_executor)) for f in key_files]
+            key_docs = []
             try:
-                lang_key = file_info["language"].lower()
-                if lang_key == "javascript":
-                    lang_key = "js"
-                elif lang_key == "typescript":
-                    lang_key = "ts"
-                elif lang_key == "python":
-                    lang_key = "py"
+                parsed = await asyncio.to_thread(lambda: list(parse_pool.iter_parsed(key_files, ordered=True)))
+                # LLM docs of the key functions of every file are requested together
+                key_docs = [asyncio.create_task(_key_function_docs(repo_path, file_model.functions[:2], target_format,
+                                                                   git_session, file_git_work))
+                            if file_model is not None else None
+                            for (_, file_model, _), file_git_work in zip(parsed, git_work)]
+                for (file_info, file_model, parse_error), file_key_docs in zip(parsed, key_docs):
+                    try:
+                        if file_model is None:
+                            raise ValueError(parse_error)
+                        # One parse yields both the functions and the class structure
+                        functions = file_model.functions
+                        code_structure = file_model.class_structure()
                 
-                parser_class = PARSERS.get(lang_key)
-                if parser_class and os.path.exists(file_info["full_path"]):
-                    parser = parser_class()
-                    functions = parser.parse_file(file_info["full_path"])
-                    code_structure = repo_scanner.extract_class_structure(file_info["full_path"], file_info["language"])
+                        if functions or code_structure.get('classes'):
+                            doc_content += f"### {file_info['file_path']}\n"
+                            doc_content += f"**Language:** {file_info['language'].title()}\n"
+                            doc_content += f"**Type:** {file_info.get('file_type', 'other').title()}\n\n"
                     
-                    if functions or code_structure.get('classes'):
-                        doc_content += f"### {file_info['file_path']}\n"
-                        doc_content += f"**Language:** {file_info['language'].title()}\n"
-                        doc_content += f"**Type:** {file_info.get('file_type', 'other').title()}\n\n"
-                        
-                        if code_structure.get('classes'):
-                            doc_content += "**Classes:**\n"
-                            for cls in code_structure['classes'][:5]:
-                                doc_content += f"- `{cls['name']}` (line {cls['line']})\n"
-                                if cls.get('methods'):
-                                    for method in cls['methods'][:3]:
-                                        doc_content += f"  - `{method['name']}()` (line {method['line']})\n"
-                            doc_content += "\n"
-                        
-                        # Generate AI docs for key functions
-                        for func in functions[:2]:
-                            try:
-                                func.commits = []
-                                summary = doc_generator.generate_function_doc(func, target_format)
-                                doc_content += f"#### {func.name}\n{summary}\n\n"
-                            except Exception:
-                                doc_content += f"#### {func.name}\n**Parameters:** {', '.join(func.params) if func.params else 'None'}\n**Lines:** {func.lineno}-{func.end_lineno}\n\n"
-                        
-                        doc_content += "---\n\n"
-                        documented_files += 1
-            except Exception as e:
-                print(f"Error processing {file_info['file_path']}: {e}")
-                continue
+                            if code_structure.get('classes'):
+                                doc_content += "**Classes:**\n"
+                                for cls in code_structure['classes'][:5]:
+                                    doc_content += f"- `{cls['name']}` (line {cls['line']})\n"
+                                    if cls.get('methods'):
+                                        for method in cls['methods'][:3]:
+                                            doc_content += f"  - `{method['name']}()` (line {method['line']})\n"
+                                doc_content += "\n"
+                    
+                            # Generate AI docs for key functions
+                            for func, summary in zip(functions[:2], await file_key_docs):
+                                if summary is not None:
+                                    doc_content += f"#### {func.name}\n{summary}\n\n"
+                                else:
+                                    doc_content += f"#### {func.name}\n**Parameters:** {', '.join(func.params) if func.params else 'None'}\n**Lines:** {func.lineno}-{func.end_lineno}\n\n"
+                    
+                            doc_content += "---\n\n"
+                            documented_files += 1
+                    except Exception as e:
+                        print(f"Error processing {file_info['file_path']}: {e}")
+                        continue
+            finally:
+                for task in git_work + key_docs:
+                    if task is not None:
+                        task.cancel()
         
         doc_content += f"""
 ## Summary
@@ -349,46 +626,207 @@ def generate_complete_repo_docs(repo_path: str, output_file: str = "Complete_Rep
         raise HTTPException(status_code=500, detail=f"Repository documentation failed: {str(e)}")
 
 @app.post("/generate-complete-repo-docs-for-word")
-def generate_complete_repo_docs_for_word(repo_path: str, output_file: str = "Complete_Repository_Documentation_Word.md"):
+async def generate_complete_repo_docs_for_word(repo_path: str, output_file: str = "Complete_Repository_Documentation_Word.md"):
     """Generate comprehensive documentation specifically formatted for Word conversion"""
-    return generate_complete_repo_docs(repo_path, output_file, target_format="word")
+    return await generate_complete_repo_docs(repo_path, output_file, target_format="word")
 
 @app.post("/generate-individual-docs")
-def generate_individual_docs(repo_path: str, language: str = "java", target_format: str = "markdown"):
-    """Generate separate documentation file for each code file in the repository"""
+async def generate_individual_docs(repo_path: str, language: str = "java", target_format: str = "markdown", incremental: bool = False):
+    """
+    Generate separate documentation file for each code file in the repository.
+    With incremental, only functions whose source or position changed since the
+    last run are documented again; the other sections are kept from the existing files.
+    """
     try:
         if not os.path.exists(repo_path):
             raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
         
+        # One history store sync per run, overlapping the listing of the code files
+        git_session = GitSession(history_store=history_store)
+        history = asyncio.create_task(git_session.load_history(repo_path))
         # Get code files for the specified language
-        code_files = repo_scanner.get_code_files_for_analysis(repo_path, [language])
+        code_files = await asyncio.to_thread(repo_scanner.get_code_files_for_analysis, repo_path, [language])
+        
+        # Identical copies are parsed and sent to the LLM once
+        content_groups = await asyncio.to_thread(repo_scanner.group_identical_files, code_files)
+        group_of = {id(group[0]): index for index, group in enumerate(content_groups)}
         
-        generated_docs = []
-        for file_info in code_files:
+        await history
+        manifest = DocManifest(_individual_docs_folder())
+        previous = manifest.load(repo_path, language) if incremental else None
+        if previous is not None and previous.get("target_format") != target_format:
+            previous = None  # Sections of another format cannot be kept
+        previous_files = previous["files"] if previous is not None else {}
+        # Function spans changed since this commit are documented again
+        since_commit = previous.get("commit") if previous is not None else None
+        head = await asyncio.to_thread(git_session.head, repo_path)
+        # Files git shows changed since the last run, and files that differ from HEAD now
+        changed_paths = await git_session.changed_paths(repo_path, since_commit, git_executor) if since_commit else None
+        dirty_paths = await git_session.changed_paths(repo_path, head, git_executor) if head else None
+        
+        # Files that did not change since the last run keep their documentation as is
+        documented_groups = {}
+        records = {}
+        representatives = []
+        for index, group in enumerate(content_groups):
+            if group[0]["language"] not in PARSERS or not os.path.exists(group[0]["full_path"]):
+                continue
+            if previous_files and all(_individual_doc_unchanged(copy_info, previous_files, changed_paths) for copy_info in group):
+                documented_groups[index] = [{
+                    "file_path": copy_info['file_path'],
+                    "documentation_file": previous_files[copy_info['file_path']]["documentation_file"],
+                    "functions_documented": len(previous_files[copy_info['file_path']]["functions"]),
+                    "unchanged": True
+                } for copy_info in group]
+                records.update((copy_info['file_path'], previous_files[copy_info['file_path']]) for copy_info in group)
+            else:
+                representatives.append(group[0])
+        
+        # Files are parsed in the worker pool and documented as soon as they are parsed: the git work
+        # and LLM calls of several parsed files run concurrently, bounded by the git pool and the
+        # LLM concurrency limit, and their results are collected in order
+        in_flight = max(git_executor.max_concurrency, doc_generator.max_concurrency)
+        pending = deque()
+        parsed = parse_pool.iter_parsed(representatives)
+        async with doc_generator.llm_session():
             try:
-                # Map language for parser
-                lang_key = file_info["language"].lower()
-                if lang_key == "javascript":
-                    lang_key = "js"
-                elif lang_key == "typescript":
-                    lang_key = "ts"
-                elif lang_key == "python":
-                    lang_key = "py"
-                
-                parser_class = PARSERS.get(lang_key)
-                if not parser_class or not os.path.exists(file_info["full_path"]):
-                    continue
-                
-                # Parse functions
-                parser = parser_class()
-                functions = parser.parse_file(file_info["full_path"])
-                
-                if not functions:
-                    continue
-                
-                # Generate documentation content
-                file_doc_content = f"""# Documentation for {file_info['file_path']}
+                while True:
+                    item = await asyncio.to_thread(next, parsed, None)
+                    if item is not None:
+                        file_info, file_model, parse_error = item
+                        if file_model is None:
+                            print(f"Error processing {file_info['file_path']}: {parse_error}")
+                            continue
+                        if not file_model.functions:
+                            continue
+                        group_index = group_of[id(file_info)]
+                        copy_paths = [copy_info["full_path"] for copy_info in content_groups[group_index]]
+                        # Line-level diffs only for files last documented from their committed content
+                        group_since = since_commit if any(_documented_at_commit(copy_info, previous_files)
+                                                          for copy_info in content_groups[group_index]) else None
+                        git_work = asyncio.create_task(git_session.prefetch(repo_path, copy_paths, git_executor, group_since))
+                        documenting = asyncio.create_task(_write_group_docs(
+                            repo_path, file_info, content_groups[group_index], file_model, target_format,
+                            git_session, git_work, previous_files, since_commit))
+                        pending.append((group_index, git_work, documenting))
+                        if len(pending) <= in_flight:
+                            continue
+                    elif not pending:
+                        break
+                    
+                    group_index, _, documenting = pending.popleft()
+                    documented_groups[group_index], group_records = await documenting
+                    records.update(group_records)
+            finally:
+                for _, git_work, documenting in pending:
+                    git_work.cancel()
+                    documenting.cancel()
+        
+        generated_docs = [generated for index in sorted(documented_groups) for generated in documented_groups[index]]
+        for file_path, record in records.items():
+            record["dirty"] = dirty_paths is None or _git_path(file_path) in dirty_paths
+        # Recorded after every run, so the next run can be incremental
+        manifest.save(repo_path, language, {"target_format": target_format, "commit": head, "files": records})
+        
+        return {
+            "success": True,
+            "message": f"Generated individual documentation for {len(generated_docs)} files",
+            "repository_path": repo_path,
+            "language": language,
+            "output_folder": "documentation-generated/individual/",
+            "generated_files": generated_docs,
+            "total_files_processed": len(generated_docs),
+            "unique_contents": len(content_groups),
+            "incremental": previous is not None,
+            "functions_regenerated": sum(generated.get("functions_regenerated", 0) for generated in generated_docs),
+            "functions_reused": sum(generated.get("functions_reused", 0) for generated in generated_docs)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Individual documentation generation failed: {str(e)}")
+
+def _individual_docs_folder() -> str:
+    return os.path.join(os.getcwd(), "documentation-generated", "individual")
+
+def _individual_doc_filename(file_path: str) -> str:
+    """Documentation file of a code file, under the folder of its repository-relative path so equal names never share one"""
+    filename_base = os.path.basename(file_path).replace('.', '_')
+    return os.path.join(os.path.dirname(file_path), f"Individual_{filename_base}_Documentation.md")
+
+def _git_path(file_path: str) -> str:
+    return file_path.replace(os.sep, "/")
+
+def _documented_at_commit(file_info: dict, previous_files: dict) -> bool:
+    """Whether the last run documented this file as committed, so git can tell what changed since"""
+    record = previous_files.get(file_info['file_path'])
+    return record is not None and not record.get("dirty", True)
 
+def _individual_doc_unchanged(file_info: dict, previous_files: dict, changed_paths: Optional[set]) -> bool:
+    """Whether the last run documented this exact content and its documentation file is still there"""
+    record = previous_files.get(file_info['file_path'])
+    # Runs that named documentation files after the basename alone may have overwritten it with another file's
+    if record is None or record["documentation_file"] != _individual_doc_filename(file_info['file_path']):
+        return False
+    if not os.path.exists(os.path.join(_individual_docs_folder(), record["documentation_file"])):
+        return False
+    if changed_paths is not None and _documented_at_commit(file_info, previous_files):
+        return _git_path(file_info['file_path']) not in changed_paths
+    return file_info.get("content_hash") is not None and record["content_hash"] == file_info["content_hash"]
+
+async def _write_group_docs(repo_path: str, file_info: dict, copies: List[dict], file_model: FileModel, target_format: str,
+                            git_session: GitSession, git_work: asyncio.Task, previous_files: Optional[dict] = None,
+                            since_commit: Optional[str] = None) -> Tuple[List[dict], dict]:
+    """Fan the parsed content of file_info out to every path that shares it; returns the docs and their manifest records"""
+    await git_work
+    with open(file_info["full_path"], "r", encoding="utf-8", errors="replace") as f:
+        identities = function_identities(file_model, f.read())
+    generated_docs = []
+    records = {}
+    for copy_info in copies:
+        try:
+            previous_record = (previous_files or {}).get(copy_info['file_path'])
+            # The diff since the last run's commit only tells what changed if that run saw the committed file
+            copy_since = since_commit if _documented_at_commit(copy_info, previous_files or {}) else None
+            # One copy at a time, so later copies reuse the LLM docs of the first
+            generated = await _write_individual_doc(repo_path, copy_info, file_model.functions, identities, target_format,
+                                              git_session, previous_record, copy_since)
+            records[copy_info['file_path']] = {
+                "documentation_file": generated["documentation_file"],
+                "content_hash": copy_info.get("content_hash"),
+                "functions": {function_id: [digest, func.lineno, func.end_lineno]
+                              for func, (function_id, digest) in zip(file_model.functions, identities)}
+            }
+            if copy_info is not file_info:
+                generated["identical_to"] = file_info['file_path']
+            generated_docs.append(generated)
+        except Exception as e:
+            print(f"Error processing {copy_info['file_path']}: {e}")
+            continue
+    return generated_docs, records
+
+async def _write_individual_doc(repo_path: str, file_info: dict, functions: List[FunctionInfo], identities: List[Tuple[str, str]],
+                                target_format: str, git_session: Optional[GitSession] = None,
+                                previous_record: Optional[dict] = None, since_commit: Optional[str] = None) -> dict:
+    """
+    Write the documentation file of one code file from its parsed functions.
+    Sections of functions the previous run documented from the same lines at
+    the same position, and that git does not show changed since since_commit,
+    are kept from the existing file.
+    """
+    docs_folder = _individual_docs_folder()
+    doc_filename = _individual_doc_filename(file_info['file_path'])
+    doc_path = os.path.join(docs_folder, doc_filename)
+    
+    header = f"# Documentation for {file_info['file_path']}\n"
+    kept_sections = {}
+    if previous_record is not None and os.path.exists(doc_path):
+        with open(doc_path, 'r', encoding='utf-8') as f:
+            existing = f.read()
+        # Only sections written for this very file are kept
+        if existing.startswith(header):
+            kept_sections = split_sections(existing)
+    
+    file_doc_content = f"""{header}
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 Repository: {repo_path}
 Language: {file_info['language']}
@@ -396,15 +834,32 @@ Language: {file_info['language']}
 ---
 
 """
-                
-                # Generate AI docs for each function
-                for func in functions:
-                    try:
-                        func.commits = []  # Skip git analysis for performance
-                        summary = doc_generator.generate_function_doc(func, target_format)
-                        file_doc_content += f"{summary}\n\n---\n\n"
-                    except Exception:
-                        file_doc_content += f"""# {func.name}
+    
+    # Kept sections stay in place; the functions to document again are sent to the LLM together
+    sections = []
+    regenerate = []
+    for func, (function_id, digest) in zip(functions, identities):
+        func = copy.copy(func)  # Parsed functions are shared by identical files
+        func.file_path = file_info["full_path"]
+        recorded = previous_record["functions"].get(function_id) if previous_record is not None else None
+        if (function_id in kept_sections and recorded == [digest, func.lineno, func.end_lineno]
+                and not (since_commit and git_session and git_session.detect_stale_doc(func, since_commit, repo_path))):
+            sections.append(section(function_id, digest, kept_sections[function_id]))
+            continue
+        
+        # Commits of the file from the history store, or of the function's lines from the prefetched blame
+        func.commits = git_session.get_commits_for_function(repo_path, func) if git_session else []
+        regenerate.append((len(sections), func, function_id, digest))
+        sections.append(None)
+    
+    # Generate AI docs for each function
+    summaries = await doc_generator.generate_function_docs([func for _, func, _, _ in regenerate], target_format,
+                                                           content_key=file_info.get("content_hash"))
+    for (position, func, function_id, digest), summary in zip(regenerate, summaries):
+        if not isinstance(summary, Exception):
+            body = f"{summary}\n\n---\n\n"
+        else:
+            body = f"""# {func.name}
 
 ## Description
 Function '{func.name}' with {len(func.params)} parameter(s)
@@ -419,39 +874,21 @@ Function '{func.name}' with {len(func.params)} parameter(s)
 ---
 
 """
-                
-                # Save individual file documentation in organized folder structure
-                docs_folder = os.path.join(os.getcwd(), "documentation-generated", "individual")
-                os.makedirs(docs_folder, exist_ok=True)
-                filename_base = os.path.basename(file_info['file_path']).replace('.', '_')
-                doc_filename = f"Individual_{filename_base}_Documentation.md"
-                doc_path = os.path.join(docs_folder, doc_filename)
-                
-                with open(doc_path, 'w', encoding='utf-8') as f:
-                    f.write(file_doc_content)
-                
-                generated_docs.append({
-                    "file_path": file_info['file_path'],
-                    "documentation_file": doc_filename,
-                    "functions_documented": len(functions)
-                })
-                
-            except Exception as e:
-                print(f"Error processing {file_info['file_path']}: {e}")
-                continue
-        
-        return {
-            "success": True,
-            "message": f"Generated individual documentation for {len(generated_docs)} files",
-            "repository_path": repo_path,
-            "language": language,
-            "output_folder": "documentation-generated/individual/",
-            "generated_files": generated_docs,
-            "total_files_processed": len(generated_docs)
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Individual documentation generation failed: {str(e)}")
+        sections[position] = section(function_id, digest, body)
+    file_doc_content += "".join(sections)
+    
+    # Save individual file documentation in organized folder structure
+    os.makedirs(os.path.dirname(doc_path), exist_ok=True)
+    with open(doc_path, 'w', encoding='utf-8') as f:
+        f.write(file_doc_content)
+    
+    return {
+        "file_path": file_info['file_path'],
+        "documentation_file": doc_filename,
+        "functions_documented": len(functions),
+        "functions_regenerated": len(regenerate),
+        "functions_reused": len(functions) - len(regenerate)
+    }
 
 # ===== DOCUMENT CONVERSION ENDPOINTS =====
 
@@ -555,8 +992,75 @@ def convert_single_markdown_file(file_path: str, formats: List[str] = ["docx"]):
 # ===== TESTING ENDPOINTS =====
 # ===== TESTING ENDPOINTS =====
 
+async def _run_api_tests(test_repo: str, test_file: str, test_language: str) -> dict:
+    """Run each API endpoint once and collect the results"""
+    results = {}
+    
+    # 1. Test supported languages
+    try:
+        results["supported_languages"] = get_supported_languages()
+    except Exception as e:
+        results["supported_languages"] = {"error": str(e)}
+    
+    # 2. Test repository structure scan
+    try:
+        results["repository_scan"] = scan_repository(test_repo)
+    except Exception as e:
+        results["repository_scan"] = {"error": str(e)}
+    
+    # 3. Test analyze single file functions
+    try:
+        results["single_file_analysis"] = analyze_functions(test_file, test_repo, test_language)
+    except Exception as e:
+        results["single_file_analysis"] = {"error": str(e)}
+    
+    # 4. Test generate docs for single file
+    try:
+        results["single_file_docs"] = await generate_docs(test_file, test_repo, test_language)
+    except Exception as e:
+        results["single_file_docs"] = {"error": str(e)}
+    
+    # 5. Generate complete repository documentation
+    try:
+        results["complete_repo_docs"] = await generate_complete_repo_docs(test_repo, "Complete_Employee_System_Docs.md")
+    except Exception as e:
+        results["complete_repo_docs"] = {"error": str(e)}
+    
+    # 6. Generate individual documentation for each Java file
+    try:
+        results["individual_file_docs"] = await generate_individual_docs(test_repo, "java")
+    except Exception as e:
+        results["individual_file_docs"] = {"error": str(e)}
+    
+    # 7. Test document conversion to Word
+    try:
+        results["word_conversion"] = convert_documentation_to_word("documentation-generated")
+    except Exception as e:
+        results["word_conversion"] = {"error": str(e)}
+    
+    # 8. Test single file conversion (if documentation files exist)
+    try:
+        doc_files = []
+        for root, dirs, files in os.walk("documentation-generated"):
+            for file in files:
+                if file.endswith('.md'):
+                    doc_files.append(os.path.join(root, file))
+                    break  # Just test one file
+            if doc_files:
+                break
+        
+        if doc_files:
+            test_md_file = doc_files[0]
+            results["single_file_conversion"] = convert_single_markdown_file(test_md_file, ["docx"])
+        else:
+            results["single_file_conversion"] = {"message": "No markdown files found for testing"}
+    except Exception as e:
+        results["single_file_conversion"] = {"error": str(e)}
+    
+    return results
+
 @app.get("/test-all")
-def test_all_apis():
+async def test_all_apis():
     """Test all API endpoints with the Employee Management System repository"""
     try:
         # Test parameters for Employee Management System
@@ -564,68 +1068,9 @@ def test_all_apis():
         test_repo = r"C:\Users\User\VisualStudio\Employee-Management-Sys\EmployeeManagementSystem"
         test_language = "java"
         
-        results = {}
-        
-        # 1. Test supported languages
-        try:
-            results["supported_languages"] = get_supported_languages()
-        except Exception as e:
-            results["supported_languages"] = {"error": str(e)}
-        
-        # 2. Test repository structure scan
-        try:
-            results["repository_scan"] = scan_repository(test_repo)
-        except Exception as e:
-            results["repository_scan"] = {"error": str(e)}
-        
-        # 3. Test analyze single file functions
-        try:
-            results["single_file_analysis"] = analyze_functions(test_file, test_repo, test_language)
-        except Exception as e:
-            results["single_file_analysis"] = {"error": str(e)}
-        
-        # 4. Test generate docs for single file
-        try:
-            results["single_file_docs"] = generate_docs(test_file, test_repo, test_language)
-        except Exception as e:
-            results["single_file_docs"] = {"error": str(e)}
-        
-        # 5. Generate complete repository documentation
-        try:
-            results["complete_repo_docs"] = generate_complete_repo_docs(test_repo, "Complete_Employee_System_Docs.md")
-        except Exception as e:
-            results["complete_repo_docs"] = {"error": str(e)}
-        
-        # 6. Generate individual documentation for each Java file
-        try:
-            results["individual_file_docs"] = generate_individual_docs(test_repo, "java")
-        except Exception as e:
-            results["individual_file_docs"] = {"error": str(e)}
-        
-        # 7. Test document conversion to Word
-        try:
-            results["word_conversion"] = convert_documentation_to_word("documentation-generated")
-        except Exception as e:
-            results["word_conversion"] = {"error": str(e)}
-        
-        # 8. Test single file conversion (if documentation files exist)
-        try:
-            doc_files = []
-            for root, dirs, files in os.walk("documentation-generated"):
-                for file in files:
-                    if file.endswith('.md'):
-                        doc_files.append(os.path.join(root, file))
-                        break  # Just test one file
-                if doc_files:
-                    break
-            
-            if doc_files:
-                test_md_file = doc_files[0]
-                results["single_file_conversion"] = convert_single_markdown_file(test_md_file, ["docx"])
-            else:
-                results["single_file_conversion"] = {"message": "No markdown files found for testing"}
-        except Exception as e:
-            results["single_file_conversion"] = {"error": str(e)}
+        # Every endpoint below reuses the same repository snapshot
+        with repo_scanner.snapshot_scope():
+            results = await _run_api_tests(test_repo, test_file, test_language)
         
         return {
             "success": True,
@@ -1,4 +1,5 @@
-from typing import List, Optional
+import sys
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
 from pydantic import BaseModel
 
 class CommitInfo:
@@ -18,6 +19,170 @@ class FunctionInfo:
         self.file_path = file_path
         self.commits: List[CommitInfo] = []
 
+class CompactFunctionInfo:
+    """
+    FunctionInfo for state that keeps very many functions alive, such as the
+    models IncrementalParser holds on to. Slotted, with interned names,
+    parameter names and file paths (one string per distinct path however many
+    functions point at it) and params stored as a tuple. No commit list is
+    allocated until commits are attached or read, and attach_commits() can
+    defer loading them until they are first read.
+    """
+    __slots__ = ("name", "params", "docstring", "lineno", "end_lineno", "_file_path", "_commits")
+
+    def __init__(self, name: str, params: Sequence[str], docstring: Optional[str], lineno: int, end_lineno: int,
+                 file_path: str):
+        self.name = sys.intern(name)
+        self.params = tuple(sys.intern(param) for param in params)
+        self.docstring = docstring
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+        self._file_path = sys.intern(file_path)
+        self._commits: Union[None, List[Any], Callable[[], Sequence[Any]]] = None
+
+    @classmethod
+    def from_function(cls, func: FunctionInfo) -> "CompactFunctionInfo":
+        compact = cls(func.name, func.params, func.docstring, func.lineno, func.end_lineno, func.file_path)
+        if func.commits:
+            compact.commits = list(func.commits)
+        return compact
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    @file_path.setter
+    def file_path(self, value: str) -> None:
+        self._file_path = sys.intern(value)
+
+    @property
+    def commits(self) -> List[Any]:
+        """Attached commits, loaded on first access when attached as a loader"""
+        if self._commits is None:
+            self._commits = []
+        elif callable(self._commits):
+            self._commits = list(self._commits())
+        return self._commits
+
+    @commits.setter
+    def commits(self, value: List[Any]) -> None:
+        self._commits = value
+
+    def attach_commits(self, loader: Callable[[], Sequence[Any]]) -> None:
+        """Fetch commits with loader() the first time they are read, e.g. from GitAnalyzer"""
+        self._commits = loader
+
+class ClassInfo:
+    def __init__(self, name: str, lineno: int, end_lineno: int):
+        self.name = name
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+        self.methods: List[FunctionInfo] = []   # functions declared directly in the class body
+        self.attributes: List[str] = []
+
+class FileModel:
+    """Everything a single parse of one source file yields"""
+    def __init__(self, file_path: str, language: str):
+        self.file_path = file_path
+        self.language = language
+        self.functions: List[FunctionInfo] = []  # every function and method, in parser order
+        self.classes: List[ClassInfo] = []
+        self.imports: List[str] = []
+        self.constants: List[str] = []
+        self.signatures: Dict[int, str] = {}     # declaration line -> stripped source line
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Path-independent form of the model, for content-addressed caching"""
+        index = {id(func): i for i, func in enumerate(self.functions)}
+        return {
+            "language": self.language,
+            "functions": [
+                [func.name, func.params, func.docstring, func.lineno, func.end_lineno]
+                for func in self.functions
+            ],
+            "classes": [
+                [cls.name, cls.lineno, cls.end_lineno, [index[id(m)] for m in cls.methods], cls.attributes]
+                for cls in self.classes
+            ],
+            "imports": self.imports,
+            "constants": self.constants,
+            "signatures": [[line, signature] for line, signature in self.signatures.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], file_path: str) -> "FileModel":
+        model = cls(file_path, data["language"])
+        model.functions = [
+            FunctionInfo(name, params, docstring, lineno, end_lineno, file_path)
+            for name, params, docstring, lineno, end_lineno in data["functions"]
+        ]
+        for name, lineno, end_lineno, methods, attributes in data["classes"]:
+            class_info = ClassInfo(name, lineno, end_lineno)
+            class_info.methods = [model.functions[i] for i in methods]
+            class_info.attributes = attributes
+            model.classes.append(class_info)
+        model.imports = data["imports"]
+        model.constants = data["constants"]
+        model.signatures = {line: signature for line, signature in data["signatures"]}
+        return model
+
+    def compact(self) -> "FileModel":
+        """Copy of the model whose functions are CompactFunctionInfos, for long-lived indexes"""
+        return self._copy(CompactFunctionInfo.from_function, sys.intern(self.file_path))
+
+    def copy(self) -> "FileModel":
+        """Copy with FunctionInfo and ClassInfo objects of its own, so a caller's changes stay with the caller"""
+        def copy_function(func) -> FunctionInfo:
+            copied = FunctionInfo(func.name, list(func.params), func.docstring, func.lineno, func.end_lineno, func.file_path)
+            copied.commits = list(func.commits)
+            return copied
+        return self._copy(copy_function, self.file_path)
+
+    def _copy(self, copy_function: Callable[[Any], Any], file_path: str) -> "FileModel":
+        model = FileModel(file_path, self.language)
+        copies = {id(func): copy_function(func) for func in self.functions}
+        model.functions = [copies[id(func)] for func in self.functions]
+        for cls in self.classes:
+            class_info = ClassInfo(cls.name, cls.lineno, cls.end_lineno)
+            class_info.methods = [copies.get(id(method), method) for method in cls.methods]
+            class_info.attributes = cls.attributes
+            model.classes.append(class_info)
+        model.imports = self.imports
+        model.constants = self.constants
+        model.signatures = self.signatures
+        return model
+
+    def attach_methods_by_span(self):
+        """Give each class the functions whose span it encloses most tightly"""
+        for func in self.functions:
+            owner = None
+            for cls in self.classes:
+                if cls.lineno <= func.lineno <= cls.end_lineno and (owner is None or cls.lineno >= owner.lineno):
+                    owner = cls
+            if owner is not None:
+                owner.methods.append(func)
+
+    def class_structure(self) -> Dict[str, Any]:
+        """The class/function/import view returned by RepoScanner.extract_class_structure"""
+        methods = {id(method) for cls in self.classes for method in cls.methods}
+        return {
+            "classes": [
+                {
+                    "name": cls.name,
+                    "line": cls.lineno,
+                    "methods": [self._symbol(method) for method in cls.methods],
+                    "attributes": list(cls.attributes)
+                }
+                for cls in self.classes
+            ],
+            "functions": [self._symbol(func) for func in self.functions if id(func) not in methods],
+            "imports": list(self.imports),
+            "constants": list(self.constants)
+        }
+
+    def _symbol(self, func: FunctionInfo) -> Dict[str, Any]:
+        return {"name": func.name, "line": func.lineno, "signature": self.signatures.get(func.lineno, "")}
+
 class FunctionDoc:
     def __init__(self, function_info: FunctionInfo, summary: str, stale: bool = False):
         self.function_info = function_info
@@ -36,6 +201,12 @@ class DocGenerationRequest(BaseModel):
     language: str
     last_doc_commit_hash: Optional[str] = None
 
+class FunctionAnalysisBatchRequest(BaseModel):
+    repo_path: str
+    files: Optional[List[str]] = None    # paths relative to repo_path (or absolute)
+    pattern: Optional[str] = None        # glob over the repository's code files, e.g. "src/**/*.java"
+    language: Optional[str] = None       # defaults to the language of each file's extension
+
 class IndividualDocsRequest(BaseModel):
     repo_path: str
     language: str = "java"
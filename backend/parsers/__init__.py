@@ -1 +1,17 @@
 # Parsers package for extracting function information from source code
+from parsers.python_parser import PythonParser
+from parsers.js_parser import JSParser
+from parsers.java_parser import JavaParser
+
+# Supported parsers mapping
+PARSERS = {
+    "py": PythonParser,
+    "python": PythonParser,
+    "js": JSParser,
+    "jsx": JSParser,
+    "ts": JSParser,
+    "tsx": JSParser,
+    "javascript": JSParser,
+    "typescript": JSParser,
+    "java": JavaParser
+}
@@ -1,84 +1,111 @@
 """
 Java parsing for function extraction
-Note: Install javalang for better parsing: pip install javalang
+Set JAVA_PARSER_MODE to choose how Java files are parsed:
+    scanner  - linear structural scanner (parsers/java_scanner.py), the default
+    javalang - full javalang AST (pip install javalang); Java 8 syntax only
+    auto     - javalang when installed, otherwise the scanner
 """
-import re
-from typing import List
-from models import FunctionInfo
+import os
+from typing import Generator, List, Tuple
+from models import ClassInfo, FileModel, FunctionInfo
+from parsers.java_scanner import JavaScanner
+from parsers.spans import clean_doc_comment, find_block_end, unwrap_class_region, wrap_class_region
+
+JAVA_PARSER_MODES = ("scanner", "javalang", "auto")
 
 class JavaParser:
     @staticmethod
-    def parse_file(file_path: str) -> List[FunctionInfo]:
-        try:
-            # Try using javalang if available
+    def mode() -> str:
+        mode = os.getenv("JAVA_PARSER_MODE", "scanner").strip().lower()
+        if mode not in JAVA_PARSER_MODES:
+            raise ValueError(f"JAVA_PARSER_MODE must be one of {', '.join(JAVA_PARSER_MODES)}, got {mode!r}")
+        if mode == "auto":
+            try:
+                import javalang  # noqa: F401
+                return "javalang"
+            except ImportError:
+                return "scanner"
+        return mode
+
+    @staticmethod
+    def parser_version() -> str:
+        # Each mode produces a different model, so the mode is part of the cache key
+        if JavaParser.mode() == "javalang":
             import javalang
-            return JavaParser._parse_with_javalang(file_path)
-        except ImportError:
-            # Fallback to regex parsing
-            return JavaParser._parse_with_regex(file_path)
-    
+            return f"javalang-2-{getattr(javalang, '__version__', 'unknown')}"
+        return "scanner-1"
+
     @staticmethod
-    def _parse_with_javalang(file_path: str) -> List[FunctionInfo]:
-        """Parse using javalang library"""
-        import javalang
-        
+    def parse_file(file_path: str) -> List[FunctionInfo]:
+        return JavaParser.parse_model(file_path).functions
+
+    @staticmethod
+    def iter_functions(file_path: str) -> Generator[FunctionInfo, None, FileModel]:
+        """Methods as soon as the scanner finds their ends; returns the model. javalang needs the whole file first"""
         with open(file_path, "r", encoding='utf-8') as f:
             code = f.read()
+        if JavaParser.mode() == "javalang":
+            model = JavaParser._parse_with_javalang(code, file_path)
+            yield from model.functions
+            return model
+        return (yield from JavaScanner(code, file_path).iter_functions())
+
+    @staticmethod
+    def parse_model(file_path: str) -> FileModel:
+        """Parse the file once into functions, classes and imports"""
+        with open(file_path, "r", encoding='utf-8') as f:
+            code = f.read()
+        return JavaParser.parse_source(code, file_path)
+
+    @staticmethod
+    def parse_source(code: str, file_path: str) -> FileModel:
+        if JavaParser.mode() == "javalang":
+            return JavaParser._parse_with_javalang(code, file_path)
+        return JavaParser._parse_with_scanner(code, file_path)
+
+    @staticmethod
+    def parse_region(code: str, file_path: str, in_class: bool = False) -> Tuple[FileModel, List[FunctionInfo]]:
+        """(model, direct members) for members cut out of a class body, or for whole type declarations"""
+        if not in_class:
+            return JavaParser.parse_source(code, file_path), []
+        return unwrap_class_region(JavaParser.parse_source(wrap_class_region(code), file_path))
+
+    @staticmethod
+    def _parse_with_scanner(code: str, file_path: str) -> FileModel:
+        """Exact spans and Javadoc from a single linear pass"""
+        return JavaScanner(code, file_path).scan()
+
+    @staticmethod
+    def _parse_with_javalang(code: str, file_path: str) -> FileModel:
+        """Parse using javalang library"""
+        import javalang
 
         tree = javalang.parse.parse(code)
-        functions = []
+        lines = code.split('\n')
+        model = FileModel(file_path, "java")
+        functions = {}
 
         for path, node in tree.filter(javalang.tree.MethodDeclaration):
-            functions.append(FunctionInfo(
+            lineno = node.position.line if node.position else 0
+            func = FunctionInfo(
                 name=node.name,
                 params=[p.name for p in node.parameters],
-                docstring=None,  # JavaDoc extraction can be added later
-                lineno=node.position.line if node.position else 0,
-                end_lineno=node.position.line + 5,  # Approximation, can enhance with parsing
+                docstring=clean_doc_comment(node.documentation) if node.documentation else None,
+                lineno=lineno,
+                end_lineno=find_block_end(lines, lineno - 1) if lineno else 0,
                 file_path=file_path
-            ))
-        return functions
-    
-    @staticmethod
-    def _parse_with_regex(file_path: str) -> List[FunctionInfo]:
-        """Fallback regex-based parsing"""
-        with open(file_path, "r", encoding='utf-8') as f:
-            content = f.read()
-        
-        functions = []
-        lines = content.split('\n')
-        
-        # Pattern for Java methods
-        method_pattern = r'(?:public|private|protected|static|\s)*\s+\w+\s+(\w+)\s*\(([^)]*)\)\s*\{'
-        
-        for i, line in enumerate(lines):
-            match = re.search(method_pattern, line)
-            if match:
-                name = match.group(1)
-                params_str = match.group(2)
-                params = [p.strip().split()[-1] for p in params_str.split(',') if p.strip()]
-                
-                # Find end line (simplified)
-                end_line = JavaParser._find_method_end(lines, i)
-                
-                functions.append(FunctionInfo(
-                    name=name,
-                    params=params,
-                    docstring=None,
-                    lineno=i + 1,
-                    end_lineno=end_line,
-                    file_path=file_path
-                ))
-        
-        return functions
-    
-    @staticmethod
-    def _find_method_end(lines: List[str], start_line: int) -> int:
-        """Find the end line of a method by counting braces"""
-        brace_count = 0
-        for i in range(start_line, len(lines)):
-            line = lines[i]
-            brace_count += line.count('{') - line.count('}')
-            if brace_count == 0 and '{' in lines[start_line]:
-                return i + 1
-        return start_line + 1  # Fallback
+            )
+            model.functions.append(func)
+            functions[id(node)] = func
+            if lineno:
+                model.signatures[lineno] = lines[lineno - 1].strip()
+
+        for path, node in tree.filter(javalang.tree.TypeDeclaration):
+            lineno = node.position.line if node.position else 0
+            cls = ClassInfo(node.name, lineno, find_block_end(lines, lineno - 1) if lineno else 0)
+            cls.methods = [functions[id(method)] for method in node.methods if id(method) in functions]
+            model.classes.append(cls)
+
+        for imported in tree.imports:
+            model.imports.append(("static " if imported.static else "") + imported.path + (".*" if imported.wildcard else ""))
+        return model
@@ -0,0 +1,318 @@
+"""
+Linear structural scanner for Java.
+
+Finds classes (including enums, interfaces, records and annotation types),
+methods with their exact brace spans, Javadoc comments and imports in a single
+pass, without building an AST. Strings, text blocks, character literals and
+comments are skipped so braces inside them never shift a span. The tokenizer
+only stops at braces, parentheses, semicolons, literals, comments and a few
+keywords; a member's modifiers, type and name are read from the source text
+before its parameter list once that list is closed.
+"""
+import re
+from bisect import bisect_left
+from typing import Generator, List, Optional
+
+from models import ClassInfo, FileModel, FunctionInfo
+from parsers.spans import clean_doc_comment
+
+_TOKEN = re.compile(r"""
+    (?=[/"'{}();cier])   # first characters of every alternative; lets the engine skip ahead
+    (?:
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<text_block>\"\"\".*?(?:\"\"\"|\Z))
+  | (?P<string>"(?:[^"\\\n]|\\.)*(?:"|$)|'(?:[^'\\\n]|\\.)*(?:'|$))
+  | (?P<keyword>(?<![\w$.])(?:class|interface|enum|record|import)(?![\w$]))
+  | (?P<punct>[{}();])
+    )
+""", re.S | re.X | re.M)
+
+_NAME = re.compile(r"[A-Za-z_$\u0080-￿][\w$\u0080-￿]*")
+
+_LEADING_NAME = re.compile(r"\s*([A-Za-z_$\u0080-￿][\w$\u0080-￿]*)")
+
+_TRAILING_NAME = re.compile(r"([A-Za-z_$\u0080-￿][\w$\u0080-￿]*)\s*$")
+
+# @Annotation or @Annotation(args), as far as args do not nest parentheses twice
+_ANNOTATION = re.compile(r"@\s*[\w$.]+(?:\s*\((?:[^()]|\([^()]*\))*\))?")
+
+_INNERMOST_GENERICS = re.compile(r"<[^<>]*>")
+
+_MODIFIERS = re.compile(
+    r"\s*(?:(?:public|protected|private|static|final|abstract|synchronized|native|strictfp|default|"
+    r"transient|volatile|sealed|non-sealed)(?![\w$-])\s*)*"
+)
+
+_MODIFIER_NAMES = {'public', 'protected', 'private', 'static', 'final', 'abstract', 'synchronized', 'native',
+                   'strictfp', 'default', 'transient', 'volatile', 'sealed'}
+
+# Words that start a statement; `word name(...)` with one of them is a call, not a method
+_STATEMENT_WORDS = {'return', 'throw', 'new', 'else', 'case', 'assert', 'yield', 'if', 'for', 'while', 'switch',
+                    'catch', 'synchronized', 'try', 'do', 'this', 'super'}
+
+# `new Type(...)` right before a '{' opens an anonymous class body
+_NEW_INSTANCE = re.compile(r"\bnew\s+[\w$.<>,?\[\]\s]+$")
+
+# `record Name<T>(`: anything else after `record` is a variable of that name
+_RECORD_HEAD = re.compile(r"\s*[\w$]+\s*(?:<.*>)?\s*$", re.S)
+
+_THROWS = re.compile(r"\s*(?:throws\b[\w$.<>,?\s]*)?$")
+
+
+def _blank(match) -> str:
+    """Replacement that keeps offsets: the matched text becomes spaces"""
+    return ' ' * len(match.group())
+
+
+def _param_names(text: str) -> List[str]:
+    """Parameter names from the source between a method's parentheses"""
+    text = _ANNOTATION.sub(_blank, text)
+    parts = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char in '(<':
+            depth += 1
+        elif char in ')>':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+
+    params = []
+    for part in parts:
+        names = _NAME.findall(part)
+        if names:
+            params.append(names[-1])
+    return params
+
+
+class _Frame:
+    __slots__ = ("kind", "offset", "member_start", "gap_start", "info")
+
+    def __init__(self, kind: str, offset: int, member_start: int = 0, gap_start: int = 0, info=None):
+        self.kind = kind                  # paren, class, method or block
+        self.offset = offset
+        self.member_start = member_start  # where the declaration owning a paren starts
+        self.gap_start = gap_start        # end of the token before a paren
+        self.info = info                  # ClassInfo of class frames, FunctionInfo of method frames
+
+
+class JavaScanner:
+    def __init__(self, source: str, file_path: str):
+        self.source = source
+        self.model = FileModel(file_path, "java")
+        # Line numbers are only looked up for declarations
+        self.newlines = [match.start() for match in re.finditer('\n', source)]
+        self.stack: List[_Frame] = []
+        self.gap_start = 0          # end of the previous token
+        self.member_start = 0       # start of the current member or statement
+        self.member_doc: Optional[str] = None
+        self.last_token = None      # value of the previous token
+        self.last_paren: Optional[_Frame] = None
+        self.pending_type = None    # [keyword end, keyword line, depth, name] until the type body opens
+        self.pending_method = None  # (name, params, start offset, doc, close offset) after a method head
+        self.pending_import = None  # end of an `import` keyword
+        self.completed: List[FunctionInfo] = []  # methods ended since the last yield
+        self.finished = set()                    # ids of all methods ended so far
+
+    def scan(self) -> FileModel:
+        for _ in self.iter_functions():
+            pass
+        return self.model
+
+    def iter_functions(self) -> Generator[FunctionInfo, None, FileModel]:
+        """Yield each method once its closing brace is found; inner methods come first"""
+        source = self.source
+        completed = self.completed
+        for match in _TOKEN.finditer(source):
+            if completed:
+                yield from completed
+                completed.clear()
+            kind = match.lastgroup
+            start, end = match.span()
+            if kind == 'comment':
+                text = match.group()
+                if text.startswith('/**') and len(text) > 4:
+                    self.member_doc = clean_doc_comment(text)
+                self.member_start = end
+            elif kind == 'punct':
+                self._punct(match.group(), start, end)
+            elif kind == 'keyword':
+                self._keyword(match.group(), start, end)
+            else:
+                self._before_token(start)
+                self.pending_method = None
+                self.last_token = None
+            self.gap_start = end
+
+        last_line = self._line(len(source))
+        for frame in self.stack:
+            if frame.info is not None:
+                frame.info.end_lineno = last_line  # Unterminated at end of file
+        yield from completed
+        for func in self.model.functions:
+            if id(func) not in self.finished:
+                yield func  # Unterminated at end of file
+        return self.model
+
+    def _line(self, offset: int) -> int:
+        return bisect_left(self.newlines, offset) + 1
+
+    def _line_text(self, offset: int) -> str:
+        start = self.source.rfind('\n', 0, offset) + 1
+        end = self.source.find('\n', offset)
+        return self.source[start:end if end != -1 else len(self.source)].strip()
+
+    def _class_body(self) -> bool:
+        return bool(self.stack) and self.stack[-1].kind == 'class'
+
+    # ===== TOKENS =====
+
+    def _before_token(self, offset: int) -> None:
+        """Resolve declarations that wait for the token at offset"""
+        if self.pending_type is not None and self.pending_type[3] is None:
+            # The type name is the first word after its keyword
+            keyword_end, line, depth, _ = self.pending_type
+            gap = self.source[keyword_end:offset]
+            name = _LEADING_NAME.match(gap)
+            if name is None or (self.source[keyword_end - 6:keyword_end] == 'record'
+                                and (not _RECORD_HEAD.match(gap) or self.source[offset] != '(')):
+                self.pending_type = None  # `record` used as an identifier
+            else:
+                self.pending_type[3] = name.group(1)
+
+    def _punct(self, value: str, offset: int, end: int) -> None:
+        self._before_token(offset)
+        pending_method, self.pending_method = self.pending_method, None
+
+        if value == '(':
+            self.stack.append(_Frame('paren', offset, self.member_start, self.gap_start))
+        elif value == ')':
+            frame = self._close('paren')
+            if frame is not None:
+                self.last_paren = frame
+                if self._class_body() and self.pending_type is None:
+                    self.pending_method = self._method_head(frame, offset)
+        elif value == '{':
+            self._open_brace(offset, pending_method)
+        elif value == '}':
+            frame = self._close('class', 'method', 'block')
+            if frame is not None and frame.kind == 'method':
+                self._finish(frame.info, self._line(offset))
+            elif frame is not None and frame.info is not None:
+                frame.info.end_lineno = self._line(offset)
+        elif value == ';':
+            if pending_method is not None and _THROWS.match(self.source[pending_method[4] + 1:offset]):
+                # Abstract or interface method without a body
+                self._finish(self._add_method(pending_method), self._line(offset))
+            if self.pending_import is not None:
+                self._add_import(self.source[self.pending_import:offset])
+                self.pending_import = None
+            if self.pending_type is not None and self.pending_type[2] == len(self.stack):
+                self.pending_type = None
+
+        if value != '(' and value != ')':
+            self.member_start = end
+            self.member_doc = None
+        self.last_token = value
+
+    def _keyword(self, value: str, offset: int, end: int) -> None:
+        self._before_token(offset)
+        self.pending_method = None
+        if value == 'import':
+            if not self.stack:
+                self.pending_import = end
+        else:
+            self.pending_type = [end, self._line(offset), len(self.stack), None]
+        self.last_token = value
+
+    def _close(self, *kinds: str) -> Optional[_Frame]:
+        """Pop the innermost frame of one of kinds, dropping unbalanced frames above it"""
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].kind in kinds:
+                frame = self.stack[index]
+                del self.stack[index:]
+                return frame
+        return None
+
+    def _add_import(self, text: str) -> None:
+        words = text.split()
+        if words and words[0] == 'static':
+            self.model.imports.append('static ' + ''.join(words[1:]))
+        elif words:
+            self.model.imports.append(''.join(words))
+
+    # ===== DECLARATIONS =====
+
+    def _open_brace(self, offset: int, pending_method) -> None:
+        depth = len(self.stack)
+        if self.pending_type is not None and self.pending_type[2] == depth:
+            _, line, _, name = self.pending_type
+            self.pending_type = None
+            cls = ClassInfo(name, line, line) if name else None
+            if cls is not None:
+                self.model.classes.append(cls)
+            self.stack.append(_Frame('class', offset, info=cls))
+            return
+
+        if pending_method is not None and _THROWS.match(self.source[pending_method[4] + 1:offset]):
+            self.stack.append(_Frame('method', offset, info=self._add_method(pending_method)))
+            return
+
+        after_paren = self.last_token == ')' and not self.source[self.gap_start:offset].strip()
+        if after_paren and self.last_paren is not None and (
+                self._class_body() or _NEW_INSTANCE.search(self.source[self.last_paren.gap_start:self.last_paren.offset])):
+            # Anonymous class body, or the body of an enum constant
+            self.stack.append(_Frame('class', offset))
+        else:
+            self.stack.append(_Frame('block', offset))
+
+    def _method_head(self, frame: _Frame, close: int):
+        """(name, params, start offset, doc, close offset) if a class-body paren list declares a method"""
+        head = _ANNOTATION.sub(_blank, self.source[frame.member_start:frame.offset])
+        if '=' in head:
+            return None  # Field initializer
+        name = _TRAILING_NAME.search(head)
+        if name is None:
+            return None
+        before = head[:name.start()]
+        if before.rstrip().endswith('.'):
+            return None  # Qualified call in an initializer block
+
+        types = before
+        while '<' in types:
+            stripped = _INNERMOST_GENERICS.sub(' ', types)
+            if stripped == types:
+                break
+            types = stripped
+        words = [word for word in _NAME.findall(types) if word not in _MODIFIER_NAMES]
+        if not words or name.group(1) in _STATEMENT_WORDS or any(word in _STATEMENT_WORDS for word in words):
+            return None  # Constructors and enum constants have no return type
+
+        start = frame.member_start + _MODIFIERS.match(head).end()
+        params = _param_names(self.source[frame.offset + 1:close])
+        return name.group(1), params, start, self.member_doc, close
+
+    def _finish(self, func: FunctionInfo, end_line: int) -> None:
+        func.end_lineno = end_line
+        self.finished.add(id(func))
+        self.completed.append(func)
+
+    def _add_method(self, head) -> FunctionInfo:
+        name, params, start, doc, _ = head
+        line = self._line(start)
+        func = FunctionInfo(
+            name=name,
+            params=params,
+            docstring=doc,
+            lineno=line,
+            end_lineno=line,
+            file_path=self.model.file_path
+        )
+        self.model.functions.append(func)
+        self.model.signatures.setdefault(line, self._line_text(start))
+        if self.stack and self.stack[-1].kind == 'class' and self.stack[-1].info is not None:
+            self.stack[-1].info.methods.append(func)
+        return func
@@ -1,65 +1,49 @@
 """
 JavaScript/TypeScript parsing for function extraction
 """
-from typing import List
-from models import FunctionInfo
-import subprocess
-import json
-import re
+from typing import Generator, List, Tuple
+from models import FileModel, FunctionInfo
+from parsers.js_scanner import JSScanner
+from parsers.spans import unwrap_class_region, wrap_class_region
 
 class JSParser:
     """
-    Uses regex-based parsing for JS files to extract functions
+    Uses a single-pass structural scanner (parsers/js_scanner.py) for JS/TS files
     For production use, consider using Babel parser via CLI or esprima
     """
 
+    @staticmethod
+    def parser_version() -> str:
+        # Bump when the scanner's output changes so cached parses are dropped
+        return "scanner-1"
+
     @staticmethod
     def parse_file(file_path: str) -> List[FunctionInfo]:
+        return JSParser.parse_model(file_path).functions
+
+    @staticmethod
+    def iter_functions(file_path: str) -> Generator[FunctionInfo, None, FileModel]:
+        """Functions as the scanner completes them, before the rest of the file is read; returns the model"""
         with open(file_path, "r", encoding='utf-8') as f:
             content = f.read()
-        
-        functions = []
-        lines = content.split('\n')
-        
-        # Patterns for different function types
-        patterns = [
-            # function declaration: function name() {}
-            r'function\s+(\w+)\s*\(([^)]*)\)',
-            # arrow function: const name = () => {}
-            r'(?:const|let|var)\s+(\w+)\s*=\s*\(([^)]*)\)\s*=>\s*\{',
-            # method in object/class: name() {}
-            r'(\w+)\s*\(([^)]*)\)\s*\{'
-        ]
-        
-        for i, line in enumerate(lines):
-            for pattern in patterns:
-                match = re.search(pattern, line)
-                if match:
-                    name = match.group(1)
-                    params_str = match.group(2) if len(match.groups()) > 1 else ""
-                    params = [p.strip() for p in params_str.split(',') if p.strip()]
-                    
-                    # Find end line (simplified - count braces)
-                    end_line = JSParser._find_function_end(lines, i)
-                    
-                    functions.append(FunctionInfo(
-                        name=name,
-                        params=params,
-                        docstring=None,  # Could extract JSDoc here
-                        lineno=i + 1,
-                        end_lineno=end_line,
-                        file_path=file_path
-                    ))
-        
-        return functions
-    
+        language = "typescript" if file_path.endswith(('.ts', '.tsx')) else "javascript"
+        return (yield from JSScanner(content, file_path, language).iter_functions())
+
+    @staticmethod
+    def parse_model(file_path: str) -> FileModel:
+        """Parse the file once into functions, classes and imports"""
+        with open(file_path, "r", encoding='utf-8') as f:
+            content = f.read()
+        return JSParser.parse_source(content, file_path)
+
+    @staticmethod
+    def parse_source(content: str, file_path: str) -> FileModel:
+        language = "typescript" if file_path.endswith(('.ts', '.tsx')) else "javascript"
+        return JSScanner(content, file_path, language).scan()
+
     @staticmethod
-    def _find_function_end(lines: List[str], start_line: int) -> int:
-        """Find the end line of a function by counting braces"""
-        brace_count = 0
-        for i in range(start_line, len(lines)):
-            line = lines[i]
-            brace_count += line.count('{') - line.count('}')
-            if brace_count == 0 and '{' in lines[start_line]:
-                return i + 1
-        return start_line + 1  # Fallback
+    def parse_region(content: str, file_path: str, in_class: bool = False) -> Tuple[FileModel, List[FunctionInfo]]:
+        """Parse statements, or class members when in_class; also returns the class members found"""
+        if not in_class:
+            return JSParser.parse_source(content, file_path), []
+        return unwrap_class_region(JSParser.parse_source(wrap_class_region(content), file_path))
@@ -0,0 +1,497 @@
+"""
+Single-pass structural scanner for JavaScript/TypeScript.
+
+One linear pass over the source skips strings, comments, template literals
+and regex literals, keeps a stack of open brackets and emits function, arrow
+function, class and method spans together with their JSDoc comments.
+
+The tokenizer only stops at structural characters (brackets, `;`, `,`, `=`,
+`:`, `=>`, `/`), literals, comments and a few declaration keywords. The
+identifiers and operators in between are skipped by the regex engine and are
+only looked at - as the "gap" before a token - when a declaration has to be
+named, so no part of the source is scanned twice.
+"""
+import re
+from bisect import bisect_left
+from typing import Generator, List, Optional, Tuple
+
+from models import ClassInfo, FileModel, FunctionInfo
+from parsers.spans import clean_doc_comment
+
+_TOKEN = re.compile(r"""
+    (?=[/'"`{}()\[\];,:=citr])   # first characters of every alternative; lets the engine skip ahead
+    (?:
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\\n]|\\.)*(?:'|$)|"(?:[^"\\\n]|\\.)*(?:"|$))
+  | (?P<template>`)
+  | (?P<keyword>(?<![\w$.])(?:class|interface|type|import|require)(?![\w$]))
+  | (?P<punct>=>|(?<![=!<>+\-*/%&|^])=(?![=>])|[{}()\[\];,:/])
+    )
+""", re.S | re.X | re.M)
+
+# Characters of a template literal up to its end or the next ${
+_TEMPLATE_CHUNK = re.compile(r"(?:[^`\\$]|\\.|\$(?!\{))*", re.S)
+
+_REGEX_LITERAL = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+
+_NAME = re.compile(r"[A-Za-z_$\u0080-￿][\w$\u0080-￿]*")
+
+_TRAILING_WORD = re.compile(r"[\w$]+$")
+
+# A trailing `<...>` type parameter list, as in `function name<T>(`
+_TRAILING_GENERICS = re.compile(r"<[^()]*>\s*$")
+
+_FUNCTION_KEYWORD = re.compile(r"\bfunction\s*\*?\s*$")
+
+# A statement keyword at the start of a line ends an arrow function without braces
+_NEXT_STATEMENT = re.compile(r"\n\s*(?:const|let|var|function|class|export|import|return|if|for|while|switch|throw|try)\b")
+
+# After these a '/' starts a regex literal rather than a division
+_REGEX_AFTER_NAMES = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                      'throw', 'case', 'do', 'else', 'yield', 'await'}
+
+# Names that look like `name(...) {` but never declare a function
+_NOT_FUNCTION_NAMES = {'if', 'for', 'while', 'switch', 'catch', 'with', 'function', 'return', 'typeof',
+                       'do', 'else', 'try', 'finally', 'new', 'await', 'yield', 'super', 'import', 'delete', 'void'}
+
+# '{' directly after one of these opens an object literal
+_OBJECT_AFTER = {'=', '(', ',', ':', '[', '?'}
+
+_PUNCT, _KEYWORD, _VALUE = 0, 1, 2
+
+
+class _Token:
+    __slots__ = ("value", "kind", "offset", "end", "gap_start", "doc")
+
+    def __init__(self, value: str, kind: int, offset: int, end: int, gap_start: int, doc: Optional[str]):
+        self.value = value
+        self.kind = kind
+        self.offset = offset
+        self.end = end
+        self.gap_start = gap_start  # identifiers and operators since the previous token start here
+        self.doc = doc              # JSDoc comment right before this token's gap
+
+
+class _Frame:
+    __slots__ = ("kind", "opener", "before", "info")
+
+    def __init__(self, kind: str, opener: Optional[_Token], before: Optional[_Token] = None, info=None):
+        self.kind = kind          # paren, bracket, block, object, class, function, type or template
+        self.opener = opener      # the opening token
+        self.before = before      # token before the opener's gap
+        self.info = info          # FunctionInfo / ClassInfo of function and class frames
+
+
+def _param_names(text: str) -> List[str]:
+    """Parameter names from the source between a function's parentheses"""
+    parts = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char in '([{<':
+            depth += 1
+        elif char in ')]}>':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+
+    params = []
+    for part in parts:
+        part = part.strip()
+        if part.startswith('...'):
+            part = part[3:]
+        if not part:
+            continue
+        if part[0] in '{[':
+            params.append(part)  # Destructuring pattern
+        else:
+            params.append(re.split(r'[\s:=?]', part, maxsplit=1)[0])
+    return params
+
+
+class JSScanner:
+    def __init__(self, source: str, file_path: str, language: str = "javascript"):
+        self.source = source
+        self.model = FileModel(file_path, language)
+        # Line numbers are only looked up for declarations, never per token
+        self.newlines = [match.start() for match in re.finditer('\n', source)]
+        self.gap_start = 0
+        self.recent: List[_Token] = []
+        self.stack: List[_Frame] = []
+        self.last_group = None        # (frame of the last closed paren, closing token)
+        self.pending_doc: Optional[str] = None
+        self.pending_class = None     # [name, line, depth, class token] between `class` and its body
+        self.pending_interface = None  # depth of an `interface` head
+        self.type_frames = 0          # open braces that belong to TypeScript types
+        self.arrow = None             # (FunctionInfo or None) right after `=>`
+        self.expression_arrows: List[Tuple[FunctionInfo, int]] = []
+        self.import_lines = set()
+        self.completed: List[FunctionInfo] = []  # functions ended since the last yield
+        self.finished = set()                    # ids of all functions ended so far
+
+    def scan(self) -> FileModel:
+        for _ in self.iter_functions():
+            pass
+        return self.model
+
+    def iter_functions(self) -> Generator[FunctionInfo, None, FileModel]:
+        """
+        Yield each function as soon as its end is known, so callers can start
+        on it while the rest of the source is scanned. Nested functions come
+        before the function around them.
+        """
+        pos = 0
+        while pos is not None:
+            pos = yield from self._scan_from(pos)
+
+        last_line = self._line_before(len(self.source))
+        for func, _ in self.expression_arrows:
+            func.end_lineno = last_line
+        for frame in self.stack:
+            if frame.info is not None:
+                frame.info.end_lineno = last_line  # Unterminated at end of file
+        yield from self.completed
+        for func in self.model.functions:
+            if id(func) not in self.finished:
+                yield func  # Unterminated, or dropped with an unbalanced frame
+        return self.model
+
+    def _scan_from(self, pos: int) -> Generator[FunctionInfo, None, Optional[int]]:
+        """
+        Tokenize from pos, yielding completed functions. Returns where to resume
+        after a template literal or a regex literal, or None at the end of the source.
+        """
+        source = self.source
+        emit = self._emit
+        completed = self.completed
+        for match in _TOKEN.finditer(source, pos):
+            if completed:
+                yield from completed
+                completed.clear()
+            kind = match.lastgroup
+            if kind == 'punct':
+                value = match.group()
+                if value == '/' and self._regex_allowed(match.start()):
+                    regex = _REGEX_LITERAL.match(source, match.start())
+                    if regex:
+                        emit(regex.group(), _VALUE, match.start(), regex.end())
+                        return regex.end()
+                emit(value, _PUNCT, match.start(), match.end())
+                if value == '}' and self.stack and self.stack[-1].kind == 'template':
+                    self.stack.pop()
+                    return self._scan_template(match.end())
+            elif kind == 'comment':
+                text = match.group()
+                if text.startswith('/**') and len(text) > 4:
+                    self.pending_doc = clean_doc_comment(text)
+                self.gap_start = match.end()
+            elif kind == 'template':
+                emit('`', _VALUE, match.start(), match.end())
+                return self._scan_template(match.end())
+            elif kind == 'keyword':
+                emit(match.group(), _KEYWORD, match.start(), match.end())
+            else:
+                emit(match.group(), _VALUE, match.start(), match.end())
+        return None
+
+    def _scan_template(self, pos: int) -> Optional[int]:
+        """Skip template literal text; returns the position after its end or after a `${`"""
+        pos = _TEMPLATE_CHUNK.match(self.source, pos).end()
+        if pos >= len(self.source):
+            return None
+        if self.source.startswith('${', pos):
+            self.stack.append(_Frame('template', None))
+            pos += 1
+        self.gap_start = pos + 1
+        return pos + 1
+
+    def _regex_allowed(self, offset: int) -> bool:
+        gap = self.source[self.gap_start:offset].rstrip()
+        if gap:
+            word = _TRAILING_WORD.search(gap)
+            if word:
+                return word.group() in _REGEX_AFTER_NAMES
+            return gap[-1] != '.'  # After an operator
+        if not self.recent:
+            return True
+        prev = self.recent[-1]
+        return prev.kind != _VALUE and prev.value not in (')', ']', '}')
+
+    def _line(self, offset: int) -> int:
+        return bisect_left(self.newlines, offset) + 1
+
+    def _line_before(self, offset: int) -> int:
+        """Line of the last non-blank character before offset"""
+        index = offset - 1
+        while index > 0 and self.source[index].isspace():
+            index -= 1
+        return self._line(max(index, 0))
+
+    def _line_text(self, offset: int) -> str:
+        start = self.source.rfind('\n', 0, offset) + 1
+        end = self.source.find('\n', offset)
+        return self.source[start:end if end != -1 else len(self.source)].strip()
+
+    def _gap(self, token: _Token) -> str:
+        return self.source[token.gap_start:token.offset]
+
+    # ===== TOKENS =====
+
+    def _emit(self, value: str, kind: int, offset: int, end: int) -> None:
+        token = _Token(value, kind, offset, end, self.gap_start, self.pending_doc)
+        self.pending_doc = None
+        self.gap_start = end
+
+        if self.arrow is not None and (value != '{' or self._gap(token).strip()):
+            # Arrow function without braces; its body is the expression that follows
+            func, self.arrow = self.arrow, None
+            if func is not None:
+                self.expression_arrows.append((func, len(self.stack)))
+        if self.expression_arrows:
+            self._end_expression_arrows(token)
+
+        if self.pending_class is not None and self.pending_class[0] is None and self.recent \
+                and self.recent[-1] is self.pending_class[3]:
+            # `class Name extends ...`: the name is the first word after the keyword
+            names = _NAME.findall(self._gap(token))
+            if names and names[0] not in ('extends', 'implements'):
+                self.pending_class[0] = names[0]
+
+        if kind == _PUNCT:
+            if value == '(' or value == '[':
+                self.stack.append(_Frame('paren' if value == '(' else 'bracket', token,
+                                         self.recent[-1] if self.recent else None))
+            elif value == ')' or value == ']':
+                frame = self._close(('paren',) if value == ')' else ('bracket',))
+                if frame is not None and value == ')':
+                    self.last_group = (frame, token)
+            elif value == '{':
+                self._open_brace(token)
+            elif value == '}':
+                frame = self._close(('block', 'object', 'class', 'function', 'type'))
+                if frame is not None and frame.info is not None:
+                    if frame.kind == 'function':
+                        self._finish(frame.info, self._line(offset))
+                    else:
+                        frame.info.end_lineno = self._line(offset)
+            elif value == '=>':
+                self.arrow = self._arrow_function(token)
+        elif kind == _KEYWORD:
+            self._keyword(token)
+
+        self.recent.append(token)
+        if len(self.recent) > 64:
+            del self.recent[:-16]
+
+    def _close(self, kinds: Tuple[str, ...]) -> Optional[_Frame]:
+        """Pop the innermost frame of one of kinds, dropping unbalanced frames above it"""
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].kind in kinds:
+                frame = self.stack[index]
+                for dropped in self.stack[index:]:
+                    if dropped.kind == 'type':
+                        self.type_frames -= 1
+                del self.stack[index:]
+                return frame
+            if self.stack[index].kind == 'template':
+                return None  # Never close across a template boundary
+        return None
+
+    def _end_expression_arrows(self, token: _Token) -> None:
+        """Close arrow functions without braces once their expression is over"""
+        depth = len(self.stack)
+        value = token.value if token.kind == _PUNCT else None
+        next_statement = _NEXT_STATEMENT.search(self._gap(token))
+        if next_statement:
+            end_line = self._line_before(token.gap_start + next_statement.start() + 1)
+        elif value in (';', ',', ')', ']', '}'):
+            end_line = self._line_before(token.offset)
+        else:
+            return
+        remaining = []
+        for func, arrow_depth in self.expression_arrows:
+            if (arrow_depth == depth and (next_statement or value in (';', ','))) \
+                    or (arrow_depth >= depth and value in (')', ']', '}')):
+                self._finish(func, end_line)
+            else:
+                remaining.append((func, arrow_depth))
+        self.expression_arrows = remaining
+
+    def _finish(self, func: FunctionInfo, end_line: int) -> None:
+        func.end_lineno = end_line
+        self.finished.add(id(func))
+        self.completed.append(func)
+
+    def _keyword(self, token: _Token) -> None:
+        value = token.value
+        if value == 'class':
+            # `const Name = class {` takes the name of the variable
+            name = None
+            prev = self.recent[-1] if self.recent else None
+            if prev is not None and prev.value == '=' and not self._gap(token).strip():
+                names = _NAME.findall(self._gap(prev))
+                name = names[-1] if names else None
+            self.pending_class = [name, self._line(token.offset), len(self.stack), token]
+        elif value == 'interface':
+            self.pending_interface = len(self.stack)
+        elif value == 'import' and not self.stack:
+            self._add_import(token)
+        elif value == 'require' and not self.stack:
+            if self._line_text(token.offset).startswith(('const ', 'let ', 'var ')):
+                self._add_import(token)
+
+    def _add_import(self, token: _Token) -> None:
+        line = self._line(token.offset)
+        if line not in self.import_lines:
+            self.import_lines.add(line)
+            self.model.imports.append(self._line_text(token.offset))
+
+    def _is_type_alias(self, token: Optional[_Token]) -> bool:
+        """Whether token is the `=` of `type Name = ...`"""
+        if token is None or token.value != '=' or len(self.recent) < 2:
+            return False
+        for index in range(len(self.recent) - 1, 0, -1):
+            if self.recent[index] is token:
+                keyword = self.recent[index - 1]
+                return keyword.kind == _KEYWORD and keyword.value == 'type'
+        return False
+
+    # ===== DECLARATIONS =====
+
+    def _open_brace(self, token: _Token) -> None:
+        depth = len(self.stack)
+        prev = self.recent[-1] if self.recent else None
+        gap = self._gap(token).strip()
+
+        if self.pending_interface == depth or (not gap and self._is_type_alias(prev)):
+            self.pending_interface = None
+            self.type_frames += 1
+            self.stack.append(_Frame('type', token))
+            return
+
+        if self.pending_class is not None and self.pending_class[2] == depth:
+            name, line, _, _ = self.pending_class
+            self.pending_class = None
+            cls = ClassInfo(name, line, line) if name else None
+            if cls is not None:
+                self.model.classes.append(cls)
+            self.stack.append(_Frame('class', token, info=cls))
+            return
+
+        if not gap and prev is not None and prev.value == '=>' and prev.kind == _PUNCT:
+            # Body of the arrow function announced by `=>`
+            func, self.arrow = self.arrow, None
+            self.stack.append(_Frame('function', token, info=func))
+            return
+
+        group = self._body_group(token)
+        if group is not None:
+            self.stack.append(_Frame('function', token, info=self._function_from_group(group)))
+            return
+
+        if (not gap and (prev is None or prev.value in _OBJECT_AFTER)) or gap == 'return':
+            self.stack.append(_Frame('object', token))
+        else:
+            self.stack.append(_Frame('block', token))
+
+    def _body_group(self, token: _Token):
+        """The parameter list token follows, directly or after a TypeScript return type"""
+        if self.last_group is None or not self.recent:
+            return None
+        frame, close = self.last_group
+        if self.recent[-1] is close:
+            return self.last_group if not self._gap(token).strip() else None
+        # `name(...): Type {`
+        for index in range(len(self.recent) - 1, -1, -1):
+            if self.recent[index] is close:
+                between = self.recent[index + 1:]
+                if between[0].value == ':' and not self._gap(between[0]).strip() \
+                        and not any(t.value in (';', '=', '{', '}', '=>') for t in between):
+                    return self.last_group
+                return None
+        return None
+
+    def _function_from_group(self, group) -> Optional[FunctionInfo]:
+        """Name a `...(params) {` head, or None for calls, control flow and anonymous functions"""
+        frame, close = group
+        if self.type_frames:
+            return None
+        opener = frame.opener
+        head = _TRAILING_GENERICS.sub('', self._gap(opener))
+        words = list(_NAME.finditer(head))
+        if not words or head[words[-1].end():].strip():
+            return None
+        last = words[-1]
+        before_name = head[:last.start()].rstrip()
+        enclosing = self.stack[-1].kind if self.stack else 'block'
+        params = _param_names(self.source[opener.end:close.offset])
+
+        if last.group() == 'function':
+            # Anonymous function expression: `name = function (` or `name: async function (`
+            before = frame.before
+            if before_name.strip() not in ('', 'async') or before is None:
+                return None
+            if before.value == '=' or (before.value == ':' and enclosing == 'object'):
+                return self._assigned_function(before, params)
+            return None
+
+        if last.group() in _NOT_FUNCTION_NAMES or before_name.endswith(('.', '?.', 'new')):
+            return None
+        if _FUNCTION_KEYWORD.search(before_name):
+            start = opener.gap_start + before_name.rfind('function')
+            return self._add_function(last.group(), start, params, opener.doc)
+        if enclosing in ('class', 'object'):
+            return self._add_function(last.group(), opener.gap_start + last.start(), params, opener.doc)
+        return None
+
+    def _arrow_function(self, arrow: _Token) -> Optional[FunctionInfo]:
+        """Name the arrow function announced by `=>` from `name = (...) =>` or `name: x =>`"""
+        if self.type_frames or not self.recent:
+            return None
+        group = self._body_group(arrow)
+        if group is not None:
+            frame, close = group
+            before = frame.before
+            head = self._gap(frame.opener)
+            params = _param_names(self.source[frame.opener.end:close.offset])
+        else:
+            words = _NAME.findall(self._gap(arrow))
+            if not words:
+                return None
+            before = self.recent[-1]
+            head = ' '.join(words[:-1])
+            params = [words[-1]]
+
+        if head.strip() not in ('', 'async') or before is None or self._is_type_alias(before):
+            return None
+        enclosing = self.stack[-1].kind if self.stack else 'block'
+        if before.value == '=' or (before.value == ':' and enclosing == 'object'):
+            return self._assigned_function(before, params)
+        return None
+
+    def _assigned_function(self, assignment: _Token, params: List[str]) -> Optional[FunctionInfo]:
+        """A function expression named by the `name =` or `name:` before it"""
+        gap = self._gap(assignment)
+        words = list(_NAME.finditer(gap))
+        if not words or gap[words[-1].end():].strip():
+            return None
+        return self._add_function(words[-1].group(), assignment.gap_start + words[-1].start(), params,
+                                  assignment.doc)
+
+    def _add_function(self, name: str, start_offset: int, params: List[str], doc: Optional[str]) -> FunctionInfo:
+        line = self._line(start_offset)
+        func = FunctionInfo(
+            name=name,
+            params=params,
+            docstring=doc,
+            lineno=line,
+            end_lineno=line,
+            file_path=self.model.file_path
+        )
+        self.model.functions.append(func)
+        self.model.signatures.setdefault(line, self._line_text(start_offset))
+        if self.stack and self.stack[-1].kind == 'class' and self.stack[-1].info is not None:
+            self.stack[-1].info.methods.append(func)
+        return func
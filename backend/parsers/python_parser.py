@@ -2,16 +2,64 @@
 Python AST parsing for function extraction
 """
 import ast
-from typing import List
-from models import FunctionInfo
+import sys
+from typing import Generator, List, Tuple
+from models import ClassInfo, FileModel, FunctionInfo
+from parsers.spans import shift_lines, unwrap_class_region, wrap_class_region
 
 class PythonParser:
+    @staticmethod
+    def parser_version() -> str:
+        # Part of the parse cache key; ast output can differ between Python versions
+        return f"ast-2-py{sys.version_info.major}.{sys.version_info.minor}"
+
     @staticmethod
     def parse_file(file_path: str) -> List[FunctionInfo]:
-        with open(file_path, "r") as f:
-            tree = ast.parse(f.read(), filename=file_path)
-        
-        functions = []
+        return PythonParser.parse_model(file_path).functions
+
+    @staticmethod
+    def iter_functions(file_path: str) -> Generator[FunctionInfo, None, FileModel]:
+        """Functions in source order; returns the model. ast parses the whole file up front"""
+        model = PythonParser.parse_model(file_path)
+        yield from model.functions
+        return model
+
+    @staticmethod
+    def parse_model(file_path: str) -> FileModel:
+        """Parse the file once into functions, classes and imports"""
+        with open(file_path, "rb") as f:
+            source = f.read()
+        tree = ast.parse(source, filename=file_path)
+        return PythonParser._build_model(tree, source.decode("utf-8", "replace").split("\n"), file_path)
+
+    @staticmethod
+    def parse_source(source: str, file_path: str) -> FileModel:
+        """parse_model for source text that is already in memory"""
+        tree = ast.parse(source, filename=file_path)
+        return PythonParser._build_model(tree, source.split("\n"), file_path)
+
+    @staticmethod
+    def parse_region(source: str, file_path: str, in_class: bool = False) -> Tuple[FileModel, List[FunctionInfo]]:
+        """
+        Parse whole statements cut out of a file, keeping their line numbers.
+        Class members are parsed under a wrapper class so ast can tell methods
+        from functions nested in other statements; indented statements from a
+        function body under an `if`, which leaves string contents untouched.
+        Returns the model and the class members found.
+        """
+        if in_class:
+            return unwrap_class_region(PythonParser.parse_source(wrap_class_region(source, python=True), file_path))
+        first = next((line for line in source.split("\n") if line.strip() and not line.lstrip().startswith("#")), "")
+        if not first[:1].isspace():
+            return PythonParser.parse_source(source, file_path), []
+        return shift_lines(PythonParser.parse_source("if True:\n" + source, file_path), -1), []
+
+    @staticmethod
+    def _build_model(tree: ast.AST, lines: List[str], file_path: str) -> FileModel:
+        model = FileModel(file_path, "python")
+        functions = {}
+        class_nodes = []
+        import_nodes = []
         for node in ast.walk(tree):
             if isinstance(node, ast.FunctionDef):
                 func = FunctionInfo(
@@ -22,5 +70,21 @@ class PythonParser:
                     end_lineno=getattr(node, "end_lineno", node.lineno),
                     file_path=file_path
                 )
-                functions.append(func)
-        return functions
+                model.functions.append(func)
+                functions[id(node)] = func
+                model.signatures[node.lineno] = lines[node.lineno - 1].strip()
+            elif isinstance(node, ast.ClassDef):
+                class_nodes.append(node)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                import_nodes.append(node)
+
+        # ast.walk is breadth-first; list functions in source order like the other parsers
+        model.functions.sort(key=lambda func: func.lineno)
+
+        # Methods are only known once the walk is done
+        for node in sorted(class_nodes, key=lambda n: n.lineno):
+            cls = ClassInfo(node.name, node.lineno, getattr(node, "end_lineno", node.lineno))
+            cls.methods = [functions[id(child)] for child in node.body if isinstance(child, ast.FunctionDef)]
+            model.classes.append(cls)
+        model.imports = [lines[node.lineno - 1].strip() for node in sorted(import_nodes, key=lambda n: n.lineno)]
+        return model
@@ -0,0 +1,70 @@
+"""
+Source span helpers shared by the language parsers
+"""
+from typing import List, Tuple
+
+from models import FileModel, FunctionInfo
+
+# One-line class header that gives members cut out of a class body their context
+_REGION_CLASS = "__Region"
+
+
+def find_block_end(lines: List[str], start_index: int) -> int:
+    """
+    1-based line that closes the brace block opened on or after lines[start_index].
+    A declaration ending in ';' before any '{' (abstract or interface method)
+    ends on the line of that ';'.
+    """
+    depth = 0
+    opened = False
+    for i in range(start_index, len(lines)):
+        for char in lines[i]:
+            if char == '{':
+                depth += 1
+                opened = True
+            elif char == '}' and opened:
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            elif char == ';' and not opened:
+                return i + 1
+    return start_index + 1  # Fallback
+
+
+def clean_doc_comment(comment: str) -> str:
+    """Text of a /** ... */ comment without the delimiters and leading asterisks"""
+    lines = []
+    for line in comment[3:-2].split('\n'):
+        line = line.strip()
+        if line.startswith('*'):
+            line = line[1:].strip()
+        lines.append(line)
+    return '\n'.join(lines).strip()
+
+
+def wrap_class_region(source: str, python: bool = False) -> str:
+    """Class members as a parseable file; every line moves down by one"""
+    if python:
+        return f"class {_REGION_CLASS}:\n{source}\n"
+    return f"class {_REGION_CLASS} {{\n{source}\n}}\n"
+
+
+def unwrap_class_region(model: FileModel) -> Tuple[FileModel, List[FunctionInfo]]:
+    """
+    Undo wrap_class_region: drop the wrapper class and move every line back up.
+    Returns the model and the wrapper's methods, i.e. the region's own members.
+    """
+    wrapper = next((cls for cls in model.classes if cls.name == _REGION_CLASS and cls.lineno == 1), None)
+    if wrapper is None:
+        raise ValueError("region wrapper class not found")
+    model.classes.remove(wrapper)
+    return shift_lines(model, -1), wrapper.methods
+
+
+def shift_lines(model: FileModel, offset: int) -> FileModel:
+    """Move every line number of model by offset, dropping signatures that fall before line 1"""
+    for item in model.functions + model.classes:
+        item.lineno += offset
+        item.end_lineno += offset
+    model.signatures = {line + offset: text for line, text in model.signatures.items() if line + offset > 0}
+    return model
@@ -0,0 +1,71 @@
+"""
+Changed-line index for stale documentation checks.
+
+`git diff -U0 <doc commit> -- <file>` lists every hunk between the commit the
+documentation was written at and the current file. The hunks are merged into
+sorted, disjoint line intervals of the current file, so whether a function's
+span was touched is one bisect, and every function of the file shares one diff.
+"""
+import re
+import subprocess
+from bisect import bisect_right
+from typing import List, Tuple
+
+_HUNK = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@', re.MULTILINE)
+
+
+class ChangedLines:
+    """Disjoint line intervals of the current file that differ from an older commit"""
+
+    def __init__(self, intervals: List[Tuple[int, int]]):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1] + 1:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    @staticmethod
+    def git_args(relative_path: str, since_commit: str) -> List[str]:
+        return ["diff", "-U0", "--no-color", "--no-ext-diff", since_commit, "--", relative_path]
+
+    @classmethod
+    def from_git(cls, git_root: str, relative_path: str, since_commit: str, timeout: int = 120) -> "ChangedLines":
+        """Lines of the working-tree file changed since since_commit; raises RuntimeError if git cannot diff"""
+        try:
+            result = subprocess.run(["git", *cls.git_args(relative_path, since_commit)],
+                                    cwd=git_root, capture_output=True, timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise RuntimeError(f"git diff failed for {relative_path}: {e}")
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or f"git diff failed for {relative_path}")
+        return cls.parse(result.stdout.decode("utf-8", "replace"))
+
+    @classmethod
+    async def from_git_async(cls, executor, git_root: str, relative_path: str, since_commit: str) -> "ChangedLines":
+        """from_git through a services.git_executor.GitExecutor"""
+        output = await executor.run(git_root, *cls.git_args(relative_path, since_commit))
+        return cls.parse(output.decode("utf-8", "replace"))
+
+    @classmethod
+    def parse(cls, diff: str) -> "ChangedLines":
+        intervals = []
+        for match in _HUNK.finditer(diff):
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count:
+                intervals.append((start, start + count - 1))
+            else:
+                # Pure deletion after line `start`: count it against the lines on both sides
+                intervals.append((max(start, 1), start + 1))
+        return cls(intervals)
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def overlaps(self, first: int, last: int) -> bool:
+        """Whether any line in first..last changed"""
+        index = bisect_right(self.starts, last) - 1
+        return index >= 0 and self.ends[index] >= first
@@ -0,0 +1,69 @@
+"""
+Content hashing used to find byte-identical source files (vendored copies,
+generated DTOs repeated across modules) so they are parsed and documented once.
+"""
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path: str) -> str:
+    """BLAKE2b digest of the file bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentHasher:
+    """Hashes files, remembering each digest while (size, mtime, inode) stay the same"""
+
+    def __init__(self):
+        self._digests: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+    def digest(self, path: str, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """Digest of the file at path, or None if it cannot be read"""
+        try:
+            stat = stat or os.stat(path)
+            key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            cached = self._digests.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            value = hash_file(path)
+        except OSError:
+            return None
+        self._digests[path] = (key, value)
+        return value
+
+    def group(self, paths: Iterable[str]) -> List[Tuple[Optional[str], List[str]]]:
+        """
+        Group paths with identical content as (digest, paths), in first-seen order.
+        Only files sharing their size with another file are hashed; the digest
+        of a file with a unique size (or an unreadable one) is left as None.
+        """
+        paths = list(paths)
+        stats: Dict[str, Optional[os.stat_result]] = {}
+        by_size: Dict[int, int] = {}
+        for path in paths:
+            try:
+                stats[path] = os.stat(path)
+                by_size[stats[path].st_size] = by_size.get(stats[path].st_size, 0) + 1
+            except OSError:
+                stats[path] = None
+
+        groups: Dict[str, List[str]] = {}
+        ordered: List[Tuple[Optional[str], List[str]]] = []
+        for path in paths:
+            stat = stats[path]
+            value = self.digest(path, stat) if stat is not None and by_size[stat.st_size] > 1 else None
+            if value is None:
+                ordered.append((None, [path]))
+            elif value in groups:
+                groups[value].append(path)
+            else:
+                groups[value] = [path]
+                ordered.append((value, groups[value]))
+        return ordered
@@ -0,0 +1,88 @@
+"""
+Manifest of generated documentation, for incremental regeneration.
+
+Documentation files wrap the section of every function in HTML comment
+markers that carry the function's id and the digest of its source lines. The
+manifest, kept next to the documentation files, records per repository and
+language the commit the documentation was generated at, and per documented
+file its content hash and the id, digest and line span of each function. An
+incremental run re-documents only the functions whose source or position
+changed and splices them between the sections it keeps.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from models import FileModel
+from services.incremental_parser import SpanMap
+
+MANIFEST_FILE = ".doc_manifest.json"
+_VERSION = 1
+
+_SECTION = re.compile(r"^<!-- doc-function (\S+) \S+ -->\n(.*?)^<!-- /doc-function -->\n", re.DOTALL | re.MULTILINE)
+
+
+def section(function_id: str, digest: str, body: str) -> str:
+    """body between the markers that let a later run find it again"""
+    return f"<!-- doc-function {function_id} {digest} -->\n{body}<!-- /doc-function -->\n"
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """function id -> section body of a documentation file written with section()"""
+    return {match.group(1): match.group(2) for match in _SECTION.finditer(text)}
+
+
+def function_identities(file_model: FileModel, source: str) -> List[Tuple[str, str]]:
+    """(id, digest of its lines) of every function of file_model, in model order"""
+    lines = source.split("\n")
+    span_map = SpanMap(file_model)
+    identities = []
+    for func in file_model.functions:
+        span = span_map.span_of(func)
+        identities.append((span.function_id, span.content_digest(lines)))
+    return identities
+
+
+class DocManifest:
+    """What was documented, per repository and language, in one documentation folder"""
+
+    def __init__(self, folder: str):
+        self.path = os.path.join(folder, MANIFEST_FILE)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(repo_path: str, language: str) -> str:
+        return f"{os.path.abspath(repo_path)}|{language.lower()}"
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"version": _VERSION, "runs": {}}
+        if manifest.get("version") != _VERSION:
+            return {"version": _VERSION, "runs": {}}
+        return manifest
+
+    def load(self, repo_path: str, language: str) -> Optional[dict]:
+        """{"target_format", "commit", "files": {file path: record}} of the last run, None if there was none"""
+        with self._lock:
+            return self._read()["runs"].get(self._key(repo_path, language))
+
+    def save(self, repo_path: str, language: str, run: dict) -> None:
+        with self._lock:
+            manifest = self._read()
+            manifest["runs"][self._key(repo_path, language)] = run
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Written aside and moved in place, so an interrupted run leaves the previous manifest
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
@@ -56,6 +56,10 @@ class DocumentConverter:
                     doc.add_paragraph()
                     continue
                 
+                # Section markers of incremental documentation
+                if line.startswith('<!--') and line.endswith('-->'):
+                    continue
+                
                 # Handle headers
                 if line.startswith('#'):
                     level = len(line) - len(line.lstrip('#'))
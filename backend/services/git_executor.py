@@ -0,0 +1,84 @@
+"""
+Bounded asyncio pool for git subprocesses.
+
+git commands run as asyncio subprocesses, at most max_concurrency at a time,
+so the git work of many files overlaps, and overlaps with parsing and LLM calls
+running in threads, instead of blocking a request thread one command after
+another. Every command has a timeout; a command that times out or whose task
+is cancelled has its git process killed.
+"""
+import asyncio
+import os
+import signal
+import weakref
+from typing import Dict, Optional
+
+# git waits on disk as much as on CPU; same default as concurrent.futures.ThreadPoolExecutor
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("GIT_MAX_CONCURRENCY", str(min(32, (os.cpu_count() or 1) + 4))))
+DEFAULT_TIMEOUT = float(os.getenv("GIT_TIMEOUT", "120"))
+
+
+class GitExecutor:
+    """Runs git commands concurrently, up to max_concurrency per event loop"""
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        # Semaphores belong to the loop they are first used in
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.commands = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run(self, git_root: str, *args: str, timeout: Optional[float] = None) -> bytes:
+        """stdout of `git <args>` run in git_root; raises RuntimeError when git fails or times out"""
+        timeout = timeout or self.timeout
+        async with self._semaphore():
+            self.commands += 1
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    "git", *args, cwd=git_root, stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                    # Own process group, so helpers git starts are killed with it
+                    start_new_session=os.name == "posix")
+            except OSError as e:
+                self.failures += 1
+                raise RuntimeError(f"git {args[0]} failed in {git_root}: {e}")
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise RuntimeError(f"git {args[0]} timed out after {timeout:g}s in {git_root}")
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            finally:
+                if process.returncode is None:
+                    self._kill(process)
+                    await process.wait()
+        if process.returncode != 0:
+            self.failures += 1
+            raise RuntimeError(stderr.decode("utf-8", "replace").strip() or f"git {args[0]} failed in {git_root}")
+        return stdout
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> None:
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass  # Exited in the meantime
+
+    def stats(self) -> Dict[str, object]:
+        return {"max_concurrency": self.max_concurrency, "timeout": self.timeout, "commands": self.commands,
+                "failures": self.failures, "timeouts": self.timeouts, "cancelled": self.cancelled}
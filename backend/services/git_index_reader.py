@@ -0,0 +1,247 @@
+"""
+File enumeration straight from the git index (the equivalent of `git ls-files`)
+
+Reading .git/index avoids walking the working tree at all and naturally
+honours .gitignore, since ignored build output and vendored code are never
+tracked. Untracked-but-not-ignored files can optionally be added through
+`git ls-files --others --exclude-standard`.
+
+Like `git ls-files`, the listing is what the index records: a file deleted
+from the working tree but not from the index is still listed until the
+deletion is staged, and callers that read the files must expect it to be
+missing. Checking every path on disk would cost the stat per file this
+module exists to avoid.
+"""
+import os
+import struct
+import subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+
+_HEADER = struct.Struct(">4sLL")
+_ENTRY_STAT_SIZE = 40           # ctime, mtime, dev, ino, mode, uid, gid, size
+_FLAG_EXTENDED = 0x4000
+_EXTENDED_SKIP_WORKTREE = 0x4000
+_MODE_GITLINK = 0o160000
+_MODE_DIRECTORY = 0o040000      # sparse-index directory entries
+
+
+class GitIndexError(Exception):
+    """Raised when the index cannot be read and `git ls-files` should be used instead"""
+
+
+def find_worktree(start_path: str) -> Optional[Tuple[str, str]]:
+    """Return (worktree root, git dir) for the repository containing start_path"""
+    current = os.path.abspath(start_path)
+    while True:
+        dot_git = os.path.join(current, '.git')
+        if os.path.isdir(dot_git):
+            if not os.path.exists(os.path.join(dot_git, 'HEAD')):
+                return None  # Not an actual git directory
+            return current, dot_git
+        if os.path.isfile(dot_git):
+            # Worktrees and submodules point at their git dir from a .git file
+            try:
+                with open(dot_git, 'r', encoding='utf-8') as f:
+                    content = f.read().strip()
+            except OSError:
+                return None
+            if content.startswith('gitdir:'):
+                git_dir = content[len('gitdir:'):].strip()
+                return current, os.path.normpath(os.path.join(current, git_dir))
+            return None
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def read_index_paths(git_dir: str) -> List[str]:
+    """Paths of all tracked files in the index, '/' separated, in index order"""
+    index_path = os.path.join(git_dir, 'index')
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []  # Fresh repository without any staged file
+
+    if len(data) < _HEADER.size:
+        raise GitIndexError("index file is truncated")
+    signature, version, count = _HEADER.unpack_from(data, 0)
+    if signature != b'DIRC' or version not in (2, 3, 4):
+        raise GitIndexError(f"unsupported index format {signature!r} v{version}")
+
+    hash_size = 32 if _object_format(git_dir) == 'sha256' else 20
+    paths = []
+    offset = _HEADER.size
+    previous = b''
+    conflicted = None
+
+    for _ in range(count):
+        entry_start = offset
+        mode = struct.unpack_from(">L", data, offset + 24)[0]
+        offset += _ENTRY_STAT_SIZE + hash_size
+        flags = struct.unpack_from(">H", data, offset)[0]
+        offset += 2
+        extended_flags = 0
+        if version >= 3 and flags & _FLAG_EXTENDED:
+            extended_flags = struct.unpack_from(">H", data, offset)[0]
+            offset += 2
+
+        if version == 4:
+            # Path is stored as "strip N bytes from the previous path" + suffix
+            strip, offset = _read_offset_varint(data, offset)
+            end = data.index(b'\0', offset)
+            name = previous[:len(previous) - strip] + data[offset:end]
+            offset = end + 1
+        else:
+            end = data.index(b'\0', offset)
+            name = data[offset:end]
+            # Entries are NUL padded to a multiple of 8 bytes
+            offset = entry_start + ((end - entry_start + 8) & ~7)
+        previous = name
+
+        stage = (flags >> 12) & 0x3
+        if stage:
+            # Unmerged path: stages are sorted, keep whichever comes first (a
+            # path added on both sides has no stage 1)
+            if name == conflicted:
+                continue
+            conflicted = name
+        if mode & 0o170000 in (_MODE_GITLINK, _MODE_DIRECTORY):
+            continue  # Submodules and sparse directories
+        if extended_flags & _EXTENDED_SKIP_WORKTREE:
+            continue  # Outside the sparse checkout, not on disk
+        paths.append(name.decode('utf-8', 'surrogateescape'))
+
+    if _has_extension(data, offset, hash_size, b'link'):
+        # Split index: most entries live in a shared index file
+        raise GitIndexError("split index is not supported")
+    return paths
+
+
+def list_tracked_files(repo_path: str, include_untracked: bool = False) -> Optional[List[str]]:
+    """
+    Files under repo_path known to git, relative to repo_path with os.sep separators.
+    Returns None when repo_path is not inside a git working tree.
+    """
+    worktree = find_worktree(repo_path)
+    if worktree is None:
+        return None
+    root, git_dir = worktree
+
+    prefix = os.path.relpath(os.path.abspath(repo_path), root).replace(os.sep, '/')
+    prefix = '' if prefix == '.' else prefix + '/'
+
+    try:
+        paths = read_index_paths(git_dir)
+        if prefix:
+            paths = [path[len(prefix):] for path in paths if path.startswith(prefix)]
+    except (GitIndexError, struct.error, ValueError):
+        paths = _git_ls_files(repo_path)
+        if paths is None:
+            return None
+
+    if include_untracked:
+        paths.extend(_git_ls_files(repo_path, "--others", "--exclude-standard") or [])
+
+    if os.sep != '/':
+        paths = [path.replace('/', os.sep) for path in paths]
+    return paths
+
+
+def index_signature(repo_path: str) -> Optional[Tuple[str, int, int, int]]:
+    """(index path, mtime, size, inode) of the index backing repo_path; changes whenever the index is rewritten"""
+    worktree = find_worktree(repo_path)
+    if worktree is None:
+        return None
+    index_path = os.path.join(worktree[1], 'index')
+    try:
+        stat = os.stat(index_path)
+    except OSError:
+        return None
+    return index_path, stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def walk_from_paths(paths: List[str], should_descend: Callable[[str], bool]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Turn a flat list of relative file paths into a sorted top-down walk"""
+    files: Dict[str, List[str]] = {'.': []}
+    subdirs: Dict[str, set] = {'.': set()}
+
+    for path in paths:
+        parts = path.split(os.sep)
+        if not all(should_descend(part) for part in parts[:-1]):
+            continue
+        parent = '.'
+        for part in parts[:-1]:
+            directory = part if parent == '.' else parent + os.sep + part
+            if directory not in files:
+                files[directory] = []
+                subdirs[directory] = set()
+                subdirs[parent].add(part)
+            parent = directory
+        files[parent].append(parts[-1])
+
+    ordered = []
+    stack = ['.']
+    while stack:
+        directory = stack.pop()
+        ordered.append((directory, tuple(sorted(files[directory]))))
+        for name in sorted(subdirs[directory], reverse=True):
+            stack.append(name if directory == '.' else directory + os.sep + name)
+    return ordered
+
+
+def _read_offset_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Decode git's offset varint (as used by index v4 and pack files)"""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, offset
+
+
+def _has_extension(data: bytes, offset: int, hash_size: int, wanted: bytes) -> bool:
+    end = len(data) - hash_size
+    while offset + 8 <= end:
+        signature, size = struct.unpack_from(">4sL", data, offset)
+        if signature == wanted:
+            return True
+        offset += 8 + size
+    return False
+
+
+def _common_dir(git_dir: str) -> str:
+    """Git dir holding the shared config and objects (differs from git_dir for linked worktrees)"""
+    try:
+        with open(os.path.join(git_dir, 'commondir'), 'r', encoding='utf-8') as f:
+            common_dir = f.read().strip()
+    except OSError:
+        return git_dir
+    return os.path.normpath(os.path.join(git_dir, common_dir))
+
+
+def _object_format(git_dir: str) -> str:
+    """Hash algorithm of the repository (sha1 unless extensions.objectFormat says otherwise)"""
+    try:
+        with open(os.path.join(_common_dir(git_dir), 'config'), 'r', encoding='utf-8') as f:
+            for line in f:
+                key, _, value = line.partition('=')
+                if key.strip().lower() == 'objectformat':
+                    return value.strip().lower()
+    except OSError:
+        pass
+    return 'sha1'
+
+
+def _git_ls_files(repo_path: str, *args: str) -> Optional[List[str]]:
+    try:
+        result = subprocess.run(["git", "ls-files", "-z", *args], cwd=repo_path,
+                                capture_output=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return [path.decode('utf-8', 'surrogateescape') for path in result.stdout.split(b'\0') if path]
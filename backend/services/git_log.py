@@ -0,0 +1,78 @@
+"""
+Reading `git log` output.
+
+iter_log streams the commits of a revision range with the paths each one
+touched, parsing while git is still writing, so a whole history can be read
+in one pass without holding git's output in memory. file_log_args and
+parse_log give the latest commits of a single file in the same format.
+"""
+import subprocess
+from typing import Iterator, List, Optional, Tuple
+
+# git log output: \x1e starts a commit, \x1f separates its fields, NUL ends the
+# message and each file name
+_LOG_FORMAT = "--format=%x1e%H%x1f%an%x1f%B%x00"
+_READ_SIZE = 1 << 16
+
+# (hash, author, message)
+Commit = Tuple[str, str, str]
+
+
+def git_output(git_root: str, *args: str, timeout: int = 60) -> Optional[str]:
+    """Stripped stdout of a git command, None when it fails"""
+    try:
+        result = subprocess.run(["git", *args], cwd=git_root, capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode("utf-8", "surrogateescape").strip()
+
+
+def iter_log(git_root: str, revision_range: str) -> Iterator[Tuple[Commit, List[str]]]:
+    """(commit, touched paths) newest first, parsed while git is still writing"""
+    process = subprocess.Popen(["git", "log", "--name-only", "-z", "--no-renames", _LOG_FORMAT, revision_range, "--"],
+                               cwd=git_root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    complete = False
+    try:
+        pending = b""
+        while True:
+            chunk = process.stdout.read(_READ_SIZE)
+            records = (pending + chunk).split(b"\x1e")
+            # The last record may still be incomplete
+            pending = records.pop() if chunk else b""
+            for record in records:
+                if record:
+                    yield _parse_record(record)
+            if not chunk:
+                complete = True
+                break
+    finally:
+        process.stdout.close()
+        if not complete and process.poll() is None:
+            process.kill()  # The consumer stopped early
+        process.wait()
+    # Reached only after the whole output was read; anything but a clean exit may have cut it short
+    if process.returncode != 0:
+        raise RuntimeError(f"git log failed in {git_root} (exit code {process.returncode})")
+
+
+def file_log_args(relative_path: str, limit: int) -> List[str]:
+    """git arguments listing the latest commits of one file, in the format parse_log reads"""
+    return ["log", f"--max-count={limit}", "-z", _LOG_FORMAT, "--", relative_path]
+
+
+def parse_log(output: bytes) -> List[Tuple[Commit, List[str]]]:
+    return [_parse_record(record) for record in output.split(b"\x1e") if record]
+
+
+def _parse_record(record: bytes) -> Tuple[Commit, List[str]]:
+    hexsha, author, rest = record.split(b"\x1f", 2)
+    message, _, names = rest.partition(b"\0")
+    paths = []
+    for name in names.split(b"\0"):
+        name = name.lstrip(b"\n")
+        if name:
+            paths.append(name.decode("utf-8", "surrogateescape"))
+    commit = (hexsha.decode("ascii"), author.decode("utf-8", "replace"), message.decode("utf-8", "replace").strip())
+    return commit, paths
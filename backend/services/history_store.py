@@ -0,0 +1,180 @@
+"""
+Persistent git history store in SQLite.
+
+Commits, authors, messages and the paths each commit touched are recorded per
+repository, so the history questions documentation asks (latest commits of a
+file, whether a file changed after a commit) are indexed queries rather than
+walks over the commit graph, and survive restarts.
+
+Every commit gets an ordinal within its repository, larger meaning newer in
+`git log` order. The store is filled from a single `git log --name-only` pass;
+later syncs read only the commits after the last stored HEAD, and a rewritten
+history (rebase, reset) is stored again from scratch.
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from cache_config import get_cache_dir
+from services.git_log import Commit, git_output, iter_log
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history_repos (
+    id INTEGER PRIMARY KEY,
+    git_root TEXT NOT NULL UNIQUE,
+    head TEXT
+);
+CREATE TABLE IF NOT EXISTS history_authors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS history_commits (
+    repo_id INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    author_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (repo_id, ordinal)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS history_commits_hash ON history_commits (repo_id, hash);
+CREATE TABLE IF NOT EXISTS history_paths (
+    id INTEGER PRIMARY KEY,
+    repo_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    UNIQUE (repo_id, path)
+);
+CREATE TABLE IF NOT EXISTS history_touched (
+    path_id INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL,
+    PRIMARY KEY (path_id, ordinal)
+) WITHOUT ROWID;
+"""
+
+_FILE_COMMITS = """
+SELECT c.hash, a.name, c.message
+FROM history_paths p
+JOIN history_touched t ON t.path_id = p.id
+JOIN history_commits c ON c.repo_id = p.repo_id AND c.ordinal = t.ordinal
+JOIN history_authors a ON a.id = c.author_id
+WHERE p.repo_id = ? AND p.path = ?
+ORDER BY t.ordinal DESC
+LIMIT ?
+"""
+
+_BATCH_SIZE = 5000
+
+
+class HistoryStore:
+    """Commit history of git repositories, kept in one SQLite file"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.getenv("GIT_HISTORY_DIR") or get_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, "git_history.sqlite3")
+        self._lock = threading.Lock()
+        self.full_builds = 0
+        self.incremental_updates = 0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def sync(self, git_root: str) -> Optional[int]:
+        """Store the commits up to the current HEAD; returns the repository id, None without commits"""
+        git_root = os.path.abspath(git_root)
+        head = git_output(git_root, "rev-parse", "--verify", "-q", "HEAD")
+        if not head:
+            return None
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute("SELECT id, head FROM history_repos WHERE git_root = ?", (git_root,)).fetchone()
+                if row is None:
+                    repo_id = conn.execute("INSERT INTO history_repos (git_root) VALUES (?)", (git_root,)).lastrowid
+                    stored_head = None
+                else:
+                    repo_id, stored_head = row
+                if stored_head == head:
+                    return repo_id
+
+                if stored_head and git_output(git_root, "merge-base", "--is-ancestor", stored_head, head) is not None:
+                    self._append(conn, git_root, repo_id, f"{stored_head}..{head}")
+                    self.incremental_updates += 1
+                else:
+                    self._clear(conn, repo_id)
+                    self._append(conn, git_root, repo_id, head)
+                    self.full_builds += 1
+                # Committed together with the commits, so a failed sync is read again next time
+                conn.execute("UPDATE history_repos SET head = ? WHERE id = ?", (head, repo_id))
+            return repo_id
+
+    def _clear(self, conn: sqlite3.Connection, repo_id: int) -> None:
+        conn.execute("DELETE FROM history_touched WHERE path_id IN (SELECT id FROM history_paths WHERE repo_id = ?)",
+                     (repo_id,))
+        conn.execute("DELETE FROM history_paths WHERE repo_id = ?", (repo_id,))
+        conn.execute("DELETE FROM history_commits WHERE repo_id = ?", (repo_id,))
+
+    def _append(self, conn: sqlite3.Connection, git_root: str, repo_id: int, revision_range: str) -> None:
+        """Store the commits of revision_range above every commit already stored"""
+        count = int(git_output(git_root, "rev-list", "--count", revision_range) or 0)
+        top = conn.execute("SELECT MAX(ordinal) FROM history_commits WHERE repo_id = ?", (repo_id,)).fetchone()[0]
+        # git log lists newest first, so the first commit read gets the largest ordinal
+        ordinal = (top if top is not None else 0) + count
+
+        authors: Dict[str, int] = {}
+        paths: Dict[str, int] = {}
+        commits: List[Tuple[int, int, str, int, str]] = []
+        touched: List[Tuple[int, int]] = []
+        for (hexsha, author, message), changed in iter_log(git_root, revision_range):
+            commits.append((repo_id, ordinal, hexsha, self._id(conn, authors, author, None), message))
+            touched.extend((self._id(conn, paths, path, repo_id), ordinal) for path in changed)
+            ordinal -= 1
+            if len(commits) >= _BATCH_SIZE:
+                self._insert(conn, commits, touched)
+                commits, touched = [], []
+        self._insert(conn, commits, touched)
+
+    @staticmethod
+    def _id(conn: sqlite3.Connection, ids: Dict[str, int], key: str, repo_id: Optional[int]) -> int:
+        """Row id of an author (repo_id None) or of a path of repo_id, created on first sight"""
+        if key not in ids:
+            if repo_id is None:
+                conn.execute("INSERT OR IGNORE INTO history_authors (name) VALUES (?)", (key,))
+                row = conn.execute("SELECT id FROM history_authors WHERE name = ?", (key,)).fetchone()
+            else:
+                conn.execute("INSERT OR IGNORE INTO history_paths (repo_id, path) VALUES (?, ?)", (repo_id, key))
+                row = conn.execute("SELECT id FROM history_paths WHERE repo_id = ? AND path = ?", (repo_id, key)).fetchone()
+            ids[key] = row[0]
+        return ids[key]
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, commits: list, touched: list) -> None:
+        conn.executemany("INSERT INTO history_commits (repo_id, ordinal, hash, author_id, message) VALUES (?, ?, ?, ?, ?)",
+                         commits)
+        conn.executemany("INSERT OR IGNORE INTO history_touched (path_id, ordinal) VALUES (?, ?)", touched)
+
+    def file_commits(self, repo_id: int, relative_path: str, limit: int = 5) -> List[Commit]:
+        """(hash, author, message) of the latest commits touching a file, newest first"""
+        with self._connect() as conn:
+            return [tuple(row) for row in conn.execute(_FILE_COMMITS, (repo_id, relative_path, limit))]
+
+    def changed_since(self, repo_id: int, relative_path: str, commit_hash: str) -> Optional[bool]:
+        """Whether a commit after commit_hash touched the file; None when the commit is not stored"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT ordinal FROM history_commits WHERE repo_id = ? AND hash = ?",
+                               (repo_id, commit_hash)).fetchone()
+            if row is None:
+                return None
+            return conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM history_touched t JOIN history_paths p ON p.id = t.path_id "
+                "WHERE p.repo_id = ? AND p.path = ? AND t.ordinal > ?)",
+                (repo_id, relative_path, row[0])).fetchone()[0] == 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._connect() as conn:
+            repos = conn.execute("SELECT COUNT(*) FROM history_repos").fetchone()[0]
+            commits = conn.execute("SELECT COUNT(*) FROM history_commits").fetchone()[0]
+            paths = conn.execute("SELECT COUNT(*) FROM history_paths").fetchone()[0]
+        return {"repos": repos, "commits": commits, "paths": paths,
+                "full_builds": self.full_builds, "incremental_updates": self.incremental_updates}
@@ -0,0 +1,526 @@
+"""
+Incremental reparsing of edited files.
+
+For every file it parsed, IncrementalParser keeps the source text and a span
+map: each function and class with its line range, its parent and a digest of
+its lines. When the file is parsed again, the edit is located from the common
+prefix and suffix of the two versions. Only the innermost function enclosing
+the edit, or the stretch of a class or module body between the declarations
+around the edit together with those it touches, is cut out and handed to the
+parser's parse_region. Incremental results are never put in the parse cache.
+Declarations outside that region are shifted instead of reparsed and keep
+their FunctionInfo objects, and every function keeps a stable id (its
+qualified name) across edits. The models kept between parses hold
+models.CompactFunctionInfo objects; callers get FunctionInfo copies.
+
+Edits whose effect could reach outside the region - imports, unbalanced
+brackets, comments or multi-line strings, Python indentation changes - and
+regions that cannot be reparsed on their own fall back to a full parse.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from models import ClassInfo, FileModel, FunctionInfo
+
+DEFAULT_MAX_FILES = int(os.getenv("INCREMENTAL_PARSE_MAX_FILES", "256"))
+
+_BRACKET = re.compile(r"[{}()\[\]]")
+
+_OPENERS = {"}": "{", ")": "(", "]": "["}
+
+# Comments and complete string literals; brackets inside them do not count
+_BRACE_LITERAL = re.compile(r"""
+    /\*.*?\*/ | //[^\n]*
+  | \"\"\".*?\"\"\" | `(?:[^`\\]|\\.)*`
+  | "(?:[^"\\\n]|\\.)*(?:"|$) | '(?:[^'\\\n]|\\.)*(?:'|$)
+""", re.S | re.X | re.M)
+
+_PYTHON_LITERAL = re.compile(r"""
+    \#[^\n]*
+  | \"\"\"(?:[^\\]|\\.)*?\"\"\" | '''(?:[^\\]|\\.)*?'''
+  | "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*'
+""", re.S | re.X)
+
+# Left over once literals are removed, these open a comment or string that spans lines
+_UNTERMINATED = ("/*", "*/", '"""', "'''", "`")
+
+# An edited line containing one of these can change how the whole file is read
+_FILE_LEVEL_WORDS = ("import", "require(", "package")
+
+# Lines that belong to the declaration below them (decorators, annotations, doc comments)
+_TRIVIA = ("@", "//", "/*", "*", "#")
+
+
+def _is_trivia(line: str) -> bool:
+    stripped = line.strip()
+    return not stripped or stripped.startswith(_TRIVIA)
+
+
+def _is_code(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith("#")
+
+
+def _is_brace_code(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith(("//", "/*", "*"))
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _open_brackets(text: str) -> Optional[str]:
+    """Brackets text leaves open, in order, or None if they do not nest"""
+    stack = []
+    for match in _BRACKET.finditer(text):
+        char = match.group()
+        if char in "{([":
+            stack.append(char)
+        elif not stack or stack.pop() != _OPENERS[char]:
+            return None
+    return "".join(stack)
+
+
+def _self_contained(text: str, literal: re.Pattern, opened: str = "") -> bool:
+    """Whether text nests its brackets, leaving `opened` open, and ends outside comments and strings"""
+    if text.count('"""') % 2 or text.count("'''") % 2:
+        return False
+    text = literal.sub("", text)
+    return not any(token in text for token in _UNTERMINATED) and _open_brackets(text) == opened
+
+
+def _digest(lines: List[str], info) -> str:
+    text = "\n".join(lines[info.lineno - 1:info.end_lineno])
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def _sort_key(info):
+    return info.lineno, -info.end_lineno
+
+
+class Span:
+    """One function or class of a parse, linked to its enclosing declaration"""
+    __slots__ = ("kind", "info", "parent", "function_id", "digest")
+
+    def __init__(self, kind: str, info):
+        self.kind = kind                            # function or class
+        self.info = info                            # FunctionInfo or ClassInfo, shared with the model
+        self.parent: Optional["Span"] = None
+        self.function_id = ""
+        self.digest: Optional[str] = None           # hash of the span's lines, computed on demand
+
+    @property
+    def lineno(self) -> int:
+        return self.info.lineno
+
+    @property
+    def end_lineno(self) -> int:
+        return self.info.end_lineno
+
+    def content_digest(self, lines: List[str]) -> str:
+        if self.digest is None:
+            self.digest = _digest(lines, self.info)
+        return self.digest
+
+
+class SpanMap:
+    """Functions and classes of one FileModel ordered by position, with their nesting"""
+
+    def __init__(self, model: FileModel, digests: Optional[Dict[int, str]] = None):
+        self.spans = [Span("class", cls) for cls in model.classes] + [Span("function", f) for f in model.functions]
+        # Outer spans first; a class sorts before a function with the same lines
+        self.spans.sort(key=lambda span: (span.info.lineno, -span.info.end_lineno, span.kind != "class"))
+
+        stack: List[Span] = []
+        seen: Dict[str, int] = {}
+        for span in self.spans:
+            info = span.info
+            while stack and not (stack[-1].info.lineno <= info.lineno and info.end_lineno <= stack[-1].info.end_lineno):
+                stack.pop()
+            if stack:
+                span.parent = stack[-1]
+                qualname = f"{span.parent.function_id}.{info.name}"
+            else:
+                qualname = info.name
+            count = seen[qualname] = seen.get(qualname, 0) + 1
+            # Overloads and redefinitions are told apart by their order in the file
+            span.function_id = qualname if count == 1 else f"{qualname}#{count}"
+            if digests:
+                span.digest = digests.get(id(info))
+            stack.append(span)
+        self.reindex()
+
+    def reindex(self) -> None:
+        self._by_info = {id(span.info): span for span in self.spans}
+
+    def span_of(self, info) -> Optional[Span]:
+        return self._by_info.get(id(info))
+
+    def children(self, parent: Optional[Span]) -> List[Span]:
+        return [span for span in self.spans if span.parent is parent]
+
+    def container(self, first: int, last: int) -> Optional[Span]:
+        """
+        Innermost span whose body holds old lines first..last; last == first - 1
+        is an insertion before line first. A class only holds lines strictly
+        inside it, so edits to its header or closing line go to its parent.
+        """
+        found = None
+        for span in self.spans:
+            if span.lineno > first:
+                break
+            if last < first:
+                holds = span.lineno < first <= span.end_lineno
+            elif span.kind == "function":
+                holds = last <= span.end_lineno
+            else:
+                holds = span.lineno < first and last < span.end_lineno
+            if holds:
+                found = span  # Spans holding the same lines are nested, innermost last
+        return found
+
+
+class _FileState:
+    __slots__ = ("parser_class", "version", "source", "lines", "model", "span_map", "changes")
+
+    def __init__(self, parser_class, version: str, source: str, model: FileModel, span_map: SpanMap,
+                 changes: Optional[Dict[str, List[str]]] = None):
+        self.parser_class = parser_class
+        self.version = version
+        self.source = source
+        self.lines = source.split("\n")
+        self.model = model
+        self.span_map = span_map
+        self.changes = changes  # function ids changed and removed by the last edit
+
+
+class IncrementalParser:
+    def __init__(self, max_files: Optional[int] = None, parse_cache=None):
+        self.max_files = max_files or DEFAULT_MAX_FILES
+        self.parse_cache = parse_cache
+        self._files: "OrderedDict[str, _FileState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.full_parses = 0
+        self.incremental_parses = 0
+
+    def parse_model(self, parser_class, file_path: str) -> FileModel:
+        """
+        parser_class.parse_model(file_path), reparsing only the regions edited
+        since the last call. The model kept for the next edit is updated in
+        place, so callers get a copy of it they are free to change.
+        """
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                source = f.read()
+        except UnicodeDecodeError:
+            return self._full_parse(parser_class, file_path)
+
+        version = parser_class.parser_version()
+        with self._lock:
+            # Taken out while in use, so concurrent parses of one file never share a state; a parse
+            # that raises leaves none behind, and the next parse of the file is a full one
+            state = self._files.pop(file_path, None)
+        if state is not None and (state.parser_class is not parser_class or state.version != version):
+            state = None
+
+        if state is not None and state.source == source:
+            self._remember(file_path, state)
+            return state.model.copy()
+
+        result = self._reparse(state, source, file_path) if state is not None else None
+        if result is not None:
+            # Not stored in the parse cache, which only holds full parses
+            self.incremental_parses += 1
+            model, span_map, changes = result
+        else:
+            # Kept until the file is evicted, so held as CompactFunctionInfos
+            model = self._full_parse(parser_class, file_path).compact()
+            span_map = SpanMap(model)
+            changes = self._diff(state, span_map, source.split("\n")) if state is not None else None
+
+        self._remember(file_path, _FileState(parser_class, version, source, model, span_map, changes))
+        return model.copy()
+
+    def tracks(self, file_path: str) -> bool:
+        """Whether file_path was parsed before, so parse_model can reuse that parse"""
+        with self._lock:
+            return file_path in self._files
+
+    def changes(self, file_path: str) -> Optional[Dict[str, List[str]]]:
+        """{"changed": [...], "removed": [...]} function ids of the last edit, None if unknown"""
+        with self._lock:
+            state = self._files.get(file_path)
+            return state.changes if state is not None else None
+
+    def function_id(self, file_path: str, func: FunctionInfo) -> Optional[str]:
+        """Id of a function of the last parse of file_path, found by name and lines; stays the same across edits"""
+        with self._lock:
+            state = self._files.get(file_path)
+        if state is None:
+            return None
+        for span in state.span_map.spans:
+            if (span.kind == "function" and span.info.name == func.name
+                    and (span.lineno, span.end_lineno) == (func.lineno, func.end_lineno)):
+                return span.function_id
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files = len(self._files)
+        return {"files": files, "full_parses": self.full_parses, "incremental_parses": self.incremental_parses}
+
+    def _remember(self, file_path: str, state: _FileState) -> None:
+        with self._lock:
+            self._files[file_path] = state
+            self._files.move_to_end(file_path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+
+    def _full_parse(self, parser_class, file_path: str) -> FileModel:
+        self.full_parses += 1
+        if self.parse_cache is not None:
+            return self.parse_cache.parse_model(parser_class, file_path)
+        return parser_class.parse_model(file_path)
+
+    @staticmethod
+    def _diff(state: _FileState, span_map: SpanMap, lines: List[str]) -> Dict[str, List[str]]:
+        old = {span.function_id: span.content_digest(state.lines)
+               for span in state.span_map.spans if span.kind == "function"}
+        new = {span.function_id: span.content_digest(lines) for span in span_map.spans if span.kind == "function"}
+        return {
+            "changed": sorted(function_id for function_id, digest in new.items() if old.get(function_id) != digest),
+            "removed": sorted(set(old) - set(new))
+        }
+
+    # ===== REGION REPARSE =====
+
+    def _reparse(self, state: _FileState, source: str, file_path: str):
+        """(model, span map, changes) after reparsing only the edited region, or None for a full parse"""
+        old, lines = state.lines, source.split("\n")
+        limit = min(len(old), len(lines))
+        prefix = 0
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        first, last = prefix + 1, len(old) - suffix  # Edited old lines; last == first - 1 for an insertion
+        delta = len(lines) - len(old)
+
+        edited = "\n".join(old[first - 1:last] + lines[first - 1:last + delta])
+        if any(word in edited for word in _FILE_LEVEL_WORDS):
+            return None
+
+        span_map, model = state.span_map, state.model
+        python = model.language == "python"
+        container = span_map.container(first, last)
+        in_function = container is not None and container.kind == "function"
+        parent = container.parent if in_function else container
+        # Python spans end on their last statement, brace spans on their closing line
+        body_end = (parent.end_lineno if python else parent.end_lineno - 1) if parent else len(old)
+        siblings = span_map.children(parent)
+
+        if in_function:
+            start, end = container.lineno, container.end_lineno
+        else:
+            # The edited lines, plus the declarations they touch or directly border
+            start, end = first, last
+            near_start, near_end = first, last
+            while near_start > 1 and _is_trivia(old[near_start - 2]):
+                near_start -= 1
+            while near_end < len(old) and _is_trivia(old[near_end]):
+                near_end += 1
+            for span in siblings:
+                if span.lineno <= near_end + 1 and span.end_lineno >= near_start - 1:
+                    start, end = min(start, span.lineno), max(end, span.end_lineno)
+            # The rest of the gap up to the next declaration (leaving it its annotations and doc
+            # comment) can hold a declaration the last parse missed, which the edit may complete
+            gap_end = min([span.lineno - 1 for span in siblings if span.lineno > end] + [body_end])
+            while gap_end > end and _is_trivia(old[gap_end - 1]):
+                gap_end -= 1
+            end = max(end, gap_end)
+        # Take in the decorators, annotations and doc comments above the region; outside a
+        # function, everything back to the previous declaration, for the same reason
+        floor = max([parent.lineno + 1 if parent else 1]
+                    + [span.end_lineno + 1 for span in siblings if span.end_lineno < start])
+        while start > floor and (_is_trivia(old[start - 2]) or not in_function):
+            start -= 1
+        if parent is not None and (start <= parent.lineno or end > body_end):
+            return None
+
+        inside = []
+        ancestors = []
+        for span in span_map.spans:
+            if span.end_lineno < start or span.lineno > end:
+                continue
+            if start <= span.lineno and span.end_lineno <= end:
+                inside.append(span)
+            elif span.lineno <= start and span.end_lineno >= end:
+                ancestors.append(span)
+            else:
+                return None  # Straddles the region boundary
+
+        new_end = end + delta
+        text = "\n".join(lines[start - 1:new_end])
+        # What lies between the parent's header and the region, minus the complete declarations in it
+        context = []
+        line = parent.lineno if parent else 1
+        for span in siblings:
+            if span.end_lineno >= start:
+                break
+            context.extend(lines[line - 1:span.lineno - 1])
+            line = span.end_lineno + 1
+        context.extend(lines[line - 1:start - 1])
+        literal = _PYTHON_LITERAL if python else _BRACE_LITERAL
+        if not (_self_contained(text, literal) and _self_contained("\n".join(old[start - 1:end]), literal)
+                and _self_contained("\n".join(context), literal, "{" if parent and not python else "")):
+            return None
+        if python:
+            # Declarations of one block share its indentation
+            outside = ([span.lineno for span in siblings if span.end_lineno < start]
+                       + [span.lineno + delta for span in siblings if span.lineno > end])
+            block_indent = _indent(lines[outside[0] - 1]) if outside else None
+            if not self._python_block(lines, start, new_end, parent, parent is not None and end == parent.end_lineno,
+                                      block_indent):
+                return None
+        elif not self._between_statements(lines, start, new_end):
+            return None
+
+        in_class = parent is not None and parent.kind == "class"
+        try:
+            region, members = state.parser_class.parse_region(text, file_path, in_class)
+        except Exception:
+            return None  # Let the full parse report the error
+        for item in region.functions + region.classes:
+            item.lineno += start - 1
+            item.end_lineno += start - 1
+            if item.lineno < start or item.end_lineno > new_end:
+                return None
+        if in_function and not any(f.lineno == container.lineno and f.end_lineno == container.end_lineno + delta
+                                   for f in region.functions):
+            return None
+
+        # Stored like full parses from here on
+        positions = {id(func): index for index, func in enumerate(region.functions)}
+        if any(id(member) not in positions for member in members):
+            return None
+        region = region.compact()
+        members = [region.functions[positions[id(member)]] for member in members]
+
+        # The region checks out; only now touch the shared FunctionInfo and ClassInfo objects
+        old_spans = {span.function_id: span for span in inside}
+        old_digests = {span.function_id: span.content_digest(old) for span in inside}
+        dropped = {id(span.info) for span in inside}
+        kept_digests = {}
+        for span in span_map.spans:
+            if id(span.info) in dropped:
+                continue
+            if span.lineno > end:
+                span.info.lineno += delta
+                span.info.end_lineno += delta
+            elif span.end_lineno >= start:
+                span.info.end_lineno += delta  # Encloses the region
+                continue
+            if span.digest is not None:
+                kept_digests[id(span.info)] = span.digest
+
+        functions = [f for f in model.functions if id(f) not in dropped] + region.functions
+        classes = [c for c in model.classes if id(c) not in dropped] + region.classes
+        if in_class:
+            methods = [m for m in parent.info.methods if id(m) not in dropped] + members
+            parent.info.methods = sorted(methods, key=_sort_key)
+        merged = FileModel(model.file_path, model.language)
+        merged.functions = sorted(functions, key=_sort_key)
+        merged.classes = sorted(classes, key=_sort_key)
+        merged.imports = list(model.imports)
+        merged.constants = list(model.constants)
+
+        # Reuse the previous objects of functions and classes that are still there
+        new_map = SpanMap(merged, kept_digests)
+        fresh = {id(item) for item in region.functions + region.classes}
+        reused = {}
+        region_ids = set()
+        changed: Set[str] = {span.function_id for span in ancestors if span.kind == "function"}
+        for span in new_map.spans:
+            if id(span.info) not in fresh:
+                continue
+            previous = old_spans.get(span.function_id)
+            if previous is not None and previous.kind == span.kind:
+                self._update(previous.info, span.info)
+                reused[id(span.info)] = span.info = previous.info
+            if span.kind == "function":
+                region_ids.add(span.function_id)
+                if old_digests.get(span.function_id) != span.content_digest(lines):
+                    changed.add(span.function_id)
+        new_map.reindex()
+        merged.functions = [reused.get(id(f), f) for f in merged.functions]
+        merged.classes = [reused.get(id(c), c) for c in merged.classes]
+        for cls in merged.classes:
+            cls.methods = [reused.get(id(m), m) for m in cls.methods]
+        merged.signatures = {f.lineno: lines[f.lineno - 1].strip() for f in merged.functions if f.lineno}
+
+        removed = {function_id for function_id, span in old_spans.items() if span.kind == "function"} - region_ids
+        return merged, new_map, {"changed": sorted(changed), "removed": sorted(removed)}
+
+    @staticmethod
+    def _between_statements(lines: List[str], start: int, end: int) -> bool:
+        """Whether lines start..end of brace-language source neither start nor end inside a statement"""
+        code = [line.rstrip() for line in lines[start - 1:end] if _is_brace_code(line)]
+        if code and not code[-1].endswith(("}", ";")):
+            return False
+        before = start - 1
+        while before >= 1 and not _is_brace_code(lines[before - 1]):
+            before -= 1
+        return before < 1 or lines[before - 1].rstrip().endswith(("{", "}", ";"))
+
+    @staticmethod
+    def _python_block(lines: List[str], start: int, end: int, parent: Optional[Span], last_in_parent: bool,
+                      block_indent: Optional[int] = None) -> bool:
+        """Whether lines start..end hold whole statements of the block they were cut from"""
+        code = [line for line in range(start, end + 1) if _is_code(lines[line - 1])]
+        if last_in_parent and (not code or code[-1] != end):
+            return False  # The parent would end earlier
+        if not code:
+            return True
+        base = _indent(lines[code[0] - 1])
+        if any(_indent(lines[line - 1]) < base for line in code):
+            return False  # Dedents out of the block
+        if block_indent is not None and base != block_indent:
+            return False  # Indented into the declaration before, or not lined up with its siblings
+
+        before = start - 1
+        while before >= 1 and not _is_code(lines[before - 1]):
+            before -= 1
+        if before >= 1 and lines[before - 1].rstrip().endswith("\\"):
+            return False
+        # The closest statement above at the region's indentation or less is a sibling or the header
+        header = parent.lineno if parent else 0
+        header_indent = _indent(lines[header - 1]) if parent else 0
+        while before > header and (not _is_code(lines[before - 1]) or _indent(lines[before - 1]) > base):
+            before -= 1
+        if before > header and _indent(lines[before - 1]) < base:
+            return False  # Nested in a statement other than the enclosing declaration
+        if before <= header and (base <= header_indent if parent else base):
+            return False  # First statement of the block, but not indented under its header
+
+        after = end + 1
+        while after <= len(lines) and not _is_code(lines[after - 1]):
+            after += 1
+        if after > len(lines) or _indent(lines[after - 1]) == base:
+            return True
+        # Anything else below must leave the enclosing declaration, or it would not line up with the region
+        return _indent(lines[after - 1]) <= header_indent
+
+    @staticmethod
+    def _update(previous, parsed) -> None:
+        """Give a reused FunctionInfo or ClassInfo the fields of its reparse"""
+        previous.lineno, previous.end_lineno = parsed.lineno, parsed.end_lineno
+        if isinstance(previous, ClassInfo):
+            previous.methods, previous.attributes = parsed.methods, parsed.attributes
+        else:
+            previous.params, previous.docstring = parsed.params, parsed.docstring
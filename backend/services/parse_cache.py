@@ -0,0 +1,156 @@
+"""
+Persistent content-addressed parse cache.
+
+Parsed FileModels are stored in SQLite keyed by (content hash, parser,
+parser version), so an unchanged file is never parsed twice - not across
+requests, not across restarts, and not for identical copies at different
+paths. The cache is bounded in bytes and evicts least recently used entries.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from cache_config import get_cache_dir
+from models import FileModel
+from services.content_hash import ContentHasher
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed_files (
+    content_hash TEXT NOT NULL,
+    parser TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (content_hash, parser)
+);
+CREATE INDEX IF NOT EXISTS parsed_files_last_used ON parsed_files (last_used);
+"""
+
+# Hits only bump last_used in memory; they are written out in batches
+_TOUCH_FLUSH_SIZE = 256
+
+
+class ParseCache:
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 hasher: Optional[ContentHasher] = None):
+        self.cache_dir = cache_dir or os.getenv("PARSE_CACHE_DIR") or get_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, "parse_cache.sqlite3")
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("PARSE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hasher = hasher or ContentHasher()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parsed_files").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def parse_model(self, parser_class, file_path: str) -> FileModel:
+        """parser_class.parse_model(file_path), answered from the cache when the content was parsed before"""
+        model = self.lookup(parser_class, file_path)
+        if model is None:
+            model = parser_class.parse_model(file_path)
+            self.store(parser_class, file_path, model)
+        return model
+
+    def lookup(self, parser_class, file_path: str) -> Optional[FileModel]:
+        """Cached model for the current content of file_path, or None (counted as a miss)"""
+        key = self._key(parser_class, file_path)
+        if key is None:
+            return None  # Unreadable; let the parser raise
+
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute("SELECT data FROM parsed_files WHERE content_hash = ? AND parser = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(key)
+        return FileModel.from_dict(json.loads(zlib.decompress(row[0])), file_path)
+
+    def store(self, parser_class, file_path: str, model: FileModel) -> None:
+        """Remember a model parsed elsewhere (e.g. by a ParsePool worker)"""
+        key = self._key(parser_class, file_path)
+        if key is not None:
+            self._store(key, zlib.compress(json.dumps(model.to_dict(), separators=(',', ':')).encode('utf-8')))
+
+    def _key(self, parser_class, file_path: str) -> Optional[tuple]:
+        content_hash = self.hasher.digest(file_path)
+        if content_hash is None:
+            return None
+        return content_hash, f"{parser_class.__name__}:{parser_class.parser_version()}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._flush_touched()
+            with self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM parsed_files").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM parsed_files")
+            self._touched.clear()
+            self._total_bytes = 0
+
+    def _touch(self, key: tuple) -> None:
+        self._touched[key] = time.time()
+        if len(self._touched) >= _TOUCH_FLUSH_SIZE:
+            self._flush_touched()
+
+    def _flush_touched(self) -> None:
+        if not self._touched:
+            return
+        with self._connect() as conn:
+            conn.executemany("UPDATE parsed_files SET last_used = ? WHERE content_hash = ? AND parser = ?",
+                             [(used, key[0], key[1]) for key, used in self._touched.items()])
+        self._touched.clear()
+
+    def _store(self, key: tuple, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return  # Would evict everything else
+        with self._lock:
+            with self._connect() as conn:
+                previous = conn.execute("SELECT size FROM parsed_files WHERE content_hash = ? AND parser = ?", key).fetchone()
+                conn.execute("INSERT OR REPLACE INTO parsed_files VALUES (?, ?, ?, ?, ?)",
+                             (key[0], key[1], data, len(data), time.time()))
+            self._total_bytes += len(data) - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is back to 90% of its budget"""
+        self._flush_touched()
+        target = self.max_bytes * 0.9
+        with self._connect() as conn:
+            doomed = []
+            for content_hash, parser, size in conn.execute("SELECT content_hash, parser, size FROM parsed_files ORDER BY last_used"):
+                if self._total_bytes <= target:
+                    break
+                doomed.append((content_hash, parser))
+                self._total_bytes -= size
+            conn.executemany("DELETE FROM parsed_files WHERE content_hash = ? AND parser = ?", doomed)
+        self.evictions += len(doomed)
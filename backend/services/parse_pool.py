@@ -0,0 +1,141 @@
+"""
+Process-pool parsing stage for repository-wide endpoints.
+
+Files are parsed in chunks by long-lived worker processes (javalang and the
+other parser modules are imported once per worker), and results are handed
+back as soon as each chunk completes so documentation can start on the first
+files while the rest are still being parsed. Content already in the parse
+cache never leaves the request process.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import FileModel
+from parsers import PARSERS
+
+DEFAULT_PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_PARSE_CHUNK_SIZE = int(os.getenv("PARSE_CHUNK_SIZE", "16"))
+
+# (index in the input, language, full path)
+_ParseJob = Tuple[int, str, str]
+# (index in the input, parsed model or None, error message or None)
+_ParseOutcome = Tuple[int, Optional[FileModel], Optional[str]]
+
+
+def _init_worker() -> None:
+    """Import the heavy parser dependencies once per worker process"""
+    try:
+        import javalang  # noqa: F401
+    except ImportError:
+        pass  # Only needed when JAVA_PARSER_MODE selects javalang
+
+
+def _parse_chunk(jobs: List[_ParseJob]) -> List[_ParseOutcome]:
+    outcomes = []
+    for index, language, full_path in jobs:
+        try:
+            outcomes.append((index, PARSERS[language].parse_model(full_path), None))
+        except Exception as e:
+            outcomes.append((index, None, str(e)))
+    return outcomes
+
+
+class ParsePool:
+    def __init__(self, max_workers: int = DEFAULT_PARSE_WORKERS, chunk_size: int = DEFAULT_PARSE_CHUNK_SIZE,
+                 parse_cache=None):
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = max(1, chunk_size)
+        self.parse_cache = parse_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # The API runs watcher threads, so workers are spawned rather than forked
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def iter_parsed(self, code_files: Iterable[Dict[str, str]], ordered: bool = False
+                    ) -> Iterator[Tuple[Dict[str, str], Optional[FileModel], Optional[str]]]:
+        """
+        Parse code files (as returned by RepoScanner.get_code_files_for_analysis)
+        and yield (file_info, model, error) for each one as soon as it is parsed.
+        With ordered=True results are released in input order instead.
+        """
+        code_files = list(code_files)
+        jobs: List[_ParseJob] = []
+        ready: Dict[int, _ParseOutcome] = {}
+        next_index = 0
+
+        for index, file_info in enumerate(code_files):
+            parser_class = PARSERS.get(file_info["language"])
+            if parser_class is None:
+                ready[index] = (index, None, f"Unsupported language: {file_info['language']}")
+                continue
+            cached = self.parse_cache.lookup(parser_class, file_info["full_path"]) if self.parse_cache else None
+            if cached is not None:
+                ready[index] = (index, cached, None)
+            else:
+                jobs.append((index, file_info["language"], file_info["full_path"]))
+
+        def release():
+            """Hand out everything that may be yielded now"""
+            nonlocal next_index
+            if not ordered:
+                outcomes = list(ready.values())
+                ready.clear()
+                return outcomes
+            outcomes = []
+            while next_index in ready:
+                outcomes.append(ready.pop(next_index))
+                next_index += 1
+            return outcomes
+
+        for outcome in release():
+            yield code_files[outcome[0]], outcome[1], outcome[2]
+
+        if self.max_workers == 1 or len(jobs) <= self.chunk_size:
+            # Not worth a round trip through the pool
+            completed = (_parse_chunk([job]) for job in jobs)
+        else:
+            completed = self._run_chunks(jobs)
+
+        for outcomes in completed:
+            for index, model, error in outcomes:
+                if model is not None and self.parse_cache is not None:
+                    parser_class = PARSERS[code_files[index]["language"]]
+                    self.parse_cache.store(parser_class, code_files[index]["full_path"], model)
+                ready[index] = (index, model, error)
+            for outcome in release():
+                yield code_files[outcome[0]], outcome[1], outcome[2]
+
+    def _run_chunks(self, jobs: List[_ParseJob]) -> Iterator[List[_ParseOutcome]]:
+        executor = self._get_executor()
+        pending = {executor.submit(_parse_chunk, jobs[start:start + self.chunk_size])
+                   for start in range(0, len(jobs), self.chunk_size)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        except BrokenProcessPool:
+            self.shutdown()  # A worker died; start a fresh pool next time
+            raise
+        finally:
+            for future in pending:
+                future.cancel()  # The consumer stopped early
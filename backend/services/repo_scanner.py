@@ -2,12 +2,50 @@
 Repository structure scanner for comprehensive codebase analysis
 """
 import os
-from typing import Dict, List, Any
-from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence, Tuple
 import json
 
+from parsers import PARSERS
+from services.repo_snapshot import FileRecord, RepoSnapshot, SnapshotBuilder
+from services.content_hash import ContentHasher
+from services.git_index_reader import index_signature, list_tracked_files, walk_from_paths
+from services.repo_walker import ParallelWalker, iter_walk
+from services.scan_cache import ScanCache
+
+# Directories never descended into while walking a repository (git repositories
+# are read from the index, so .gitignore already covers build output there)
+IGNORED_DIRS = {'node_modules', 'target', '__pycache__', 'venv', 'env'}
+
+# Root-level build files that determine the project type and dependencies
+PROJECT_FILES = {
+    'pom.xml': 'maven_java',
+    'build.gradle': 'gradle_java',
+    'package.json': 'node_js',
+    'requirements.txt': 'python',
+    'setup.py': 'python',
+    'Cargo.toml': 'rust',
+    'go.mod': 'go'
+}
+
+# Snapshots shared by everything running inside RepoScanner.snapshot_scope()
+_active_snapshots: ContextVar[Optional[Dict[str, RepoSnapshot]]] = ContextVar("repo_snapshots", default=None)
+
+def _walk_order_key(parts: List[str]) -> Tuple[Tuple[int, str], ...]:
+    """Sort key matching walk order: a directory's files come before its sub-directories"""
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+def _file_extension(filename: str) -> str:
+    """Lower-cased suffix, same as Path(filename).suffix.lower() without building a Path"""
+    dot = filename.rfind('.')
+    if dot <= 0 or dot == len(filename) - 1:
+        return ''
+    return filename[dot:].lower()
+
 class RepoScanner:
-    def __init__(self):
+    def __init__(self, scan_cache: Optional[ScanCache] = None, walker: Optional[ParallelWalker] = None,
+                 use_git_index: Optional[bool] = None, include_untracked: Optional[bool] = None):
         self.supported_extensions = {
             '.py': 'python',
             '.js': 'javascript',
@@ -22,86 +60,199 @@ class RepoScanner:
             '.yml': 'yaml',
             '.yaml': 'yaml'
         }
+        self.scan_cache = scan_cache  # Optional persistent incremental cache
+        self.live_index = None        # Optional RepoWatcher answering from memory
+        self.walker = walker or (scan_cache.walker if scan_cache else ParallelWalker())
+        # Enumerate git repositories from the index instead of walking them
+        if use_git_index is None:
+            use_git_index = os.getenv("SCAN_USE_GIT_INDEX", "true").lower() == "true"
+        if include_untracked is None:
+            include_untracked = os.getenv("SCAN_INCLUDE_UNTRACKED", "false").lower() == "true"
+        self.use_git_index = use_git_index
+        self.include_untracked = include_untracked
+        self._index_snapshots: Dict[str, Tuple[Any, RepoSnapshot]] = {}
+        self.content_hasher = ContentHasher()  # Finds identical files before parsing
+        self.parse_cache = None                # Optional ParseCache used by extract_class_structure
     
-    def scan_repository(self, repo_path: str) -> Dict[str, Any]:
-        """Scan entire repository and return structure analysis"""
+    @contextmanager
+    def snapshot_scope(self):
+        """Reuse one snapshot per repository for everything run inside this block"""
+        token = _active_snapshots.set({}) if _active_snapshots.get() is None else None
         try:
-            repo_structure = {
-                "repository_path": repo_path,
-                "total_files": 0,
-                "languages": {},
-                "directories": [],
-                "file_tree": {},
-                "code_files": [],
-                "documentation_files": [],
-                "config_files": [],
-                "test_files": [],
-                "main_files": [],
-                "package_structure": {}
-            }
+            yield
+        finally:
+            if token is not None:
+                _active_snapshots.reset(token)
+    
+    def get_snapshot(self, repo_path: str) -> RepoSnapshot:
+        """Return the snapshot for repo_path, walking the tree only once per scope"""
+        if self.live_index is not None:
+            snapshot = self.live_index.snapshot(repo_path)
+            if snapshot is not None:
+                return snapshot
+        
+        scope = _active_snapshots.get()
+        key = os.path.abspath(repo_path)
+        if scope is not None and key in scope:
+            return scope[key]
+        
+        snapshot = self.build_snapshot(repo_path)
+        if scope is not None:
+            scope[key] = snapshot
+        return snapshot
+    
+    def build_snapshot(self, repo_path: str) -> RepoSnapshot:
+        """Walk the repository once and index everything the analyses need"""
+        # Analyze package/project structure
+        package_structure = self._analyze_package_structure(repo_path)
+        
+        if self.use_git_index:
+            snapshot = self._snapshot_from_git_index(repo_path, package_structure)
+            if snapshot is not None:
+                return snapshot
+        
+        if self.scan_cache is None:
+            return self._snapshot_from_walk(repo_path, self._walk(repo_path), package_structure)
+        
+        # Only directories whose signature changed are listed again
+        scan = self.scan_cache.scan(repo_path, self._should_descend)
+        previous = self.scan_cache.cached_snapshot(repo_path)
+        if not scan.changed and previous is not None and previous.package_structure() == package_structure:
+            return previous
+        
+        snapshot = self._snapshot_from_walk(repo_path, scan.entries, package_structure)
+        self.scan_cache.remember_snapshot(repo_path, snapshot)
+        return snapshot
+    
+    def _snapshot_from_git_index(self, repo_path: str, package_structure: Dict[str, Any]) -> Optional[RepoSnapshot]:
+        """Build the snapshot from the files git tracks, without walking the working tree"""
+        key = os.path.abspath(repo_path)
+        signature = None if self.include_untracked else index_signature(repo_path)
+        if signature is not None:
+            cached = self._index_snapshots.get(key)
+            if cached and cached[0] == signature and cached[1].repo_path == repo_path \
+                    and cached[1].package_structure() == package_structure:
+                return cached[1]
+        
+        paths = list_tracked_files(repo_path, include_untracked=self.include_untracked)
+        if paths is None:
+            return None  # Not a git repository
+        
+        snapshot = self._snapshot_from_walk(repo_path, walk_from_paths(paths, self._should_descend), package_structure)
+        if signature is not None:
+            self._index_snapshots[key] = (signature, snapshot)
+        return snapshot
+    
+    def _should_descend(self, dirname: str) -> bool:
+        """Skip hidden and common ignored directories"""
+        return not dirname.startswith('.') and dirname not in IGNORED_DIRS
+    
+    def _walk(self, repo_path: str) -> Iterator[Tuple[str, Sequence[str]]]:
+        """Yield (relative directory, filenames) pairs top-down"""
+        for relative_dir, listing in self.walker.walk(repo_path, self._should_descend):
+            yield relative_dir, listing.filenames
+    
+    def _snapshot_from_walk(self, repo_path: str, walk: Iterable[Tuple[str, Sequence[str]]],
+                            package_structure: Dict[str, Any]) -> RepoSnapshot:
+        """Turn a top-down directory walk into a columnar RepoSnapshot"""
+        builder = SnapshotBuilder(repo_path)
+        
+        for relative_dir, filenames in walk:
+            builder.add_directory(relative_dir, self._identify_architectural_layer(relative_dir))
             
-            # Walk through all directories
-            for root, dirs, files in os.walk(repo_path):
-                # Skip common ignored directories
-                dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'target', '__pycache__', 'venv', 'env']]
-                
-                relative_path = os.path.relpath(root, repo_path)
-                if relative_path != '.':
-                    repo_structure["directories"].append(relative_path)
-                
-                for file in files:
-                    if file.startswith('.'):
+            for file in filenames:
+                hidden = file.startswith('.')
+                lang = self.supported_extensions.get(_file_extension(file))
+                purpose = None
+                if lang:
+                    relative_file_path = file if relative_dir == '.' else os.path.join(relative_dir, file)
+                    purpose = self._get_file_purpose(file.lower(), relative_file_path)
+                # Categorize files
+                category = self._file_category(file) if lang and not hidden else None
+                builder.add_file(file, lang, purpose, category, hidden)
+        
+        return builder.build(package_structure)
+    
+    def _file_record(self, relative_dir: str, file: str) -> FileRecord:
+        """Classify one file of the walk"""
+        relative_file_path = file if relative_dir == '.' else os.path.join(relative_dir, file)
+        lang = self.supported_extensions.get(_file_extension(file))
+        return FileRecord(
+            path=relative_file_path,
+            name=file,
+            directory=relative_dir,
+            language=lang,
+            purpose=self._get_file_purpose(file.lower(), relative_file_path) if lang else None,
+            hidden=file.startswith('.')
+        )
+    
+    def iter_file_records(self, repo_path: str, start_after: Optional[str] = None) -> Iterator[FileRecord]:
+        """
+        Yield the visible files of the repository while the walk proceeds.
+        Files come in walk order (files of a directory before its sub-directories,
+        names sorted), and start_after resumes right after a previously returned path.
+        """
+        cursor_key = _walk_order_key(start_after.split(os.sep)) if start_after else None
+        
+        def before_cursor(relative_dir: str) -> bool:
+            """True when the whole directory sorts before the cursor"""
+            if cursor_key is None or relative_dir == '.':
+                return False
+            dir_key = tuple((1, part) for part in relative_dir.split(os.sep))
+            return dir_key < cursor_key[:len(dir_key)]
+        
+        live = self.live_index.snapshot(repo_path) if self.live_index is not None else None
+        paths = list_tracked_files(repo_path, self.include_untracked) if self.use_git_index and live is None else None
+        if live is not None:
+            walk = ((d.path, d.filenames) for d in live.iter_directories() if not before_cursor(d.path))
+        elif paths is not None:
+            walk = ((d, f) for d, f in walk_from_paths(paths, self._should_descend) if not before_cursor(d))
+        else:
+            walk = ((d, listing.filenames) for d, listing in iter_walk(repo_path, self._should_descend, before_cursor))
+        
+        for relative_dir, filenames in walk:
+            for file in filenames:
+                if file.startswith('.'):
+                    continue
+                record = self._file_record(relative_dir, file)
+                if cursor_key is not None:
+                    if _walk_order_key(record.path.split(os.sep)) <= cursor_key:
                         continue
-                        
-                    file_path = os.path.join(root, file)
-                    relative_file_path = os.path.relpath(file_path, repo_path)
-                    
-                    repo_structure["total_files"] += 1
-                    
-                    # Analyze file type
-                    file_ext = Path(file).suffix.lower()
-                    if file_ext in self.supported_extensions:
-                        lang = self.supported_extensions[file_ext]
-                        repo_structure["languages"][lang] = repo_structure["languages"].get(lang, 0) + 1
-                        
-                        # Categorize files
-                        self._categorize_file(file, relative_file_path, repo_structure)
-            
-            # Analyze package/project structure
-            repo_structure["package_structure"] = self._analyze_package_structure(repo_path)
-            
-            return repo_structure
-            
+                    cursor_key = None  # Everything from here on sorts after the cursor
+                yield record
+    
+    def scan_repository(self, repo_path: str) -> Dict[str, Any]:
+        """Scan entire repository and return structure analysis"""
+        try:
+            return self.get_snapshot(repo_path).structure()
         except Exception as e:
             return {"error": f"Failed to scan repository: {str(e)}"}
     
-    def _categorize_file(self, filename: str, relative_path: str, structure: Dict):
-        """Categorize files by their purpose"""
+    def _file_category(self, filename: str) -> Optional[str]:
+        """Name of the scan_repository category a file belongs to, if any"""
         filename_lower = filename.lower()
         
         # Code files
         if any(filename.endswith(ext) for ext in ['.py', '.js', '.jsx', '.ts', '.tsx', '.java']):
-            structure["code_files"].append({
-                "path": relative_path,
-                "name": filename,
-                "type": self._get_file_purpose(filename_lower, relative_path)
-            })
+            return "code_files"
         
         # Documentation files
         elif any(filename.endswith(ext) for ext in ['.md', '.txt', '.rst']):
-            structure["documentation_files"].append(relative_path)
+            return "documentation_files"
         
         # Configuration files
         elif any(name in filename_lower for name in ['config', 'setting', 'properties', 'pom.xml', 'package.json', 'requirements.txt']):
-            structure["config_files"].append(relative_path)
+            return "config_files"
         
         # Test files
         elif any(name in filename_lower for name in ['test', 'spec']):
-            structure["test_files"].append(relative_path)
+            return "test_files"
         
         # Main/entry files
         elif any(name in filename_lower for name in ['main', 'app', 'index', 'application']):
-            structure["main_files"].append(relative_path)
+            return "main_files"
+        
+        return None
     
     def _get_file_purpose(self, filename: str, relative_path: str) -> str:
         """Determine the purpose of a code file"""
@@ -137,17 +288,7 @@ class RepoScanner:
         }
         
         # Check for common project files
-        project_files = {
-            'pom.xml': 'maven_java',
-            'build.gradle': 'gradle_java',
-            'package.json': 'node_js',
-            'requirements.txt': 'python',
-            'setup.py': 'python',
-            'Cargo.toml': 'rust',
-            'go.mod': 'go'
-        }
-        
-        for file, project_type in project_files.items():
+        for file, project_type in PROJECT_FILES.items():
             file_path = os.path.join(repo_path, file)
             if os.path.exists(file_path):
                 structure["project_type"] = project_type
@@ -221,65 +362,35 @@ class RepoScanner:
         if file_types is None:
             file_types = ['python', 'javascript', 'typescript', 'java']
         
-        files_for_analysis = []
+        return self.get_snapshot(repo_path).code_files_for_analysis(file_types)
+    
+    def group_identical_files(self, code_files: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """
+        Group code files (as returned by get_code_files_for_analysis) whose bytes
+        are identical. The first file of each group is the one to parse; every
+        hashed file gets a "content_hash" entry.
+        """
+        by_path = {}
+        for file_info in code_files:
+            by_path.setdefault(file_info["full_path"], []).append(file_info)
         
-        for root, dirs, files in os.walk(repo_path):
-            # Skip ignored directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'target', '__pycache__', 'venv', 'env']]
-            
-            for file in files:
-                file_ext = Path(file).suffix.lower()
-                if file_ext in self.supported_extensions:
-                    lang = self.supported_extensions[file_ext]
-                    if lang in file_types:
-                        full_path = os.path.join(root, file)
-                        relative_path = os.path.relpath(full_path, repo_path)
-                        
-                        files_for_analysis.append({
-                            "file_path": relative_path,
-                            "full_path": full_path,
-                            "language": lang,
-                            "file_type": self._get_file_purpose(file.lower(), relative_path)
-                        })
-        
-        return files_for_analysis
+        groups = []
+        for digest, paths in self.content_hasher.group(by_path):
+            group = [file_info for path in paths for file_info in by_path[path]]
+            if digest is not None:
+                for file_info in group:
+                    file_info["content_hash"] = digest
+            groups.append(group)
+        return groups
     
     def generate_code_structure_tree(self, repo_path: str) -> str:
         """Generate a visual tree structure of the codebase"""
         try:
-            structure_lines = []
-            structure_lines.append("```")
-            structure_lines.append(f"{os.path.basename(repo_path)}/")
-            
-            # Get all files and directories
-            for root, dirs, files in os.walk(repo_path):
-                # Skip hidden and build directories
-                dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'target', '__pycache__', 'venv', 'env', 'bin', 'obj']]
-                
-                level = root.replace(repo_path, '').count(os.sep)
-                indent = '  ' * level
-                subindent = '  ' * (level + 1)
-                
-                if level > 0:  # Don't show root again
-                    relative_path = os.path.relpath(root, repo_path)
-                    structure_lines.append(f"{indent}├── {os.path.basename(root)}/")
-                
-                # Show files in this directory
-                for file in files[:10]:  # Limit files shown per directory
-                    if not file.startswith('.'):
-                        file_ext = Path(file).suffix.lower()
-                        if file_ext in self.supported_extensions or file in ['README.md', 'pom.xml', 'package.json', 'requirements.txt']:
-                            structure_lines.append(f"{subindent}├── {file}")
-                
-                if len(files) > 10:
-                    structure_lines.append(f"{subindent}└── ... ({len(files) - 10} more files)")
-                
-                # Limit depth to avoid massive output
-                if level > 3:
-                    break
-            
-            structure_lines.append("```")
-            return "\n".join(structure_lines)
+            tree_lines = self.get_snapshot(repo_path).structure_tree(
+                highlighted_files=('README.md', 'pom.xml', 'package.json', 'requirements.txt'),
+                supported_extensions=self.supported_extensions
+            )
+            return "\n".join(["```", *tree_lines, "```"])
         except Exception as e:
             return f"Error generating structure tree: {str(e)}"
     
@@ -295,22 +406,7 @@ class RepoScanner:
         
         try:
             # Analyze by file types and locations
-            for root, dirs, files in os.walk(repo_path):
-                dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'target', '__pycache__', 'venv', 'env']]
-                
-                relative_path = os.path.relpath(root, repo_path)
-                layer_name = self._identify_architectural_layer(relative_path)
-                
-                if layer_name != "unknown":
-                    if layer_name not in architecture["layers"]:
-                        architecture["layers"][layer_name] = []
-                    
-                    for file in files:
-                        if any(file.endswith(ext) for ext in ['.py', '.js', '.java', '.ts']):
-                            architecture["layers"][layer_name].append({
-                                "file": file,
-                                "path": relative_path
-                            })
+            architecture["layers"] = self.get_snapshot(repo_path).layers()
             
             # Detect architectural patterns
             if "controller" in architecture["layers"] or "service" in architecture["layers"]:
@@ -357,155 +453,12 @@ class RepoScanner:
         }
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            if language == 'java':
-                structure = self._extract_java_structure(content)
-            elif language in ['python', 'py']:
-                structure = self._extract_python_structure(content)
-            elif language in ['javascript', 'js', 'typescript', 'ts']:
-                structure = self._extract_js_structure(content)
-                
+            parser_class = PARSERS.get(language)
+            if parser_class and self.parse_cache is not None:
+                structure = self.parse_cache.parse_model(parser_class, file_path).class_structure()
+            elif parser_class:
+                structure = parser_class.parse_model(file_path).class_structure()
         except Exception as e:
             structure["error"] = str(e)
         
         return structure
-    
-    def _extract_java_structure(self, content: str) -> Dict[str, Any]:
-        """Extract Java class structure"""
-        structure = {"classes": [], "functions": [], "imports": [], "constants": []}
-        
-        lines = content.split('\n')
-        current_class = None
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            # Extract imports
-            if line.startswith('import '):
-                structure["imports"].append(line.replace('import ', '').replace(';', ''))
-            
-            # Extract class declarations
-            if 'class ' in line and '{' in line:
-                class_match = line.split('class ')[1].split('{')[0].strip()
-                current_class = {
-                    "name": class_match.split()[0],
-                    "line": i + 1,
-                    "methods": [],
-                    "attributes": []
-                }
-                structure["classes"].append(current_class)
-            
-            # Extract methods
-            if current_class and ('public ' in line or 'private ' in line or 'protected ' in line) and '(' in line and ')' in line:
-                if 'class ' not in line:  # Not a class declaration
-                    method_name = self._extract_method_name_java(line)
-                    if method_name:
-                        current_class["methods"].append({
-                            "name": method_name,
-                            "line": i + 1,
-                            "signature": line.strip()
-                        })
-        
-        return structure
-    
-    def _extract_python_structure(self, content: str) -> Dict[str, Any]:
-        """Extract Python class and function structure"""
-        structure = {"classes": [], "functions": [], "imports": [], "constants": []}
-        
-        lines = content.split('\n')
-        current_class = None
-        
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            
-            # Extract imports
-            if stripped.startswith('import ') or stripped.startswith('from '):
-                structure["imports"].append(stripped)
-            
-            # Extract class declarations
-            if stripped.startswith('class '):
-                class_name = stripped.split('class ')[1].split('(')[0].split(':')[0].strip()
-                current_class = {
-                    "name": class_name,
-                    "line": i + 1,
-                    "methods": [],
-                    "attributes": []
-                }
-                structure["classes"].append(current_class)
-            
-            # Extract function/method declarations
-            if stripped.startswith('def '):
-                func_name = stripped.split('def ')[1].split('(')[0].strip()
-                func_info = {
-                    "name": func_name,
-                    "line": i + 1,
-                    "signature": stripped
-                }
-                
-                if current_class:
-                    current_class["methods"].append(func_info)
-                else:
-                    structure["functions"].append(func_info)
-        
-        return structure
-    
-    def _extract_js_structure(self, content: str) -> Dict[str, Any]:
-        """Extract JavaScript/TypeScript structure"""
-        structure = {"classes": [], "functions": [], "imports": [], "constants": []}
-        
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            
-            # Extract imports
-            if stripped.startswith('import ') or stripped.startswith('const ') and 'require(' in stripped:
-                structure["imports"].append(stripped)
-            
-            # Extract class declarations
-            if stripped.startswith('class '):
-                class_name = stripped.split('class ')[1].split('{')[0].split('extends')[0].strip()
-                structure["classes"].append({
-                    "name": class_name,
-                    "line": i + 1,
-                    "methods": []
-                })
-            
-            # Extract function declarations
-            if stripped.startswith('function ') or 'function(' in stripped:
-                func_name = self._extract_function_name_js(stripped)
-                if func_name:
-                    structure["functions"].append({
-                        "name": func_name,
-                        "line": i + 1,
-                        "signature": stripped
-                    })
-        
-        return structure
-    
-    def _extract_method_name_java(self, line: str) -> str:
-        """Extract method name from Java method declaration"""
-        try:
-            # Remove access modifiers and return type
-            parts = line.replace('public', '').replace('private', '').replace('protected', '').replace('static', '').strip()
-            # Find method name (word before opening parenthesis)
-            if '(' in parts:
-                before_paren = parts.split('(')[0].strip()
-                method_name = before_paren.split()[-1]
-                return method_name
-        except:
-            pass
-        return None
-    
-    def _extract_function_name_js(self, line: str) -> str:
-        """Extract function name from JavaScript function declaration"""
-        try:
-            if 'function ' in line:
-                after_function = line.split('function ')[1]
-                func_name = after_function.split('(')[0].strip()
-                return func_name
-        except:
-            pass
-        return None
@@ -0,0 +1,302 @@
+"""
+Immutable single-pass repository index shared by all RepoScanner analyses.
+
+Scan results are stored column by column instead of one dict per file: an
+interned directory table, array-backed language/purpose/category codes and
+the bare file names. Paths and the JSON-style dicts returned by the views are
+only materialized when a view is called, which keeps a snapshot of a million
+files in the tens of megabytes.
+"""
+import copy
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Extensions counted as code by the architecture view
+ARCHITECTURE_EXTENSIONS = ('.py', '.js', '.java', '.ts')
+
+# Extra directories hidden from the visual structure tree
+TREE_IGNORED_DIRS = {'bin', 'obj'}
+
+CATEGORY_NAMES = ("code_files", "documentation_files", "config_files", "test_files", "main_files")
+
+
+class DirectoryRecord(NamedTuple):
+    """A directory visited during the walk, with its raw file listing"""
+    path: str                 # relative to the repository root, '.' for the root
+    depth: int
+    filenames: Tuple[str, ...]
+    layer: str                # architectural layer of the directory
+
+
+class FileRecord:
+    """A single file visited during the walk"""
+    __slots__ = ("path", "name", "directory", "language", "purpose", "hidden")
+
+    def __init__(self, path: str, name: str, directory: str, language: Optional[str],
+                 purpose: Optional[str], hidden: bool):
+        self.path = path              # relative to the repository root
+        self.name = name
+        self.directory = directory
+        self.language = language      # None for unsupported extensions
+        self.purpose = purpose        # only set for supported languages
+        self.hidden = hidden
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.path!r}, language={self.language!r}, purpose={self.purpose!r})"
+
+
+class _CodeTable:
+    """Maps a small set of strings to byte codes; code 0 stands for None"""
+    __slots__ = ("values", "_codes")
+
+    def __init__(self, values: Sequence[str] = ()):
+        self.values: List[Optional[str]] = [None]
+        self._codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > 255:
+                raise ValueError("too many distinct values for a byte code")
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class SnapshotBuilder:
+    """Accumulates a top-down walk into the columnar snapshot layout"""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.languages = _CodeTable()
+        self.purposes = _CodeTable()
+        self.layers = _CodeTable()
+        self.categories = _CodeTable(CATEGORY_NAMES)
+
+        # Directory table
+        self.dir_paths: List[str] = []
+        self.dir_depths = array('H')
+        self.dir_layers = array('B')
+        self.dir_first_file = array('L')
+
+        # File columns
+        self.file_names: List[str] = []
+        self.file_dirs = array('L')
+        self.file_languages = array('B')
+        self.file_purposes = array('B')
+        self.file_categories = array('B')
+        self.file_hidden = bytearray()
+
+    def add_directory(self, relative_dir: str, layer: str) -> None:
+        self.dir_paths.append(sys.intern(relative_dir))
+        self.dir_depths.append(0 if relative_dir == '.' else relative_dir.count(os.sep) + 1)
+        self.dir_layers.append(self.layers.code(layer))
+        self.dir_first_file.append(len(self.file_names))
+
+    def add_file(self, name: str, language: Optional[str], purpose: Optional[str],
+                 category: Optional[str], hidden: bool) -> None:
+        """Add a file of the directory added last"""
+        self.file_names.append(sys.intern(name))
+        self.file_dirs.append(len(self.dir_paths) - 1)
+        self.file_languages.append(self.languages.code(language))
+        self.file_purposes.append(self.purposes.code(purpose))
+        self.file_categories.append(self.categories.code(category))
+        self.file_hidden.append(1 if hidden else 0)
+
+    def build(self, package_structure: Dict[str, Any]) -> "RepoSnapshot":
+        return RepoSnapshot(self, package_structure)
+
+
+class RepoSnapshot:
+    """
+    Result of one repository traversal.
+
+    Every RepoScanner analysis is a view over this object, so a single walk
+    can answer scan_repository, analyze_code_architecture,
+    generate_code_structure_tree and get_code_files_for_analysis.
+    Views always return fresh containers; the snapshot itself never changes.
+    """
+
+    def __init__(self, builder: SnapshotBuilder, package_structure: Dict[str, Any]):
+        self._repo_path = builder.repo_path
+        self._languages = tuple(builder.languages.values)
+        self._purposes = tuple(builder.purposes.values)
+        self._layers = tuple(builder.layers.values)
+        self._category_codes = {name: builder.categories.code(name) for name in CATEGORY_NAMES}
+
+        self._dir_paths = tuple(builder.dir_paths)
+        self._dir_depths = builder.dir_depths
+        self._dir_layers = builder.dir_layers
+        self._dir_first_file = builder.dir_first_file
+
+        self._file_names = tuple(builder.file_names)
+        self._file_dirs = builder.file_dirs
+        self._file_languages = builder.file_languages
+        self._file_purposes = builder.file_purposes
+        self._file_categories = builder.file_categories
+        self._file_hidden = bytes(builder.file_hidden)
+        self._package_structure = package_structure
+
+        language_counts = [0] * len(self._languages)
+        for code, hidden in zip(self._file_languages, self._file_hidden):
+            if not hidden:
+                language_counts[code] += 1
+        self._language_counts = {
+            language: count for language, count in zip(self._languages, language_counts)
+            if language is not None and count
+        }
+        self._total_files = len(self._file_hidden) - self._file_hidden.count(1)
+
+    @property
+    def repo_path(self) -> str:
+        return self._repo_path
+
+    @property
+    def total_files(self) -> int:
+        return self._total_files
+
+    @property
+    def language_counts(self) -> Dict[str, int]:
+        return dict(self._language_counts)
+
+    def package_structure(self) -> Dict[str, Any]:
+        return copy.deepcopy(self._package_structure)
+
+    # ===== RECORD ACCESS =====
+
+    def __len__(self) -> int:
+        return len(self._file_names)
+
+    def _dir_filenames(self, index: int) -> Tuple[str, ...]:
+        start = self._dir_first_file[index]
+        end = self._dir_first_file[index + 1] if index + 1 < len(self._dir_paths) else len(self._file_names)
+        return self._file_names[start:end]
+
+    def _file_path(self, index: int) -> str:
+        directory = self._dir_paths[self._file_dirs[index]]
+        name = self._file_names[index]
+        return name if directory == '.' else directory + os.sep + name
+
+    def iter_directories(self) -> Iterator[DirectoryRecord]:
+        for index, path in enumerate(self._dir_paths):
+            yield DirectoryRecord(path, self._dir_depths[index], self._dir_filenames(index),
+                                  self._layers[self._dir_layers[index]])
+
+    @property
+    def directories(self) -> List[DirectoryRecord]:
+        return list(self.iter_directories())
+
+    def file_record(self, index: int) -> FileRecord:
+        return FileRecord(
+            self._file_path(index),
+            self._file_names[index],
+            self._dir_paths[self._file_dirs[index]],
+            self._languages[self._file_languages[index]],
+            self._purposes[self._file_purposes[index]],
+            bool(self._file_hidden[index])
+        )
+
+    def iter_files(self) -> Iterator[FileRecord]:
+        for index in range(len(self._file_names)):
+            yield self.file_record(index)
+
+    def category(self, name: str) -> List[Any]:
+        """Materialize one file category (code_files, test_files, ...)"""
+        code = self._category_codes[name]
+        indexes = [i for i, c in enumerate(self._file_categories) if c == code]
+        if name == "code_files":
+            return [
+                {
+                    "path": self._file_path(i),
+                    "name": self._file_names[i],
+                    "type": self._purposes[self._file_purposes[i]]
+                }
+                for i in indexes
+            ]
+        return [self._file_path(i) for i in indexes]
+
+    # ===== VIEWS =====
+
+    def structure(self) -> Dict[str, Any]:
+        """Repository structure in the scan_repository format"""
+        return {
+            "repository_path": self._repo_path,
+            "total_files": self._total_files,
+            "languages": self.language_counts,
+            "directories": [path for path in self._dir_paths if path != '.'],
+            "file_tree": {},
+            "code_files": self.category("code_files"),
+            "documentation_files": self.category("documentation_files"),
+            "config_files": self.category("config_files"),
+            "test_files": self.category("test_files"),
+            "main_files": self.category("main_files"),
+            "package_structure": self.package_structure()
+        }
+
+    def layers(self) -> Dict[str, List[Dict[str, str]]]:
+        """Code files grouped by the architectural layer of their directory"""
+        layers: Dict[str, List[Dict[str, str]]] = {}
+        for index, path in enumerate(self._dir_paths):
+            layer = self._layers[self._dir_layers[index]]
+            if layer == "unknown":
+                continue
+            entries = layers.setdefault(layer, [])
+            for filename in self._dir_filenames(index):
+                if filename.endswith(ARCHITECTURE_EXTENSIONS):
+                    entries.append({"file": filename, "path": path})
+        return layers
+
+    def code_files_for_analysis(self, file_types: List[str]) -> List[Dict[str, str]]:
+        """Code files of the requested languages, ready for parsing"""
+        wanted = {code for code, language in enumerate(self._languages) if language in set(file_types)}
+        files = []
+        for index, language_code in enumerate(self._file_languages):
+            if language_code in wanted:
+                relative_path = self._file_path(index)
+                files.append({
+                    "file_path": relative_path,
+                    "full_path": os.path.join(self._repo_path, relative_path),
+                    "language": self._languages[language_code],
+                    "file_type": self._purposes[self._file_purposes[index]]
+                })
+        return files
+
+    def structure_tree(self, max_files_per_dir: int = 10, max_depth: int = 3,
+                       highlighted_files: Tuple[str, ...] = (), supported_extensions: Dict[str, str] = None) -> List[str]:
+        """Lines of the visual directory tree (without the surrounding fences)"""
+        supported_extensions = supported_extensions or {}
+        lines = [f"{os.path.basename(self._repo_path)}/"]
+
+        for directory in self.iter_directories():
+            parts = [] if directory.path == '.' else directory.path.split(os.sep)
+            if any(part in TREE_IGNORED_DIRS for part in parts):
+                continue
+
+            level = directory.depth
+            # Limit depth to avoid massive output
+            if level > max_depth + 1:
+                continue
+
+            indent = '  ' * level
+            subindent = '  ' * (level + 1)
+
+            if level > 0:  # Don't show root again
+                lines.append(f"{indent}├── {parts[-1]}/")
+
+            for filename in directory.filenames[:max_files_per_dir]:
+                if not filename.startswith('.'):
+                    file_ext = os.path.splitext(filename)[1].lower()
+                    if file_ext in supported_extensions or filename in highlighted_files:
+                        lines.append(f"{subindent}├── {filename}")
+
+            if len(directory.filenames) > max_files_per_dir:
+                lines.append(f"{subindent}└── ... ({len(directory.filenames) - max_files_per_dir} more files)")
+
+        return lines
@@ -0,0 +1,133 @@
+"""
+Parallel os.scandir based repository walker.
+
+Directory listings are fanned out over a bounded thread pool (scandir releases
+the GIL while it waits on the filesystem), then stitched back together in a
+deterministic top-down order with names sorted inside each directory.
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+DEFAULT_WALK_WORKERS = int(os.getenv("REPO_SCAN_WORKERS", "8"))
+
+
+class DirectoryListing(NamedTuple):
+    dirnames: Tuple[str, ...]
+    filenames: Tuple[str, ...]
+    child_stats: Dict[str, os.stat_result]   # lstat of each sub-directory, taken from its DirEntry
+
+
+# (relative dir, full dir, stat from the parent's DirEntry if known) -> listing or None if unreadable
+ListDirectory = Callable[[str, str, Optional[os.stat_result]], Optional[DirectoryListing]]
+
+
+def scan_directory(path: str, with_stats: bool = False) -> DirectoryListing:
+    """List one directory, splitting entries the same way os.walk does"""
+    dirnames = []
+    filenames = []
+    child_stats = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                filenames.append(entry.name)
+            elif not entry.is_symlink():  # os.walk lists but never follows symlinked dirs
+                dirnames.append(entry.name)
+                if with_stats:
+                    child_stats[entry.name] = entry.stat(follow_symlinks=False)
+    dirnames.sort()
+    filenames.sort()
+    return DirectoryListing(tuple(dirnames), tuple(filenames), child_stats)
+
+
+def _default_list_directory(relative_dir: str, full_dir: str, stat_hint: Optional[os.stat_result]) -> Optional[DirectoryListing]:
+    try:
+        return scan_directory(full_dir)
+    except OSError:
+        return None
+
+
+def iter_walk(repo_path: str, should_descend: Callable[[str], bool],
+              skip_subtree: Optional[Callable[[str], bool]] = None) -> Iterator[Tuple[str, DirectoryListing]]:
+    """
+    Lazily yield (relative dir, listing) in the same order as ParallelWalker.walk.
+    Only one directory is listed at a time, so memory stays flat on huge trees.
+    """
+    stack = ['.']
+    while stack:
+        relative_dir = stack.pop()
+        full_dir = repo_path if relative_dir == '.' else os.path.join(repo_path, relative_dir)
+        try:
+            listing = scan_directory(full_dir)
+        except OSError:
+            continue
+        yield relative_dir, listing
+        for name in reversed(listing.dirnames):
+            if should_descend(name):
+                child = name if relative_dir == '.' else os.path.join(relative_dir, name)
+                if skip_subtree is None or not skip_subtree(child):
+                    stack.append(child)
+
+
+class ParallelWalker:
+    def __init__(self, max_workers: int = DEFAULT_WALK_WORKERS):
+        self.max_workers = max(1, max_workers)
+
+    def walk(self, repo_path: str, should_descend: Callable[[str], bool],
+             list_directory: Optional[ListDirectory] = None) -> List[Tuple[str, DirectoryListing]]:
+        """Return (relative dir, listing) for every reachable directory, top-down and sorted"""
+        list_directory = list_directory or _default_list_directory
+        listings: Dict[str, DirectoryListing] = {}
+
+        def visit(relative_dir: str, stat_hint: Optional[os.stat_result]):
+            full_dir = repo_path if relative_dir == '.' else os.path.join(repo_path, relative_dir)
+            return relative_dir, list_directory(relative_dir, full_dir, stat_hint)
+
+        def children(relative_dir: str, listing: DirectoryListing):
+            for name in listing.dirnames:
+                if should_descend(name):
+                    child = name if relative_dir == '.' else os.path.join(relative_dir, name)
+                    yield child, listing.child_stats.get(name)
+
+        if self.max_workers == 1:
+            queue = deque([('.', None)])
+            while queue:
+                relative_dir, listing = visit(*queue.popleft())
+                if listing is not None:
+                    listings[relative_dir] = listing
+                    queue.extend(children(relative_dir, listing))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending = {executor.submit(visit, '.', None)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        relative_dir, listing = future.result()
+                        if listing is None:
+                            continue
+                        listings[relative_dir] = listing
+                        for child, stat_hint in children(relative_dir, listing):
+                            pending.add(executor.submit(visit, child, stat_hint))
+
+        return self._ordered(listings, should_descend)
+
+    @staticmethod
+    def _ordered(listings: Dict[str, DirectoryListing], should_descend: Callable[[str], bool]) -> List[Tuple[str, DirectoryListing]]:
+        """Pre-order (os.walk top-down) traversal of the collected listings"""
+        ordered = []
+        stack = ['.']
+        while stack:
+            relative_dir = stack.pop()
+            listing = listings.get(relative_dir)
+            if listing is None:
+                continue
+            ordered.append((relative_dir, listing))
+            for name in reversed(listing.dirnames):
+                if should_descend(name):
+                    stack.append(name if relative_dir == '.' else os.path.join(relative_dir, name))
+        return ordered
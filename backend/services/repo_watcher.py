@@ -0,0 +1,421 @@
+"""
+Live repository index kept up to date in the background.
+
+Registered repositories are walked once; after that an inotify watcher (Linux)
+or a polling thread (everywhere else, or when inotify watches run out) marks
+changed directories dirty, re-lists only those and swaps in a fresh
+RepoSnapshot. RepoScanner answers from the live snapshot without walking.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from services.git_index_reader import find_worktree, index_signature
+from services.repo_scanner import PROJECT_FILES
+from services.repo_walker import DirectoryListing, ParallelWalker, scan_directory
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+_DIRECTORY_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding to the Linux inotify API"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch failed for {path}: {os.strerror(err)}")
+        return wd
+
+    def remove_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[tuple]:
+        """(wd, mask, name) for every queued event"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class LiveRepoIndex:
+    """In-memory index of one registered repository"""
+
+    def __init__(self, repo_path: str, scanner, poll_interval: float = 2.0, debounce: float = 0.2,
+                 force_polling: bool = False):
+        self.repo_path = repo_path
+        self.scanner = scanner
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+
+        worktree = find_worktree(repo_path) if scanner.use_git_index else None
+        self.git_dir = worktree[1] if worktree else None
+        # Git repositories are enumerated from the index, so the tree only matters for untracked files
+        self.watch_tree = self.git_dir is None or scanner.include_untracked
+
+        self.backend = "polling" if force_polling else "inotify"
+        self.snapshot = None
+        self.registered_at = time.time()
+        self.last_event_at: Optional[float] = None
+        self.last_refresh_at: Optional[float] = None
+        self.generation = 0
+        self.error: Optional[str] = None
+
+        self._listings: Dict[str, DirectoryListing] = {}
+        self._signatures: Dict[str, tuple] = {}
+        self._index_signature = None
+        self._project_signature: tuple = ()
+        self._dirty: Set[str] = set()
+        self._full_refresh = False
+        self._pending_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}       # wd -> relative dir ('' for the git dir)
+        self._watched_dirs: Dict[str, int] = {}  # relative dir -> wd
+
+    # ===== LIFECYCLE =====
+
+    def start(self) -> None:
+        if self.watch_tree:
+            self._listings = {d: l for d, l in ParallelWalker().walk(self.repo_path, self.scanner._should_descend)}
+            self._signatures = {d: self._stat_signature(d) for d in self._listings}
+        self._index_signature = index_signature(self.repo_path) if self.git_dir else None
+        self._project_signature = self._project_files_signature()
+        self._rebuild_snapshot()
+
+        if self.backend == "inotify":
+            try:
+                self._inotify = _Inotify()
+                self._add_watches(list(self._listings))
+                if self.git_dir:
+                    self._watches[self._inotify.add_watch(self.git_dir, IN_CLOSE_WRITE | IN_MOVED_TO)] = ''
+                if not self.watch_tree:
+                    # The tree itself is read from the index, but its build files feed the package structure
+                    mask = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+                    self._watches[self._inotify.add_watch(self.repo_path, mask)] = '.'
+            except (OSError, AttributeError) as e:
+                self._fall_back_to_polling(e)
+
+        target = self._run_inotify if self.backend == "inotify" else self._run_polling
+        self._thread = threading.Thread(target=target, name=f"repo-watcher:{self.repo_path}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._close_inotify()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._dirty) + (1 if self._full_refresh else 0)
+        return {
+            "repository_path": self.repo_path,
+            "backend": self.backend,
+            "mode": "git_index" if self.git_dir else "filesystem",
+            "stale": pending > 0,
+            "pending_changes": pending,
+            "generation": self.generation,
+            "registered_at": self.registered_at,
+            "last_event_at": self.last_event_at,
+            "last_refresh_at": self.last_refresh_at,
+            "watched_directories": len(self._watched_dirs) if self.backend == "inotify" else len(self._listings),
+            "total_files": self.snapshot.total_files if self.snapshot else 0,
+            "error": self.error
+        }
+
+    # ===== BACKENDS =====
+
+    def _run_inotify(self) -> None:
+        poller = select.poll()
+        poller.register(self._inotify.fd, select.POLLIN)
+        while not self._stop.is_set() and self._inotify is not None:
+            # Wait for events, or for the debounce window to close when changes are pending
+            timeout = self.debounce if self._has_pending() else 0.5
+            if poller.poll(timeout * 1000):
+                self._handle_events(self._inotify.read_events())
+                # Do not let a continuous stream of events starve the refresh forever
+                if self._pending_since and time.time() - self._pending_since > self.debounce * 10:
+                    self._refresh()
+            elif self._has_pending():
+                self._refresh()
+        if not self._stop.is_set():
+            self._run_polling()  # A refresh ran out of watches and gave up on inotify
+
+    def _run_polling(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            changed = set()
+            for relative_dir in list(self._listings):
+                if self._stat_signature(relative_dir) != self._signatures.get(relative_dir):
+                    changed.add(relative_dir)
+            index_changed = bool(self.git_dir) and index_signature(self.repo_path) != self._index_signature
+            # Build files are edited in place, which leaves the directory mtime alone
+            project_changed = self._project_files_signature() != self._project_signature
+            if changed or index_changed or project_changed:
+                with self._lock:
+                    self._dirty.update(changed)
+                    self._full_refresh = self._full_refresh or index_changed or project_changed
+                self.last_event_at = time.time()
+                self._refresh()
+
+    def _handle_events(self, events: List[tuple]) -> None:
+        with self._lock:
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: re-list everything we know about
+                    self._dirty.update(self._listings)
+                    self._full_refresh = True
+                    continue
+                relative_dir = self._watches.get(wd)
+                if relative_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    if self._watched_dirs.get(relative_dir) == wd:
+                        del self._watched_dirs[relative_dir]
+                    continue
+                if relative_dir == '':
+                    # Git dir: only a rewritten index matters
+                    if name == 'index':
+                        self._full_refresh = True
+                    continue
+                if not self.watch_tree:
+                    # Repository root of a tree read from the index: only its build files matter
+                    if name in PROJECT_FILES:
+                        self._full_refresh = True
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    parent = os.path.dirname(relative_dir) or '.'
+                    self._dirty.add(parent)
+                else:
+                    self._dirty.add(relative_dir)
+            if not (self._dirty or self._full_refresh):
+                return  # Nothing but writes to unrelated files in the git dir
+            if not self._pending_since:
+                self._pending_since = time.time()
+        self.last_event_at = time.time()
+
+    # ===== REFRESH =====
+
+    def _has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._dirty) or self._full_refresh
+
+    def _refresh(self) -> None:
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+            self._full_refresh = False
+            self._pending_since = None
+
+        if self.watch_tree:
+            for relative_dir in sorted(dirty, key=lambda d: d.count(os.sep)):
+                self._relist(relative_dir)
+        if self.git_dir:
+            self._index_signature = index_signature(self.repo_path)
+        self._project_signature = self._project_files_signature()
+        self._rebuild_snapshot()
+
+    def _relist(self, relative_dir: str) -> None:
+        """Re-read one directory and reconcile the sub-directories it gained or lost"""
+        if relative_dir != '.' and relative_dir not in self._listings:
+            return  # Already dropped together with a removed parent
+        try:
+            listing = scan_directory(self._full_path(relative_dir))
+        except OSError:
+            self._drop_subtree(relative_dir)
+            return
+
+        previous = self._listings.get(relative_dir)
+        old_dirs = set(previous.dirnames) if previous else set()
+        new_dirs = {d for d in listing.dirnames if self.scanner._should_descend(d)}
+
+        self._listings[relative_dir] = listing
+        self._signatures[relative_dir] = self._stat_signature(relative_dir)
+
+        for name in old_dirs - set(listing.dirnames):
+            self._drop_subtree(self._join(relative_dir, name))
+        added = []
+        for name in sorted(new_dirs - old_dirs):
+            subtree = ParallelWalker(1).walk(self._full_path(self._join(relative_dir, name)), self.scanner._should_descend)
+            for sub_dir, sub_listing in subtree:
+                child = self._join(relative_dir, name if sub_dir == '.' else os.path.join(name, sub_dir))
+                self._listings[child] = sub_listing
+                self._signatures[child] = self._stat_signature(child)
+                added.append(child)
+        if added and self._inotify is not None:
+            try:
+                self._add_watches(added)
+            except OSError as e:
+                self._fall_back_to_polling(e)
+                return
+            # Entries created between the listing and the new watch produced no event
+            with self._lock:
+                self._dirty.update(added)
+
+    def _drop_subtree(self, relative_dir: str) -> None:
+        prefix = relative_dir + os.sep
+        for path in [p for p in self._listings if p == relative_dir or p.startswith(prefix)]:
+            self._listings.pop(path, None)
+            self._signatures.pop(path, None)
+            wd = self._watched_dirs.pop(path, None)
+            if wd is not None and self._inotify is not None:
+                self._watches.pop(wd, None)
+                self._inotify.remove_watch(wd)
+
+    def _rebuild_snapshot(self) -> None:
+        if self.git_dir:
+            snapshot = self.scanner._snapshot_from_git_index(
+                self.repo_path, self.scanner._analyze_package_structure(self.repo_path))
+        else:
+            ordered = ParallelWalker._ordered(self._listings, self.scanner._should_descend)
+            snapshot = self.scanner._snapshot_from_walk(
+                self.repo_path,
+                [(relative_dir, listing.filenames) for relative_dir, listing in ordered],
+                self.scanner._analyze_package_structure(self.repo_path)
+            )
+        self.snapshot = snapshot
+        self.generation += 1
+        self.last_refresh_at = time.time()
+
+    # ===== HELPERS =====
+
+    def _add_watches(self, relative_dirs: List[str]) -> None:
+        for relative_dir in relative_dirs:
+            mask = _DIRECTORY_MASK | (IN_CLOSE_WRITE if relative_dir == '.' else 0)
+            try:
+                wd = self._inotify.add_watch(self._full_path(relative_dir), mask)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise  # fs.inotify.max_user_watches exhausted
+                continue   # Directory vanished in the meantime
+            self._watches[wd] = relative_dir
+            self._watched_dirs[relative_dir] = wd
+
+    def _fall_back_to_polling(self, error: Exception) -> None:
+        """No inotify (non-Linux) or watch limit reached: poll instead"""
+        self.error = str(error)
+        self._close_inotify()
+        self.backend = "polling"
+
+    def _close_inotify(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+            self._watched_dirs.clear()
+
+    def _full_path(self, relative_dir: str) -> str:
+        return self.repo_path if relative_dir == '.' else os.path.join(self.repo_path, relative_dir)
+
+    @staticmethod
+    def _join(relative_dir: str, name: str) -> str:
+        return name if relative_dir == '.' else os.path.join(relative_dir, name)
+
+    def _project_files_signature(self) -> tuple:
+        """(name, mtime, size) of the build files _analyze_package_structure reads"""
+        signature = []
+        for name in PROJECT_FILES:
+            try:
+                stat = os.stat(os.path.join(self.repo_path, name))
+            except OSError:
+                continue
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _stat_signature(self, relative_dir: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(self._full_path(relative_dir))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+
+class RepoWatcher:
+    """Registry of live repository indexes"""
+
+    def __init__(self, scanner, poll_interval: float = None, debounce: float = 0.2, force_polling: bool = None):
+        self.scanner = scanner
+        self.poll_interval = poll_interval or float(os.getenv("REPO_WATCH_POLL_INTERVAL", "2.0"))
+        self.debounce = debounce
+        if force_polling is None:
+            force_polling = os.getenv("REPO_WATCH_BACKEND", "inotify").lower() == "polling"
+        self.force_polling = force_polling
+        self._indexes: Dict[str, LiveRepoIndex] = {}
+        self._lock = threading.Lock()
+
+    def register(self, repo_path: str) -> Dict[str, Any]:
+        key = os.path.abspath(repo_path)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = LiveRepoIndex(repo_path, self.scanner, self.poll_interval, self.debounce, self.force_polling)
+                index.start()
+                self._indexes[key] = index
+        return index.status()
+
+    def unregister(self, repo_path: str) -> bool:
+        with self._lock:
+            index = self._indexes.pop(os.path.abspath(repo_path), None)
+        if index is None:
+            return False
+        index.stop()
+        return True
+
+    def snapshot(self, repo_path: str):
+        """Live snapshot for a registered repository (None if not registered)"""
+        index = self._indexes.get(os.path.abspath(repo_path))
+        return index.snapshot if index is not None else None
+
+    def status(self, repo_path: Optional[str] = None) -> Any:
+        if repo_path is not None:
+            index = self._indexes.get(os.path.abspath(repo_path))
+            return index.status() if index is not None else None
+        return [index.status() for index in list(self._indexes.values())]
+
+    def stop_all(self) -> None:
+        with self._lock:
+            indexes = list(self._indexes.values())
+            self._indexes.clear()
+        for index in indexes:
+            index.stop()
@@ -0,0 +1,234 @@
+"""
+Persistent incremental scan cache.
+
+Each directory listing is stored in SQLite together with a signature made of
+the directory's mtime, inode and (for tracked directories) its git tree hash.
+A rescan stats every known directory (in parallel, reusing the DirEntry stat of
+freshly listed parents) but only lists the ones whose signature changed, so
+rescanning an unchanged repository never reads a single listing.
+
+RepoScanner.build_snapshot reads the git index first, so this cache only
+serves trees it cannot use the index for: directories that are not git
+repositories, or any tree when SCAN_USE_GIT_INDEX is off.
+"""
+import os
+import sqlite3
+import subprocess
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from cache_config import get_cache_dir
+from services.repo_walker import DirectoryListing, ParallelWalker, scan_directory
+
+# Separator used to store listings in a single column (never valid in a filename)
+_NAME_SEPARATOR = '\0'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scanned_repos (
+    repo_path TEXT PRIMARY KEY,
+    git_tree TEXT
+);
+CREATE TABLE IF NOT EXISTS scanned_directories (
+    repo_path TEXT NOT NULL,
+    rel_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    git_tree TEXT,
+    dirnames TEXT NOT NULL,
+    filenames TEXT NOT NULL,
+    PRIMARY KEY (repo_path, rel_path)
+);
+"""
+
+
+class DirectorySignature(NamedTuple):
+    mtime_ns: int
+    inode: int
+    git_tree: Optional[str]
+
+
+class CachedDirectory(NamedTuple):
+    signature: DirectorySignature
+    dirnames: Tuple[str, ...]
+    filenames: Tuple[str, ...]
+
+
+class ScanResult(NamedTuple):
+    entries: List[Tuple[str, Tuple[str, ...]]]   # (relative dir, filenames) in walk order
+    changed: bool
+    listed_directories: int                      # directories actually read from disk
+
+
+class _RepoState:
+    """In-memory copy of the cached listings of one repository"""
+    def __init__(self, git_tree: Optional[str], directories: Dict[str, CachedDirectory]):
+        self.git_tree = git_tree
+        self.directories = directories
+        self.tree_hashes: Optional[Dict[str, str]] = None
+        self.snapshot = None
+
+
+class ScanCache:
+    def __init__(self, cache_dir: Optional[str] = None, use_git: bool = True, walker: Optional[ParallelWalker] = None):
+        self.cache_dir = cache_dir or os.getenv("SCAN_CACHE_DIR") or get_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, "scan_cache.sqlite3")
+        self.use_git = use_git
+        self.walker = walker or ParallelWalker()
+        self._states: Dict[str, _RepoState] = {}
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()   # guards _repo_locks only; each repository scans under its own lock
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _repo_lock(self, root: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(root, threading.Lock())
+
+    # ===== SCANNING =====
+
+    def scan(self, repo_path: str, should_descend: Callable[[str], bool]) -> ScanResult:
+        """Walk repo_path top-down, reusing every listing whose signature is unchanged"""
+        root = os.path.abspath(repo_path)
+        with self._repo_lock(root):
+            state = self._states.get(root) or self._load_state(root)
+            self._states[root] = state
+
+            tree_hashes = self._git_tree_hashes(root, state)
+            cached = state.directories
+            updated: Dict[str, CachedDirectory] = {}
+
+            def list_directory(relative_dir: str, full_dir: str, stat_hint: Optional[os.stat_result]) -> Optional[DirectoryListing]:
+                try:
+                    stat = stat_hint or os.stat(full_dir)
+                except OSError:
+                    return None
+
+                signature = DirectorySignature(stat.st_mtime_ns, stat.st_ino, tree_hashes.get(relative_dir))
+                directory = cached.get(relative_dir)
+                if directory is not None and directory.signature == signature:
+                    return DirectoryListing(directory.dirnames, directory.filenames, {})
+
+                try:
+                    listing = scan_directory(full_dir, with_stats=True)
+                except OSError:
+                    return None
+                updated[relative_dir] = CachedDirectory(signature, listing.dirnames, listing.filenames)
+                return listing
+
+            walked = self.walker.walk(root, should_descend, list_directory)
+            entries = [(relative_dir, listing.filenames) for relative_dir, listing in walked]
+            seen = {relative_dir for relative_dir, _ in walked}
+
+            removed = [path for path in cached if path not in seen]
+            if updated or removed:
+                for path in removed:
+                    del cached[path]
+                cached.update(updated)
+                state.snapshot = None
+                self._save(root, state, updated, removed)
+
+            return ScanResult(entries, bool(updated or removed), len(updated))
+
+    def cached_snapshot(self, repo_path: str):
+        """Snapshot remembered for the last unchanged scan of repo_path, if any"""
+        state = self._states.get(os.path.abspath(repo_path))
+        if state is None or state.snapshot is None or state.snapshot.repo_path != repo_path:
+            return None
+        return state.snapshot
+
+    def remember_snapshot(self, repo_path: str, snapshot) -> None:
+        state = self._states.get(os.path.abspath(repo_path))
+        if state is not None:
+            state.snapshot = snapshot
+
+    def invalidate(self, repo_path: str) -> None:
+        """Forget everything cached for repo_path"""
+        root = os.path.abspath(repo_path)
+        with self._repo_lock(root):
+            self._states.pop(root, None)
+            with self._connect() as conn:
+                conn.execute("DELETE FROM scanned_directories WHERE repo_path = ?", (root,))
+                conn.execute("DELETE FROM scanned_repos WHERE repo_path = ?", (root,))
+
+    # ===== PERSISTENCE =====
+
+    def _load_state(self, root: str) -> _RepoState:
+        directories = {}
+        with self._connect() as conn:
+            row = conn.execute("SELECT git_tree FROM scanned_repos WHERE repo_path = ?", (root,)).fetchone()
+            for rel_path, mtime_ns, inode, git_tree, dirnames, filenames in conn.execute(
+                    "SELECT rel_path, mtime_ns, inode, git_tree, dirnames, filenames "
+                    "FROM scanned_directories WHERE repo_path = ?", (root,)):
+                directories[rel_path] = CachedDirectory(
+                    DirectorySignature(mtime_ns, inode, git_tree),
+                    _split_names(dirnames),
+                    _split_names(filenames)
+                )
+        return _RepoState(row[0] if row else None, directories)
+
+    def _save(self, root: str, state: _RepoState, updated: Dict[str, CachedDirectory], removed: List[str]) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO scanned_repos (repo_path, git_tree) VALUES (?, ?)",
+                         (root, state.git_tree))
+            conn.executemany("DELETE FROM scanned_directories WHERE repo_path = ? AND rel_path = ?",
+                             [(root, path) for path in removed])
+            conn.executemany(
+                "INSERT OR REPLACE INTO scanned_directories "
+                "(repo_path, rel_path, mtime_ns, inode, git_tree, dirnames, filenames) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (root, path, d.signature.mtime_ns, d.signature.inode, d.signature.git_tree,
+                     _NAME_SEPARATOR.join(d.dirnames), _NAME_SEPARATOR.join(d.filenames))
+                    for path, d in updated.items()
+                ]
+            )
+
+    # ===== GIT =====
+
+    def _git_tree_hashes(self, root: str, state: _RepoState) -> Dict[str, str]:
+        """Tree hash of every tracked directory, recomputed only when HEAD's tree moves"""
+        if not self.use_git:
+            return {}
+
+        head_tree = _run_git(root, "rev-parse", "HEAD:./")
+        if not head_tree:
+            state.git_tree = None
+            state.tree_hashes = {}
+            return {}
+
+        if head_tree == state.git_tree and state.tree_hashes is not None:
+            return state.tree_hashes
+
+        if head_tree == state.git_tree:
+            # Same tree as the persisted scan: reuse the hashes stored per directory
+            tree_hashes = {path: d.signature.git_tree for path, d in state.directories.items() if d.signature.git_tree}
+        else:
+            tree_hashes = {'.': head_tree}
+            listing = _run_git(root, "ls-tree", "-r", "-d", "-z", head_tree) or ""
+            for record in listing.split('\0'):
+                if not record:
+                    continue
+                meta, path = record.split('\t', 1)
+                tree_hashes[path.replace('/', os.sep)] = meta.split()[2]
+
+        state.git_tree = head_tree
+        state.tree_hashes = tree_hashes
+        return tree_hashes
+
+
+def _split_names(value: str) -> Tuple[str, ...]:
+    return tuple(value.split(_NAME_SEPARATOR)) if value else ()
+
+
+def _run_git(cwd: str, *args: str) -> Optional[str]:
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip('\n')
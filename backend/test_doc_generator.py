@@ -0,0 +1,66 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from doc_generator import DocGenerator
+from models import CommitInfo, FunctionInfo
+
+class TestDocGeneratorAsync(unittest.TestCase):
+
+    def test_concurrent_docs_keep_order_and_limit(self):
+        """Test that chat completions run concurrently up to the limit and results follow the functions"""
+        generator = DocGenerator(api_key="test-key")
+        generator.max_concurrency = 3
+        in_flight = {"now": 0, "peak": 0}
+
+        async def acreate(**request):
+            name = request["messages"][0]["content"].split("Function Name: ")[1].split("\n")[0]
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            # Later functions answer first
+            await asyncio.sleep(0.01 * (10 - int(name.split("_")[1])))
+            in_flight["now"] -= 1
+            if name == "handle_4":
+                raise RuntimeError("rate limited")
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"Docs for {name}"))])
+
+        functions = [FunctionInfo(f"handle_{number}", [], None, number * 5 + 1, number * 5 + 3, "jobs.py")
+                     for number in range(10)]
+        with mock.patch("openai.ChatCompletion.acreate", side_effect=acreate):
+            docs = asyncio.run(generator.generate_function_docs(functions))
+
+        self.assertEqual(in_flight["peak"], 3)
+        for func, doc in zip(functions, docs):
+            if func.name == "handle_4":
+                # A failed call falls back to the template docs, or to its exception
+                self.assertFalse(isinstance(doc, str) and doc.startswith("Docs for"))
+            else:
+                self.assertTrue(doc.startswith(f"Docs for {func.name}\n"))
+
+    def test_identical_files_share_one_completion(self):
+        """Test that copies of a file with different histories ask the LLM once and keep their own commits"""
+        generator = DocGenerator(api_key="test-key")
+        copies = []
+        for path, commit in (("a/jobs.py", CommitInfo("1" * 40, "ann", "Add jobs")),
+                             ("b/jobs.py", CommitInfo("2" * 40, "bob", "Vendor jobs"))):
+            func = FunctionInfo("run", ["job"], None, 3, 9, path)
+            func.commits = [commit]
+            copies.append(func)
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Runs a job"))])
+
+        with mock.patch("openai.ChatCompletion.create", return_value=response) as create:
+            docs = [generator.generate_function_doc(func, content_key="same-content") for func in copies]
+
+        create.assert_called_once()
+        prompt = create.call_args.kwargs["messages"][0]["content"]
+        self.assertNotIn("jobs.py", prompt)
+        self.assertNotIn("Add jobs", prompt)
+        for doc, func, other in zip(docs, copies, reversed(copies)):
+            self.assertTrue(doc.startswith("Runs a job"))
+            self.assertIn(func.commits[0].hash[:7], doc)
+            self.assertNotIn(other.commits[0].hash[:7], doc)
+            self.assertIn(f"`{func.file_path}`", doc)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,44 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from parsers import PARSERS
+from services.doc_manifest import DocManifest, function_identities, section, split_sections
+
+class TestDocManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "jobs.py")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _identities(self, source):
+        with open(self.path, "w") as f:
+            f.write(source)
+        return function_identities(PARSERS["python"].parse_model(self.path), source)
+
+    def test_identities_follow_function_content(self):
+        """Test that ids stay and digests change only for the functions whose lines changed"""
+        before = self._identities("def push(job):\n    return job\n\ndef pop():\n    return None\n")
+        after = self._identities("import os\n\ndef push(job):\n    return [job]\n\ndef pop():\n    return None\n")
+        self.assertEqual([function_id for function_id, _ in after], ["push", "pop"])
+        self.assertNotEqual(before[0][1], after[0][1])
+        self.assertEqual(before[1][1], after[1][1])
+
+    def test_sections_and_runs_round_trip(self):
+        """Test that marked sections are found again and runs are kept per repository and language"""
+        text = "# Documentation\n\n" + section("push", "ab12", "# push\n\n---\n\n") + section("Queue.pop#2", "cd34", "# pop\n")
+        self.assertEqual(split_sections(text), {"push": "# push\n\n---\n\n", "Queue.pop#2": "# pop\n"})
+
+        manifest = DocManifest(self.folder)
+        self.assertIsNone(manifest.load("/repo", "python"))
+        manifest.save("/repo", "python", {"target_format": "markdown", "commit": "abc", "files": {}})
+        manifest.save("/repo", "java", {"target_format": "word", "commit": "abc", "files": {}})
+        self.assertEqual(DocManifest(self.folder).load("/repo", "Python")["target_format"], "markdown")
+        self.assertEqual(os.listdir(self.folder), [".doc_manifest.json"])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,199 @@
+import unittest
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest import mock
+
+from git_utils import GitAnalyzer, GitSession
+from models import FunctionInfo
+from services.blame_index import BlameIndex
+from services.changed_lines import ChangedLines
+from services.git_executor import GitExecutor
+from services.history_store import HistoryStore
+
+class TestGitSession(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.repo_dir, "jobs.py")
+        self._git("init", "-q")
+        self._commit("def push(job):\n    return job\n\ndef pop():\n    return None\n", "Add jobs", "2024-01-01T10:00:00")
+        self.first = self._git("rev-parse", "HEAD").strip()
+        self._commit("def push(job):\n    return [job]\n\ndef pop():\n    return None\n", "Wrap pushed jobs", "2024-01-02T10:00:00")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def _git(self, *args):
+        return subprocess.run(["git", "-C", self.repo_dir, "-c", "user.name=Dev", "-c", "user.email=dev@example.com",
+                               *args], check=True, capture_output=True, text=True).stdout
+
+    def _commit(self, content, message, date):
+        with open(self.path, "w") as f:
+            f.write(content)
+        self._git("add", "jobs.py")
+        self._git("commit", "-q", "-m", message, "--date", date)
+
+    def _functions(self):
+        return [FunctionInfo("push", ["job"], None, 1, 2, self.path), FunctionInfo("pop", [], None, 4, 5, self.path)]
+
+    def test_one_blame_per_file(self):
+        """Test that functions of one file get the commits of their own lines from a single blame"""
+        session = GitSession()
+        with mock.patch.object(BlameIndex, "from_git", wraps=BlameIndex.from_git) as blame:
+            push, pop = [GitAnalyzer.get_commits_for_function(self.repo_dir, func, session=session)
+                         for func in self._functions()]
+        self.assertEqual(blame.call_count, 1)
+        self.assertEqual([(c.message, c.line_range) for c in push], [("Wrap pushed jobs", (2, 2)), ("Add jobs", (1, 1))])
+        self.assertEqual([(c.hash, c.author, c.line_range) for c in pop], [(self.first, "Dev", (4, 5))])
+
+        # File-level history claims no lines, and a file git cannot blame never syncs the store
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        store = HistoryStore(cache_dir)
+        with mock.patch.object(BlameIndex, "from_git", side_effect=RuntimeError("cannot blame")):
+            commits = GitSession(history_store=store).get_commits_for_function(self.repo_dir, self._functions()[1])
+        self.assertEqual([(c.message, c.line_range) for c in commits], [("Wrap pushed jobs", None), ("Add jobs", None)])
+        self.assertEqual(store.full_builds, 0)
+
+        # Once a run has loaded the store, every file reads its commits from it without a blame
+        session = GitSession(history_store=store)
+        self.assertTrue(asyncio.run(session.load_history(self.repo_dir)))
+        untracked = FunctionInfo("draft", [], None, 1, 1, os.path.join(self.repo_dir, "draft.py"))
+        with open(untracked.file_path, "w") as f:
+            f.write("def draft():\n    pass\n")
+        with mock.patch.object(BlameIndex, "from_git") as blame:
+            commits = session.get_commits_for_function(self.repo_dir, self._functions()[1])
+            self.assertEqual(session.get_commits_for_function(self.repo_dir, untracked), [])
+        self.assertEqual(blame.call_count, 0)
+        self.assertEqual([(c.message, c.line_range) for c in commits], [("Wrap pushed jobs", None), ("Add jobs", None)])
+        self.assertEqual(store.full_builds, 1)
+
+        # A sync that outlasts its bound leaves the run on blame
+        with mock.patch.object(HistoryStore, "sync", side_effect=lambda root: time.sleep(0.5)):
+            self.assertFalse(asyncio.run(GitSession(history_store=store).load_history(self.repo_dir, timeout=0.05)))
+
+    def test_stale_check_per_function(self):
+        """Test that one diff per file flags only the functions whose lines changed"""
+        session = GitSession()
+        push, pop = self._functions()
+        with mock.patch.object(ChangedLines, "from_git", wraps=ChangedLines.from_git) as diff:
+            self.assertTrue(GitAnalyzer.detect_stale_doc(push, self.first, self.repo_dir, session=session))
+            self.assertFalse(GitAnalyzer.detect_stale_doc(pop, self.first, self.repo_dir, session=session))
+        self.assertEqual(diff.call_count, 1)
+
+        # Removing lines marks the function around them
+        changed = ChangedLines.parse("@@ -3,2 +2,0 @@\n-a\n-b\n@@ -9 +8 @@\n-c\n+d\n")
+        self.assertEqual((changed.starts, changed.ends), ([2, 8], [3, 8]))
+        self.assertTrue(changed.overlaps(1, 2))
+        self.assertFalse(changed.overlaps(4, 7))
+        self.assertTrue(changed.overlaps(8, 20))
+
+    def test_prefetch_through_git_executor(self):
+        """Test that prefetched blames and diffs answer the lookups without running git again"""
+        session = GitSession()
+        executor = GitExecutor(max_concurrency=2)
+        asyncio.run(session.prefetch(self.repo_dir, [self.path], executor, self.first))
+        self.assertEqual(executor.commands, 2)
+        push, pop = self._functions()
+        with mock.patch.object(BlameIndex, "from_git") as blame, mock.patch.object(ChangedLines, "from_git") as diff:
+            commits = GitAnalyzer.get_commits_for_function(self.repo_dir, push, session=session)
+            stale = [GitAnalyzer.detect_stale_doc(func, self.first, self.repo_dir, session=session) for func in (push, pop)]
+        self.assertEqual((blame.call_count, diff.call_count), (0, 0))
+        self.assertEqual([c.message for c in commits], ["Wrap pushed jobs", "Add jobs"])
+        self.assertEqual(stale, [True, False])
+
+        # A file git cannot blame gets its file-level history from one git log in the pool
+        session = GitSession(history_store=mock.Mock())
+        with mock.patch.object(BlameIndex, "from_git_async", side_effect=RuntimeError("cannot blame")):
+            asyncio.run(session.prefetch(self.repo_dir, [self.path], executor))
+        self.assertEqual(session.history_store.mock_calls, [])
+        with mock.patch("git_utils.Repo") as repo:
+            commits = session.get_commits_for_function(self.repo_dir, push)
+        self.assertEqual(repo.call_count, 0)
+        self.assertEqual([(c.message, c.line_range) for c in commits], [("Wrap pushed jobs", None), ("Add jobs", None)])
+
+        # A git command past its timeout is killed and reported as a failure
+        with self.assertRaises(RuntimeError):
+            asyncio.run(executor.run(self.repo_dir, "-c", "alias.wait=!sleep 5", "wait", timeout=0.2))
+        self.assertEqual(executor.timeouts, 1)
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_dir = tempfile.mkdtemp()
+        self._git("init", "-q")
+        for number in range(3):
+            self._commit({"a.py": f"a = {number}\n", f"pkg/b{number}.py": "b = 1\n"}, f"Change {number}")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def _git(self, *args):
+        return subprocess.run(["git", "-C", self.repo_dir, "-c", "user.name=Dev", "-c", "user.email=dev@example.com",
+                               *args], check=True, capture_output=True, text=True).stdout
+
+    def _commit(self, files, message, *options):
+        for name, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.repo_dir, name)), exist_ok=True)
+            with open(os.path.join(self.repo_dir, name), "w") as f:
+                f.write(content)
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", message, *options)
+
+    def _log(self, path, count):
+        return self._git("log", f"-{count}", "--format=%H", "--", path).split()
+
+    def test_history_store(self):
+        """Test that one log pass gives each file its latest commits and later syncs read only new commits"""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        store = HistoryStore(cache_dir)
+        repo_id = store.sync(self.repo_dir)
+        first = self._git("rev-list", "--max-parents=0", "HEAD").strip()
+        self.assertEqual([c[0] for c in store.file_commits(repo_id, "a.py", limit=2)], self._log("a.py", 2))
+        self.assertEqual([c[2] for c in store.file_commits(repo_id, "pkg/b1.py")], ["Change 1"])
+        self.assertFalse(store.changed_since(repo_id, "pkg/b0.py", first))
+        self.assertTrue(store.changed_since(repo_id, "a.py", first))
+        self.assertIsNone(store.changed_since(repo_id, "a.py", "0" * 40))
+
+        # A new process reads only the new commit
+        self._commit({"pkg/b0.py": "b = 0\n"}, "Change b0\n\nWith a body")
+        store = HistoryStore(cache_dir)
+        self.assertEqual(store.sync(self.repo_dir), repo_id)
+        self.assertEqual((store.full_builds, store.incremental_updates), (0, 1))
+        self.assertEqual(store.file_commits(repo_id, "pkg/b0.py"), [
+            (c, "Dev", m) for c, m in zip(self._log("pkg/b0.py", 5), ["Change b0\n\nWith a body", "Change 0"])])
+        self.assertTrue(store.changed_since(repo_id, "pkg/b0.py", first))
+        self.assertEqual(store.stats()["commits"], 4)
+        store.sync(self.repo_dir)
+        self.assertEqual(store.incremental_updates, 1)
+
+        # Rewritten history is stored again
+        self._commit({"pkg/b2.py": "b = 2\n"}, "Amended", "--amend")
+        store.sync(self.repo_dir)
+        self.assertEqual(store.full_builds, 1)
+        self.assertEqual([c[2] for c in store.file_commits(repo_id, "pkg/b2.py")], ["Amended", "Change 2"])
+        self.assertEqual(store.stats()["commits"], 4)
+
+        # A git log killed after writing its whole output still fails the sync, which is read again next time
+        self._commit({"a.py": "a = 3\n"}, "Change 3")
+        popen = subprocess.Popen
+
+        def killed(args, **kwargs):
+            if args[1] == "log":
+                args = ["sh", "-c", 'git "$@"; kill -9 $$', "sh", *args[1:]]
+            return popen(args, **kwargs)
+
+        with mock.patch("services.git_log.subprocess.Popen", side_effect=killed), self.assertRaises(RuntimeError):
+            store.sync(self.repo_dir)
+        self.assertEqual(store.incremental_updates, 1)
+        store.sync(self.repo_dir)
+        self.assertEqual(store.incremental_updates, 2)
+        self.assertEqual([c[2] for c in store.file_commits(repo_id, "a.py", limit=1)], ["Change 3"])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
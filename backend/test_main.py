@@ -0,0 +1,130 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from services.blame_index import BlameIndex
+from services.history_store import HistoryStore
+
+class TestEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_dir = tempfile.mkdtemp()
+        layout = {
+            "app/jobs.py": "def push(job):\n    return job\n\ndef pop():\n    return None\n",
+            "app/broken.py": "def broken(:\n",
+            "notes.md": "# Notes\n",
+            "requirements.txt": "fastapi\n"
+        }
+        for relative_path, content in layout.items():
+            self._write(relative_path, content)
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def _write(self, relative_path, content):
+        full_path = os.path.join(self.repo_dir, relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+
+    def _records(self, response):
+        """NDJSON body as a list of records, checking every line is one JSON object"""
+        lines = response.text.split("\n")
+        self.assertEqual(lines[-1], "")
+        return [json.loads(line) for line in lines[:-1]]
+
+    def test_function_batch_streams_one_line_per_file(self):
+        """Test that the batch streams a header, one line per distinct file (errors included) and a summary"""
+        response = self.client.post("/analyze-functions/batch", json={
+            "repo_path": self.repo_dir,
+            "files": ["app/jobs.py", os.path.join(self.repo_dir, "app", "jobs.py")],
+            "pattern": "app/*.py"
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        records = self._records(response)
+
+        self.assertEqual(records[0], {"record": "header", "repository_path": self.repo_dir, "total_files": 2})
+        files = {os.path.basename(record["file_path"]): record for record in records[1:-1]}
+        self.assertEqual(len(records), 4)
+        self.assertEqual([f["name"] for f in files["jobs.py"]["functions"]], ["push", "pop"])
+        self.assertFalse(files["broken.py"]["success"])
+        self.assertTrue(files["broken.py"]["error"])
+        self.assertEqual(records[-1], {"record": "summary", "files_parsed": 1, "files_failed": 1, "function_count": 2})
+
+    def test_scan_stream_and_pages_list_the_same_files(self):
+        """Test that the NDJSON scan and the paged scan resumed from its cursors return the same files"""
+        records = self._records(self.client.get("/scan-repository", params={"repo_path": self.repo_dir, "stream": True}))
+        self.assertEqual(records[0]["record"], "header")
+        self.assertEqual(records[-1]["record"], "summary")
+        streamed = [record["path"] for record in records[1:-1]]
+        self.assertEqual(records[-1]["total_files"], len(streamed))
+
+        paged, cursor = [], None
+        while True:
+            params = {"repo_path": self.repo_dir, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            page = self.client.get("/scan-repository/page", params=params).json()
+            self.assertLessEqual(len(page["files"]), 2)
+            paged.extend(record["path"] for record in page["files"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(paged, streamed)
+
+        invalid = self.client.get("/scan-repository/page", params={"repo_path": self.repo_dir, "cursor": "%%%"})
+        self.assertEqual(invalid.status_code, 400)
+
+    @unittest.skipIf(shutil.which("git") is None, "git is not installed")
+    def test_incremental_individual_docs(self):
+        """Test that an incremental run documents again only the function that changed, reading commits from the store"""
+        os.remove(os.path.join(self.repo_dir, "app", "broken.py"))
+        git = ["git", "-C", self.repo_dir, "-c", "user.name=Dev", "-c", "user.email=dev@example.com"]
+        subprocess.run(git + ["init", "-q"], check=True)
+        subprocess.run(git + ["add", "."], check=True)
+        subprocess.run(git + ["commit", "-qm", "Add jobs"], check=True)
+
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, True)
+        cwd = os.getcwd()
+        os.chdir(output_dir)
+        self.addCleanup(os.chdir, cwd)
+
+        store = HistoryStore(os.path.join(output_dir, "history"))
+        self.addCleanup(mock.patch.stopall)
+        mock.patch.object(main, "history_store", store).start()
+        blame = mock.patch.object(BlameIndex, "from_git_async").start()
+
+        def generate(incremental):
+            with mock.patch.object(main.doc_generator, "api_key", None):
+                response = self.client.post("/generate-individual-docs", params={
+                    "repo_path": self.repo_dir, "language": "python", "incremental": incremental})
+            self.assertEqual(response.status_code, 200)
+            return response.json()
+
+        first = generate(False)
+        self.assertEqual(first["functions_regenerated"], 2)
+        doc_file = os.path.join(output_dir, "documentation-generated", "individual",
+                                first["generated_files"][0]["documentation_file"])
+        self.assertTrue(os.path.exists(doc_file))
+
+        self.assertEqual(generate(True)["generated_files"][0].get("unchanged"), True)
+
+        self._write("app/jobs.py", "def push(job):\n    return [job]\n\ndef pop():\n    return None\n")
+        edited = generate(True)
+        self.assertTrue(edited["incremental"])
+        self.assertEqual((edited["functions_regenerated"], edited["functions_reused"]), (1, 1))
+        # One history sync for the three runs, and no file blamed
+        self.assertEqual((store.full_builds, store.incremental_updates, blame.call_count), (1, 0, 0))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,345 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from models import CompactFunctionInfo, FunctionInfo
+from parsers import PARSERS
+from parsers.js_scanner import JSScanner
+from services.incremental_parser import IncrementalParser
+from services.parse_cache import ParseCache
+from services.parse_pool import ParsePool
+from services.repo_scanner import RepoScanner
+
+class TestFileModel(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        sources = {
+            "Service.java": (
+                "package demo;\n"
+                "import java.util.List;\n"
+                "\n"
+                "public class Service {\n"
+                "    public List<String> names(int limit) {\n"
+                "        if (limit > 0) { return null; }\n"
+                "        return null;\n"
+                "    }\n"
+                "}\n"
+            ),
+            "service.py": (
+                "import os\n"
+                "\n"
+                "def helper(path):\n"
+                "    return path\n"
+                "\n"
+                "class Service:\n"
+                "    def run(self, job):\n"
+                "        pass\n"
+            ),
+            "service.js": (
+                "import api from './api';\n"
+                "class Service {\n"
+                "  run(job) {\n"
+                "    return job;\n"
+                "  }\n"
+                "}\n"
+                "function helper(path) {\n"
+                "  return path;\n"
+                "}\n"
+            )
+        }
+        self.paths = {}
+        for name, content in sources.items():
+            self.paths[name] = os.path.join(self.test_dir, name)
+            with open(self.paths[name], "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_java_model(self):
+        """Test that a Java parse yields methods with real spans and their class"""
+        model = PARSERS["java"].parse_model(self.paths["Service.java"])
+        self.assertEqual([(f.name, f.lineno, f.end_lineno) for f in model.functions], [("names", 5, 8)])
+        structure = model.class_structure()
+        self.assertEqual(structure["classes"][0]["name"], "Service")
+        self.assertEqual(structure["classes"][0]["methods"][0]["name"], "names")
+        self.assertEqual(structure["imports"], ["java.util.List"])
+
+    def test_java_scanner_spans(self):
+        """Test exact Java spans and Javadoc from the scanner, including syntax javalang rejects"""
+        path = os.path.join(self.test_dir, "Shapes.java")
+        with open(path, "w") as f:
+            f.write(
+                "public abstract class Shapes {\n"
+                "    /** Area of the shape. */\n"
+                "    @Override\n"
+                "    public double area(final int scale) {\n"
+                "        String s = \"}\"; // }\n"
+                "        new Thread() { public void run() { } }.start();\n"
+                "        return 0;\n"
+                "    }\n"
+                "    abstract int sides();\n"
+                "    record Point(int x, int y) {\n"
+                "        int sum() { return x + y; }\n"
+                "    }\n"
+                "}\n"
+            )
+        with mock.patch.dict(os.environ, {"JAVA_PARSER_MODE": "scanner"}):
+            model = PARSERS["java"].parse_model(path)
+        self.assertEqual([(f.name, f.lineno, f.end_lineno) for f in model.functions],
+                         [("area", 4, 8), ("run", 6, 6), ("sides", 9, 9), ("sum", 11, 11)])
+        self.assertEqual(model.functions[0].params, ["scale"])
+        self.assertEqual(model.functions[0].docstring, "Area of the shape.")
+        self.assertEqual([(c.name, c.lineno, c.end_lineno, [m.name for m in c.methods]) for c in model.classes],
+                         [("Shapes", 1, 13, ["area", "sides"]), ("Point", 10, 12, ["sum"])])
+
+    def test_js_scanner_spans(self):
+        """Test that braces inside strings, templates, regexes and comments do not break JS spans"""
+        path = os.path.join(self.test_dir, "tricky.js")
+        with open(path, "w") as f:
+            f.write(
+                "const pattern = /[{]+/g, quote = \"it's {\";\n"
+                "/** Adds one. */\n"
+                "export function add(a, b = 1)\n"
+                "{\n"
+                "  return `${a + b} }`; // }\n"
+                "}\n"
+                "class Store extends Base {\n"
+                "  get(key) { if (key) { return key; } }\n"
+                "  handle = (event) => {\n"
+                "    return event;\n"
+                "  };\n"
+                "}\n"
+                "const double = x =>\n"
+                "  x * 2;\n"
+            )
+        model = PARSERS["javascript"].parse_model(path)
+        self.assertEqual([(f.name, f.lineno, f.end_lineno) for f in model.functions],
+                         [("add", 3, 6), ("get", 8, 8), ("handle", 9, 11), ("double", 13, 14)])
+        self.assertEqual(model.functions[0].params, ["a", "b"])
+        self.assertEqual(model.functions[0].docstring, "Adds one.")
+        self.assertEqual([(c.name, c.lineno, c.end_lineno) for c in model.classes], [("Store", 7, 12)])
+        self.assertEqual([m.name for m in model.classes[0].methods], ["get", "handle"])
+
+    def test_views_agree(self):
+        """Test that the function list and the class structure come from the same parse"""
+        scanner = RepoScanner()
+        for name, language in [("service.py", "python"), ("service.js", "javascript"), ("Service.java", "java")]:
+            model = PARSERS[language].parse_model(self.paths[name])
+            structure = scanner.extract_class_structure(self.paths[name], language)
+            listed = [m["name"] for c in structure["classes"] for m in c["methods"]] + [f["name"] for f in structure["functions"]]
+            self.assertEqual(sorted(listed), sorted(f.name for f in model.functions))
+            self.assertEqual([f.name for f in PARSERS[language].parse_file(self.paths[name])],
+                             [f.name for f in model.functions])
+
+    def test_iter_functions_matches_model(self):
+        """Test that streamed functions arrive complete and match a full parse"""
+        for name, language in [("service.py", "python"), ("service.js", "javascript"), ("Service.java", "java")]:
+            streamed = list(PARSERS[language].iter_functions(self.paths[name]))
+            model = PARSERS[language].parse_model(self.paths[name])
+            self.assertEqual(sorted((f.name, f.lineno, f.end_lineno, f.params) for f in streamed),
+                             sorted((f.name, f.lineno, f.end_lineno, f.params) for f in model.functions))
+
+        # The first function is handed out before the scanner reaches the rest of the file
+        with open(self.paths["service.js"]) as f:
+            scanner = JSScanner(f.read(), self.paths["service.js"])
+        first = next(scanner.iter_functions())
+        self.assertEqual((first.name, first.lineno, first.end_lineno), ("run", 3, 5))
+        self.assertEqual([f.name for f in scanner.model.functions], ["run"])
+
+    def test_compact_model(self):
+        """Test that a compacted model keeps its structure, shares paths and loads commits lazily"""
+        model = PARSERS["java"].parse_model(self.paths["Service.java"])
+        compact = model.compact()
+        self.assertEqual(compact.class_structure(), model.class_structure())
+        func = compact.functions[0]
+        self.assertIs(compact.classes[0].methods[0], func)
+        reparsed = PARSERS["java"].parse_model(os.path.join(self.test_dir, "Service.java")).compact()
+        self.assertIs(reparsed.functions[0].file_path, func.file_path)
+        self.assertFalse(hasattr(func, "__dict__"))
+
+        # Commits read before any are attached form a list of the function's own
+        func.commits.append("def456")
+        self.assertEqual(func.commits, ["def456"])
+        self.assertEqual(reparsed.functions[0].commits, [])
+
+        loader = mock.Mock(return_value=["abc123"])
+        func.attach_commits(loader)
+        loader.assert_not_called()
+        self.assertEqual(func.commits, ["abc123"])
+        self.assertEqual(func.commits, ["abc123"])
+        loader.assert_called_once()
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        for name in ["a.py", "b.py"]:
+            with open(os.path.join(self.test_dir, name), "w") as f:
+                f.write(f'class Job:\n    def run(self, step):\n        """Run {name}"""\n        pass\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_second_parse_is_a_hit(self):
+        """Test that an unchanged file is answered from disk, even by a new cache instance"""
+        path = os.path.join(self.test_dir, "a.py")
+        first = ParseCache(self.cache_dir).parse_model(PARSERS["python"], path)
+        cache = ParseCache(self.cache_dir)
+        with mock.patch.object(PARSERS["python"], "parse_model") as parse:
+            cached = cache.parse_model(PARSERS["python"], path)
+            parse.assert_not_called()
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cached.class_structure(), first.class_structure())
+        self.assertEqual(cached.functions[0].docstring, "Run a.py")
+        self.assertEqual(cached.functions[0].file_path, path)
+
+    def test_size_bound_evicts_least_recently_used(self):
+        """Test that the cache stays within its byte budget"""
+        cache = ParseCache(self.cache_dir, max_bytes=250)
+        for name in ["a.py", "b.py"]:
+            cache.parse_model(PARSERS["python"], os.path.join(self.test_dir, name))
+        stats = cache.stats()
+        self.assertLessEqual(stats["size_bytes"], 250)
+        self.assertEqual(stats["evictions"], 1)
+
+class TestIncrementalParser(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "jobs.js")
+        self.source = (
+            "class Queue {\n"
+            "  push(job) {\n"
+            "    return job;\n"
+            "  }\n"
+            "  pop() {\n"
+            "    return null;\n"
+            "  }\n"
+            "}\n"
+            "function drain(queue) {\n"
+            "  return queue;\n"
+            "}\n"
+        )
+        self._write(self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def _summary(self, model):
+        return ([(f.name, f.params, f.lineno, f.end_lineno) for f in model.functions],
+                [(c.name, c.lineno, c.end_lineno, [m.name for m in c.methods]) for c in model.classes],
+                model.signatures)
+
+    def test_edit_reuses_untouched_functions(self):
+        """Test that an edit inside one method reparses only that method and matches a full parse"""
+        parser = IncrementalParser()
+        before = parser.parse_model(PARSERS["javascript"], self.path)
+        push, pop, drain = parser._files[self.path].model.functions
+        self.assertIsInstance(drain, CompactFunctionInfo)
+        self.assertIsInstance(before.functions[2], FunctionInfo)
+        before.functions[0].commits.append("abc123")
+        self._write(self.source.replace("    return job;\n", "    const size = job.size;\n    return size;\n"))
+        with mock.patch.object(PARSERS["javascript"], "parse_model") as parse:
+            model = parser.parse_model(PARSERS["javascript"], self.path)
+            parse.assert_not_called()
+
+        self.assertEqual(parser.incremental_parses, 1)
+        self.assertEqual(self._summary(model), self._summary(PARSERS["javascript"].parse_model(self.path)))
+        self.assertEqual(parser._files[self.path].model.functions, [push, pop, drain])
+        self.assertEqual((drain.lineno, drain.end_lineno), (10, 12))
+        self.assertEqual(parser.changes(self.path), {"changed": ["Queue.push"], "removed": []})
+        self.assertEqual(parser.function_id(self.path, model.functions[2]), "drain")
+
+        # Callers get copies: an earlier result keeps its lines and changes to it stay out of later ones
+        self.assertIsNot(model.functions[2], drain)
+        self.assertEqual((before.functions[2].lineno, before.functions[2].end_lineno), (9, 11))
+        self.assertEqual(model.functions[0].commits, [])
+
+    def test_unbalanced_edit_falls_back_to_full_parse(self):
+        """Test that an edit opening a comment is not reparsed on its own"""
+        parser = IncrementalParser()
+        parser.parse_model(PARSERS["javascript"], self.path)
+        self._write(self.source.replace("    return null;\n", "    /* return null;\n"))
+        model = parser.parse_model(PARSERS["javascript"], self.path)
+        self.assertEqual(parser.incremental_parses, 0)
+        self.assertEqual(self._summary(model), self._summary(PARSERS["javascript"].parse_model(self.path)))
+
+    def test_break_then_repair_matches_full_parse(self):
+        """Test that breaking a file and repairing it again leaves the same model a full parse gives"""
+        java_source = (
+            "public class Repo {\n"
+            "    /**\n"
+            "     * Reads a value.\n"
+            "     */\n"
+            "    @Override\n"
+            "    public String get(String key) {\n"
+            "        return key;\n"
+            "    }\n"
+            "\n"
+            "    public int size() {\n"
+            "        return 0;\n"
+            "    }\n"
+            "}\n"
+        )
+        python_source = (
+            "class ContentHasher:\n"
+            "    \"\"\"Hashes files\"\"\"\n"
+            "\n"
+            "    def digest(self, path):\n"
+            "        return path\n"
+        )
+        edits = [
+            ("Repo.java", java_source, java_source.replace("     */\n", "     */\n        if x:\n")),
+            ("Repo.java", java_source, java_source.replace("    }\n\n", "    }\n        if x:\n\n")),
+            ("hasher.py", python_source, python_source.replace("Hasher:\n", "Hasher:\n        y = 2\n")),
+        ]
+        for name, source, broken in edits:
+            path = os.path.join(self.test_dir, name)
+            parser_class = PARSERS["java" if name.endswith(".java") else "python"]
+            parser = IncrementalParser()
+            for content in (source, broken, source):
+                with open(path, "w") as f:
+                    f.write(content)
+                try:
+                    expected = self._summary(parser_class.parse_model(path))
+                except SyntaxError:
+                    self.assertRaises(SyntaxError, parser.parse_model, parser_class, path)
+                    continue
+                self.assertEqual(self._summary(parser.parse_model(parser_class, path)), expected)
+
+class TestParsePool(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.code_files = []
+        for index in range(4):
+            full_path = os.path.join(self.test_dir, f"module{index}.py")
+            with open(full_path, "w") as f:
+                f.write(f"def handler_{index}(event):\n    pass\n" if index != 2 else "def broken(:\n")
+            self.code_files.append({"file_path": f"module{index}.py", "full_path": full_path, "language": "python"})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_worker_results_in_input_order(self):
+        """Test that pooled parsing returns every file, in order, with per-file errors"""
+        pool = ParsePool(max_workers=2, chunk_size=1)
+        self.addCleanup(pool.shutdown)
+        results = list(pool.iter_parsed(self.code_files, ordered=True))
+        self.assertEqual([info["file_path"] for info, _, _ in results], [f["file_path"] for f in self.code_files])
+        self.assertEqual(results[0][1].functions[0].name, "handler_0")
+        self.assertIsNone(results[2][1])
+        self.assertIsNotNone(results[2][2])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
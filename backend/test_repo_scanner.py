@@ -0,0 +1,252 @@
+import unittest
+import errno
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from services.git_index_reader import read_index_paths
+from services.repo_scanner import RepoScanner
+from services.repo_walker import ParallelWalker
+from services.repo_watcher import RepoWatcher, _Inotify
+from services.scan_cache import ScanCache
+
+class TestRepoScanner(unittest.TestCase):
+
+    def setUp(self):
+        # Create a small layered repository
+        self.repo_dir = tempfile.mkdtemp()
+        layout = {
+            "src/controller/UserController.java": "class UserController {}",
+            "src/service/user_service.py": "def create_user():\n    pass\n",
+            "src/model/user.js": "function User() {}\n",
+            "docs/README.md": "# Docs",
+            "node_modules/lib/index.js": "ignored",
+            "requirements.txt": "fastapi==0.104.1\n"
+        }
+        for relative_path, content in layout.items():
+            full_path = os.path.join(self.repo_dir, relative_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write(content)
+
+        self.scanner = RepoScanner()
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def test_scan_repository(self):
+        """Test language counts and categories of a scan"""
+        structure = self.scanner.scan_repository(self.repo_dir)
+        self.assertEqual(structure["total_files"], 5)
+        self.assertEqual(structure["languages"]["java"], 1)
+        self.assertIn("FastAPI", structure["package_structure"]["frameworks"])
+        self.assertNotIn("node_modules", structure["directories"])
+
+    def test_architecture_layers(self):
+        """Test layer detection from directory names"""
+        architecture = self.scanner.analyze_code_architecture(self.repo_dir)
+        self.assertIn("controller", architecture["layers"])
+        self.assertIn("MVC/Layered Architecture", architecture["patterns"])
+
+    def test_snapshot_scope_walks_once(self):
+        """Test that all analyses in a scope share one walk"""
+        with mock.patch.object(self.scanner, "build_snapshot", wraps=self.scanner.build_snapshot) as build:
+            with self.scanner.snapshot_scope():
+                self.scanner.scan_repository(self.repo_dir)
+                self.scanner.analyze_code_architecture(self.repo_dir)
+                self.scanner.generate_code_structure_tree(self.repo_dir)
+                files = self.scanner.get_code_files_for_analysis(self.repo_dir, ["python"])
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual([f["file_path"] for f in files], [os.path.join("src", "service", "user_service.py")])
+
+    def test_views_do_not_mutate_snapshot(self):
+        """Test that callers cannot modify a shared snapshot"""
+        snapshot = self.scanner.build_snapshot(self.repo_dir)
+        snapshot.structure()["code_files"].clear()
+        self.assertEqual(len(snapshot.structure()["code_files"]), 3)
+
+    def test_columnar_records_match_streamed_records(self):
+        """Test that records materialized from the columns match a fresh classification"""
+        scanner = RepoScanner(use_git_index=False)
+        snapshot = scanner.build_snapshot(self.repo_dir)
+        stored = [(r.path, r.language, r.purpose) for r in snapshot.iter_files() if not r.hidden]
+        streamed = [(r.path, r.language, r.purpose) for r in scanner.iter_file_records(self.repo_dir)]
+        self.assertEqual(stored, streamed)
+
+    def test_identical_files_are_grouped(self):
+        """Test that byte-identical copies share one content group"""
+        copy_path = os.path.join(self.repo_dir, "lib", "user_service.py")
+        os.makedirs(os.path.dirname(copy_path))
+        shutil.copy(os.path.join(self.repo_dir, "src", "service", "user_service.py"), copy_path)
+        code_files = self.scanner.get_code_files_for_analysis(self.repo_dir)
+        groups = self.scanner.group_identical_files(code_files)
+        self.assertEqual(len(groups), 3)
+        shared = [g for g in groups if len(g) == 2][0]
+        self.assertEqual(shared[0]["content_hash"], shared[1]["content_hash"])
+
+    def test_iter_file_records_resumes_after_cursor(self):
+        """Test that streaming resumes exactly after a returned path"""
+        scanner = RepoScanner(use_git_index=False)
+        records = list(scanner.iter_file_records(self.repo_dir))
+        self.assertEqual(len(records), 5)
+        resumed = list(scanner.iter_file_records(self.repo_dir, start_after=records[1].path))
+        self.assertEqual([r.path for r in resumed], [r.path for r in records[2:]])
+
+    def test_parallel_walk_is_deterministic(self):
+        """Test that the parallel walker matches the serial walk order"""
+        serial = ParallelWalker(1).walk(self.repo_dir, self.scanner._should_descend)
+        parallel = ParallelWalker(8).walk(self.repo_dir, self.scanner._should_descend)
+        self.assertEqual([d for d, _ in serial], [d for d, _ in parallel])
+        self.assertEqual(serial[0][0], ".")
+        self.assertNotIn(os.path.join("node_modules", "lib"), [d for d, _ in serial])
+
+    def test_live_index_follows_changes(self):
+        """Test that a watched repository is answered from memory and stays current"""
+        scanner = RepoScanner(use_git_index=False)
+        watcher = RepoWatcher(scanner, poll_interval=0.05, force_polling=True)
+        scanner.live_index = watcher
+        self.addCleanup(watcher.stop_all)
+
+        watcher.register(self.repo_dir)
+        with mock.patch.object(scanner, "build_snapshot") as build:
+            self.assertEqual(scanner.scan_repository(self.repo_dir)["total_files"], 5)
+            build.assert_not_called()
+
+        os.makedirs(os.path.join(self.repo_dir, "src", "dto"))
+        with open(os.path.join(self.repo_dir, "src", "dto", "user_dto.py"), "w") as f:
+            f.write("")
+        deadline = time.time() + 5
+        while time.time() < deadline and scanner.scan_repository(self.repo_dir)["total_files"] != 6:
+            time.sleep(0.05)
+        self.assertEqual(scanner.scan_repository(self.repo_dir)["total_files"], 6)
+        self.assertFalse(watcher.status(self.repo_dir)["stale"])
+
+        # Build files are edited in place, without touching the directory mtime
+        with open(os.path.join(self.repo_dir, "requirements.txt"), "a") as f:
+            f.write("flask==3.0.0\n")
+        deadline = time.time() + 5
+        while time.time() < deadline and "flask" not in watcher.snapshot(self.repo_dir).package_structure()["dependencies"]:
+            time.sleep(0.05)
+        self.assertIn("flask", watcher.snapshot(self.repo_dir).package_structure()["dependencies"])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_live_index_survives_watch_limit(self):
+        """Test that running out of inotify watches while refreshing switches the repository to polling"""
+        scanner = RepoScanner(use_git_index=False)
+        watcher = RepoWatcher(scanner, poll_interval=0.05, force_polling=False)
+        scanner.live_index = watcher
+        self.addCleanup(watcher.stop_all)
+        add_watch = _Inotify.add_watch
+
+        def limited_add_watch(inotify, path, mask):
+            if "dto" in path:
+                raise OSError(errno.ENOSPC, "inotify_add_watch failed")
+            return add_watch(inotify, path, mask)
+
+        with mock.patch.object(_Inotify, "add_watch", limited_add_watch):
+            self.assertEqual(watcher.register(self.repo_dir)["backend"], "inotify")
+            os.makedirs(os.path.join(self.repo_dir, "src", "dto"))
+            deadline = time.time() + 5
+            while time.time() < deadline and watcher.status(self.repo_dir)["backend"] != "polling":
+                time.sleep(0.05)
+
+        status = watcher.status(self.repo_dir)
+        self.assertEqual(status["backend"], "polling")
+        self.assertIsNotNone(status["error"])
+        with open(os.path.join(self.repo_dir, "src", "dto", "user_dto.py"), "w") as f:
+            f.write("")
+        deadline = time.time() + 5
+        while time.time() < deadline and scanner.scan_repository(self.repo_dir)["total_files"] != 6:
+            time.sleep(0.05)
+        self.assertEqual(scanner.scan_repository(self.repo_dir)["total_files"], 6)
+        self.assertFalse(watcher.status(self.repo_dir)["stale"])
+
+class TestScanCache(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        for package in ["api", "core"]:
+            os.makedirs(os.path.join(self.repo_dir, package))
+            with open(os.path.join(self.repo_dir, package, "module.py"), "w") as f:
+                f.write("def handler():\n    pass\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_unchanged_rescan_reuses_snapshot(self):
+        """Test that a rescan without changes lists no directory"""
+        scanner = RepoScanner(scan_cache=ScanCache(self.cache_dir, use_git=False))
+        first = scanner.build_snapshot(self.repo_dir)
+        scan = scanner.scan_cache.scan(self.repo_dir, scanner._should_descend)
+        self.assertFalse(scan.changed)
+        self.assertEqual(scan.listed_directories, 0)
+        self.assertIs(scanner.build_snapshot(self.repo_dir), first)
+
+    def test_rescan_after_change(self):
+        """Test that only the changed directory is listed again, even from a new process"""
+        ScanCache(self.cache_dir, use_git=False).scan(self.repo_dir, lambda d: True)
+        with open(os.path.join(self.repo_dir, "core", "extra.py"), "w") as f:
+            f.write("")
+        os.utime(os.path.join(self.repo_dir, "core"), ns=(1, 1))
+
+        scanner = RepoScanner(scan_cache=ScanCache(self.cache_dir, use_git=False))
+        scan = scanner.scan_cache.scan(self.repo_dir, scanner._should_descend)
+        self.assertTrue(scan.changed)
+        self.assertEqual(scan.listed_directories, 1)
+        self.assertEqual(scanner.scan_repository(self.repo_dir)["total_files"], 3)
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class TestGitIndexEnumeration(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_dir = tempfile.mkdtemp()
+        for relative_path in ["app/main.py", "app/util.py", "dist/bundle.js", "notes.py"]:
+            full_path = os.path.join(self.repo_dir, relative_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write("x = 1\n")
+        with open(os.path.join(self.repo_dir, ".gitignore"), "w") as f:
+            f.write("dist/\n")
+        subprocess.run(["git", "init", "-q"], cwd=self.repo_dir, check=True)
+        subprocess.run(["git", "add", "app", ".gitignore"], cwd=self.repo_dir, check=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def test_tracked_files_only(self):
+        """Test that ignored and untracked files are not enumerated"""
+        scanner = RepoScanner(use_git_index=True)
+        files = scanner.get_code_files_for_analysis(self.repo_dir)
+        self.assertEqual([f["file_path"] for f in files],
+                         [os.path.join("app", "main.py"), os.path.join("app", "util.py")])
+
+    def test_include_untracked(self):
+        """Test that untracked files are added on request, ignored ones never"""
+        scanner = RepoScanner(use_git_index=True, include_untracked=True)
+        paths = [f["file_path"] for f in scanner.get_code_files_for_analysis(self.repo_dir)]
+        self.assertIn("notes.py", paths)
+        self.assertNotIn(os.path.join("dist", "bundle.js"), paths)
+
+    def test_conflicted_paths(self):
+        """Test that a path added on both sides of a conflicted merge is listed once"""
+        git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+        subprocess.run(git + ["commit", "-qm", "base"], cwd=self.repo_dir, check=True)
+        for checkout, content in ((["-b", "side"], "x = 2\n"), (["-"], "x = 3\n")):
+            subprocess.run(git + ["checkout", "-q"] + checkout, cwd=self.repo_dir, check=True)
+            with open(os.path.join(self.repo_dir, "app", "both.py"), "w") as f:
+                f.write(content)
+            subprocess.run(git + ["add", "app/both.py"], cwd=self.repo_dir, check=True)
+            subprocess.run(git + ["commit", "-qm", content], cwd=self.repo_dir, check=True)
+        subprocess.run(git + ["merge", "-q", "side"], cwd=self.repo_dir, capture_output=True)
+
+        paths = read_index_paths(os.path.join(self.repo_dir, ".git"))
+        self.assertEqual(paths, [".gitignore", "app/both.py", "app/main.py", "app/util.py"])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)